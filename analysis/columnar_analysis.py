@@ -0,0 +1,113 @@
+import sys
+
+import numpy as np
+
+from analysis.incremental_analysis import TOP_CHATTERS, count_new_subs
+from helper_functions.badges import GIFTER_MASK, SUB_MONTHS_MASK, SUBSCRIBER
+from helper_functions.columnar_store import EVENT_NUMBER_FIELDS, from_epoch_ms, load_columns
+
+
+def top_counts(codes, counts, first_index, n=TOP_CHATTERS):
+    """
+    Returns the n (code, count) pairs with the highest counts; ties go to the code seen first,
+    as with a Counter filled in message order.
+    """
+    order = np.lexsort((first_index, -counts))[:n]
+    return codes[order], counts[order]
+
+
+def analyze_columns(columns):
+    """
+    Vectorized ``extended_analyze_chat_logs`` over columns from ``load_columns``. Returns the
+    same ``period_data`` and ``overall_summary``.
+    """
+    usernames = columns["usernames"]
+    interval_count = len(columns["interval_start"])
+    chat_interval = columns["chat_interval"].astype(np.int64)
+    chat_username = columns["chat_username"].astype(np.int64)
+    chat_badges = columns["chat_badges"]
+    user_count = max(len(usernames), 1)
+
+    # Subscriber statistics: bit tests on the badge code of every message
+    subscriber_mask = (chat_badges & SUBSCRIBER) != 0
+    period_subscribers = np.bincount(chat_interval[subscriber_mask], minlength=interval_count)
+    subscriber_badges = chat_badges[subscriber_mask]
+    total_messages = len(chat_username)
+    total_subscribers = int(subscriber_mask.sum())
+    six_plus_month_subscribers = int(((subscriber_badges & SUB_MONTHS_MASK) >= 6).sum())
+    sub_gifters = int(((subscriber_badges & GIFTER_MASK) != 0).sum())
+
+    # Messages per (period, user) pair
+    pair_keys, pair_first, pair_counts = np.unique(
+        chat_interval * user_count + chat_username, return_index=True, return_counts=True
+    )
+    pair_interval = pair_keys // user_count
+    pair_user = pair_keys % user_count
+    unique_chatters = np.bincount(pair_interval, minlength=interval_count)
+
+    # Top chatters of every period: sort by period, then count, then first appearance
+    order = np.lexsort((pair_first, -pair_counts, pair_interval))
+    sorted_interval = pair_interval[order]
+    group_start = np.searchsorted(sorted_interval, np.arange(interval_count))
+    rank = np.arange(len(order)) - group_start[sorted_interval]
+    leaders = order[rank < TOP_CHATTERS]
+    period_chats = [{} for _ in range(interval_count)]
+    for interval, user, count in zip(pair_interval[leaders].tolist(), pair_user[leaders].tolist(),
+                                     pair_counts[leaders].tolist()):
+        period_chats[interval][usernames[user]] = count
+
+    # New subscribers: events are few, so they are replayed per period
+    event_types = columns["event_types"]
+    period_events = [[] for _ in range(interval_count)]
+    event_fields = [columns[f"event_{field}"].tolist() for field in EVENT_NUMBER_FIELDS]
+    for i, (interval, user, event_type) in enumerate(zip(columns["event_interval"].tolist(),
+                                                         columns["event_username"].tolist(),
+                                                         columns["event_type"].tolist())):
+        event = {"username": usernames[user], "event_type": event_types[event_type]}
+        for field, values in zip(EVENT_NUMBER_FIELDS, event_fields):
+            if values[i] >= 0:
+                event[field] = values[i]
+        period_events[interval].append(event)
+    period_new_subs = [count_new_subs(events) for events in period_events]
+
+    period_data = [
+        {
+            "start_time": from_epoch_ms(start),
+            "end_time": from_epoch_ms(end),
+            "unique_chatters": int(unique_chatters[interval]),
+            "chats_per_user": period_chats[interval],  # Sorted by message count
+            "subscribers": int(period_subscribers[interval]),
+            "new_subscribers": period_new_subs[interval]
+        }
+        for interval, (start, end) in enumerate(zip(columns["interval_start"].tolist(), columns["interval_end"].tolist()))
+    ]
+
+    user_codes, user_first, user_counts = np.unique(chat_username, return_index=True, return_counts=True)
+    top_codes, top_message_counts = top_counts(user_codes, user_counts, user_first)
+    overall_summary = {
+        "total_unique_chatters": len(user_codes),
+        "total_chats_per_user": {
+            usernames[code]: count for code, count in zip(top_codes.tolist(), top_message_counts.tolist())
+        },  # Sorted by message count
+        "total_messages": total_messages,
+        "subscriber_percentage": total_subscribers / total_messages * 100 if total_messages else 0,
+        "six_plus_month_subscriber_percentage": six_plus_month_subscribers / total_subscribers * 100 if total_subscribers else 0,
+        "sub_gifter_percentage": sub_gifters / total_subscribers * 100 if total_subscribers else 0,
+        "total_new_subscribers": sum(period_new_subs)
+    }
+    return period_data, overall_summary
+
+
+def analyze_columnar_logs(path, start_time=None, end_time=None):
+    """
+    Loads a columnar chat log directory and analyzes it with the vectorized path.
+    """
+    return analyze_columns(load_columns(path, start_time, end_time))
+
+
+if __name__ == "__main__":
+    # Usage: python -m analysis.columnar_analysis <columns_dir> <output_file>
+    from analysis.chat_analysis import save_analysis_results
+
+    period_data, overall_summary = analyze_columnar_logs(sys.argv[1])
+    save_analysis_results(sys.argv[2], period_data, overall_summary)
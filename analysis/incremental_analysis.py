@@ -0,0 +1,404 @@
+import heapq
+import json
+import os
+import sys
+from collections import Counter
+from operator import itemgetter
+
+from analysis.sketches import ChatterSketches
+from helper_functions.badges import BADGE_RULES, GIFTER_MASK, SUB_MONTHS_MASK, SUBSCRIBER, chat_badge_code
+from helper_functions.chat_store import open_interval_range
+
+TOP_CHATTERS = 10
+MAX_PERIODS_IN_MEMORY = 1008  # A week of 10-minute intervals; older periods stay in the checkpoint's journal
+CHATTER_JOURNAL_COMPACT_LINES = 64  # Per-update count lines kept before the chatter journal is rewritten whole
+
+
+def top_chatters(chat_counts, n=TOP_CHATTERS):
+    """
+    Returns the n most active chatters as a dict, without sorting the whole counter.
+    """
+    return dict(heapq.nlargest(n, chat_counts.items(), key=itemgetter(1)))
+
+
+def count_new_subs(special_events):
+    """
+    Counts new subscribers from a period's special events. Subgifts that belong to a
+    mystery gift are only counted once, through the mystery gift's count.
+    """
+    new_subs = 0
+    mystery_gifters = {}
+    for event in special_events:
+        event_type = event.get("event_type", "")
+        username = event.get("username", "")
+
+        if event_type == "submysterygift":
+            # Add mystery gift count
+            gift_count = int(event.get("gift_count", 0))
+            mystery_gifters[username] = mystery_gifters.get(username, 0) + gift_count
+            new_subs += gift_count
+
+        elif event_type == "subgift":
+            # Count subgifts if not part of a mystery gift
+            if username not in mystery_gifters or mystery_gifters[username] <= 0:
+                new_subs += 1
+            else:
+                # Reduce mystery gift count if it applies to this subgift
+                mystery_gifters[username] -= 1
+
+        elif event_type == "resub":
+            # Resubscriptions count as new subs
+            new_subs += 1
+    return new_subs
+
+
+class ChatAnalysisState:
+    """
+    Mergeable running state of the chat analysis.
+
+    Intervals are folded in one at a time, so adding an interval costs O(interval) no matter
+    how long the history is. The state can be checkpointed to JSON and resumed later, and two
+    states built from disjoint intervals can be merged.
+
+    With ``use_sketches`` the overall chatter set and per-user counter are replaced by fixed-size
+    approximate sketches, for histories too large to hold every username in memory. With
+    ``max_periods`` only the latest period summaries are kept in ``period_data``.
+    """
+
+    def __init__(self, use_sketches=False, max_periods=None):
+        self.use_sketches = use_sketches
+        self.max_periods = max_periods
+        self.overall_user_chats = Counter()
+        self.total_chatters = set()
+        self.sketches = ChatterSketches() if use_sketches else None
+        self.period_data = []
+
+        self.total_messages = 0
+        self.total_subscribers = 0
+        self.six_plus_month_subscribers = 0
+        self.sub_gifters = 0
+        self.total_new_subs = 0
+        self.last_end_time = None  # End of the latest interval folded in
+
+    def add_interval(self, period):
+        """
+        Folds one interval record into the state and returns its period summary.
+        """
+        period_chat_counts = Counter()
+        period_subscribers = 0
+
+        # Count chats per user in this period and analyze badges
+        for chat in period['chat_logs']:
+            period_chat_counts[chat['username']] += 1
+            code = chat_badge_code(chat)
+
+            # Check for subscription status
+            if code & SUBSCRIBER:
+                period_subscribers += 1
+                # Check for 6+ month subscribers
+                if (code & SUB_MONTHS_MASK) >= 6:
+                    self.six_plus_month_subscribers += 1
+                # Check for sub-gifter status
+                if code & GIFTER_MASK:
+                    self.sub_gifters += 1
+
+        if self.use_sketches:
+            for username, count in period_chat_counts.items():
+                self.sketches.add(username, count)
+        else:
+            self.overall_user_chats.update(period_chat_counts)
+            self.total_chatters.update(period_chat_counts)
+        self.total_messages += len(period['chat_logs'])
+        self.total_subscribers += period_subscribers
+
+        period_new_subs = count_new_subs(period.get("special_events", []))
+        self.total_new_subs += period_new_subs
+
+        period_result = {
+            "start_time": period['start_time'],
+            "end_time": period['end_time'],
+            "unique_chatters": len(period_chat_counts),
+            "chats_per_user": top_chatters(period_chat_counts),  # Sorted by message count
+            "subscribers": period_subscribers,
+            "new_subscribers": period_new_subs
+        }
+        self.period_data.append(period_result)
+        self._trim_periods()
+        if self.last_end_time is None or period['end_time'] > self.last_end_time:
+            self.last_end_time = period['end_time']
+        return period_result
+
+    def _trim_periods(self):
+        if self.max_periods is not None and len(self.period_data) > self.max_periods:
+            del self.period_data[:len(self.period_data) - self.max_periods]
+
+    def add_intervals(self, periods):
+        """
+        Folds a stream of interval records into the state.
+        """
+        for period in periods:
+            self.add_interval(period)
+        return self
+
+    def merge(self, other):
+        """
+        Merges a state built from other intervals into this one.
+        """
+        if self.use_sketches != other.use_sketches:
+            raise ValueError("Cannot merge exact and sketched analysis states")
+        if self.use_sketches:
+            self.sketches.merge(other.sketches)
+        else:
+            self.overall_user_chats.update(other.overall_user_chats)
+            self.total_chatters.update(other.total_chatters)
+        self.period_data = sorted(self.period_data + other.period_data, key=itemgetter("start_time"))
+        self._trim_periods()
+
+        self.total_messages += other.total_messages
+        self.total_subscribers += other.total_subscribers
+        self.six_plus_month_subscribers += other.six_plus_month_subscribers
+        self.sub_gifters += other.sub_gifters
+        self.total_new_subs += other.total_new_subs
+        if other.last_end_time is not None and (self.last_end_time is None or other.last_end_time > self.last_end_time):
+            self.last_end_time = other.last_end_time
+        return self
+
+    def summary(self):
+        """
+        Returns the overall summary in the shape produced by ``extended_analyze_chat_logs``.
+        """
+        total_messages = self.total_messages
+        total_subscribers = self.total_subscribers
+        if self.use_sketches:
+            unique_chatters = self.sketches.unique_chatters()
+            chats_per_user = self.sketches.top_chatters(TOP_CHATTERS)
+        else:
+            unique_chatters = len(self.total_chatters)
+            chats_per_user = top_chatters(self.overall_user_chats)
+        return {
+            "total_unique_chatters": unique_chatters,
+            "total_chats_per_user": chats_per_user,  # Sorted by message count
+            "total_messages": total_messages,
+            "subscriber_percentage": total_subscribers / total_messages * 100 if total_messages else 0,
+            "six_plus_month_subscriber_percentage": self.six_plus_month_subscribers / total_subscribers * 100 if total_subscribers else 0,
+            "sub_gifter_percentage": self.sub_gifters / total_subscribers * 100 if total_subscribers else 0,
+            "total_new_subscribers": self.total_new_subs
+        }
+
+    def to_dict(self):
+        # In exact mode the chatter set is the key set of the per-user counter, so it is not stored twice
+        return {
+            "badge_rules": BADGE_RULES,
+            "use_sketches": self.use_sketches,
+            "overall_user_chats": dict(self.overall_user_chats),
+            "sketches": self.sketches.to_dict() if self.use_sketches else None,
+            "period_data": self.period_data,
+            "total_messages": self.total_messages,
+            "total_subscribers": self.total_subscribers,
+            "six_plus_month_subscribers": self.six_plus_month_subscribers,
+            "sub_gifters": self.sub_gifters,
+            "total_new_subs": self.total_new_subs,
+            "last_end_time": self.last_end_time
+        }
+
+    @classmethod
+    def from_dict(cls, data, use_sketches=None, max_periods=None):
+        """
+        Restores a state saved by ``to_dict``. ``use_sketches`` (by default as saved) may turn
+        an exact state into a sketched one; exact counts cannot be recovered from sketches.
+        """
+        saved_sketches = data.get("use_sketches", False)
+        use_sketches = saved_sketches if use_sketches is None else use_sketches
+        state = cls(use_sketches, max_periods)
+        if saved_sketches:
+            if not use_sketches:
+                raise Exception("The analysis state was built with sketches; exact chatter counts cannot be restored")
+            state.sketches = ChatterSketches.from_dict(data["sketches"])
+        elif use_sketches:
+            for username, count in data["overall_user_chats"].items():
+                state.sketches.add(username, count)
+        else:
+            state.overall_user_chats = Counter(data["overall_user_chats"])
+            state.total_chatters = set(state.overall_user_chats)
+        state.period_data = list(data["period_data"])
+        state._trim_periods()
+        state.total_messages = data["total_messages"]
+        state.total_subscribers = data["total_subscribers"]
+        state.six_plus_month_subscribers = data["six_plus_month_subscribers"]
+        state.sub_gifters = data["sub_gifters"]
+        state.total_new_subs = data["total_new_subs"]
+        state.last_end_time = data["last_end_time"]
+        return state
+
+
+def _periods_path(checkpoint_path):
+    return f"{checkpoint_path}.periods.jsonl"
+
+
+def _chatters_path(checkpoint_path, generation):
+    return f"{checkpoint_path}.chatters.{generation}.jsonl"
+
+
+def _read_journal(path, length):
+    """
+    Returns the JSON lines of a journal up to its committed length.
+    """
+    if not length:
+        return []
+    with open(path, 'rb') as file:
+        data = file.read(length)
+    return [json.loads(line) for line in data.decode('utf-8').splitlines()]
+
+
+def _append_journal(path, committed_length, records):
+    """
+    Appends JSON lines after the committed length of a journal, cutting off whatever an
+    interrupted save left behind it. Returns the new length.
+    """
+    with open(path, 'ab') as file:
+        file.truncate(committed_length)
+        file.write("".join(json.dumps(record) + "\n" for record in records).encode('utf-8'))
+        file.flush()
+        os.fsync(file.fileno())
+        return file.tell()
+
+
+def _read_checkpoint(checkpoint_path):
+    if not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path, 'r') as file:
+        return json.load(file)
+
+
+def _current_badge_rules(data):
+    # Totals counted under older badge rules cannot be corrected in place, only rebuilt from the log
+    return data.get("badge_rules", 1) == BADGE_RULES
+
+
+def save_checkpoint(checkpoint_path, state, new_state=None):
+    """
+    Saves the analysis state next to ``checkpoint_path`` without rewriting its history.
+
+    ``new_state`` holds only what was folded in since the checkpoint was loaded (``state``
+    already includes it): its period summaries are appended to ``<checkpoint>.periods.jsonl``
+    and, in exact mode, its per-user counts to a chatter journal as one line. The checkpoint
+    file itself holds the totals, sketches, the latest periods and the committed length of
+    each journal, and is replaced atomically last, so an interrupted save leaves the previous
+    checkpoint intact.
+
+    When the journals are started from scratch (no checkpoint yet, or one from before the
+    journals or counted under older badge rules) they are written from ``new_state``, which
+    ``update_analysis`` then built from the whole chat log and never trims; ``state`` may
+    already have dropped its oldest periods. Without ``new_state`` they are written from
+    ``state``, which must then hold every period.
+    """
+    committed = _read_checkpoint(checkpoint_path)
+    journals = committed.get("journals") if committed else None
+    old_chatters = None
+    if journals is None or new_state is None or not _current_badge_rules(committed):
+        # First save, or a checkpoint from before the journals or the badge rules: start them from the whole state
+        generation = 0
+        if journals is not None:
+            old_chatters = _chatters_path(checkpoint_path, journals["chatters_generation"])
+            generation = journals["chatters_generation"] + 1
+        journals = {"periods": 0, "chatters_generation": generation, "chatters": 0, "chatter_lines": 0}
+        if new_state is None:
+            new_state = state
+    else:
+        journals = dict(journals)
+
+    journals["periods"] = _append_journal(_periods_path(checkpoint_path), journals["periods"], new_state.period_data)
+    if not state.use_sketches and new_state.overall_user_chats:
+        if journals["chatter_lines"] >= CHATTER_JOURNAL_COMPACT_LINES:
+            # Replaying many small lines gets slow; fold them into one line in a new generation
+            old_chatters = _chatters_path(checkpoint_path, journals["chatters_generation"])
+            journals.update(chatters_generation=journals["chatters_generation"] + 1, chatters=0, chatter_lines=0)
+            new_state = state
+        journals["chatters"] = _append_journal(
+            _chatters_path(checkpoint_path, journals["chatters_generation"]), journals["chatters"],
+            [dict(new_state.overall_user_chats)]
+        )
+        journals["chatter_lines"] += 1
+
+    data = state.to_dict()
+    data.pop("overall_user_chats")
+    data["period_data"] = state.period_data[-MAX_PERIODS_IN_MEMORY:]
+    data["journals"] = journals
+    temp_path = f"{checkpoint_path}.tmp"
+    with open(temp_path, 'w') as file:
+        json.dump(data, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, checkpoint_path)
+    if old_chatters is not None and os.path.exists(old_chatters):
+        os.remove(old_chatters)
+
+
+def load_checkpoint(checkpoint_path, use_sketches=None, max_periods=None):
+    """
+    Loads a saved analysis state, or returns a fresh one (exact unless ``use_sketches``) if
+    there is no checkpoint yet or it was built under older badge rules (``BADGE_RULES``), so
+    that ``update_analysis`` re-derives it from the whole chat log. Only the latest ``max_periods`` (by default
+    ``MAX_PERIODS_IN_MEMORY``) period summaries are kept; ``iter_checkpoint_periods`` reads all
+    of them.
+    """
+    max_periods = MAX_PERIODS_IN_MEMORY if max_periods is None else max_periods
+    data = _read_checkpoint(checkpoint_path)
+    if data is not None and not _current_badge_rules(data):
+        print(f"{checkpoint_path} was counted under older badge rules; re-deriving it from the chat log")
+        data = None
+    if data is None:
+        return ChatAnalysisState(bool(use_sketches), max_periods)
+    journals = data.get("journals")
+    if journals is not None and not data["use_sketches"]:
+        counts = Counter()
+        for line in _read_journal(_chatters_path(checkpoint_path, journals["chatters_generation"]), journals["chatters"]):
+            counts.update(line)
+        data["overall_user_chats"] = counts
+    return ChatAnalysisState.from_dict(data, use_sketches, max_periods)
+
+
+def iter_checkpoint_periods(checkpoint_path):
+    """
+    Yields every period summary of a checkpoint, oldest first.
+    """
+    data = _read_checkpoint(checkpoint_path)
+    if data is None:
+        return
+    journals = data.get("journals")
+    if journals is None:
+        yield from data["period_data"]
+        return
+    with open(_periods_path(checkpoint_path), 'rb') as file:
+        remaining = journals["periods"]
+        for line in file:
+            if remaining <= 0:
+                break
+            remaining -= len(line)
+            yield json.loads(line)
+
+
+def update_analysis(chat_log_path, checkpoint_path, use_sketches=None):
+    """
+    Resumes from the checkpoint, folds in only the intervals logged since, and appends them to
+    the checkpoint. ``use_sketches`` defaults to the checkpoint's mode. Without a usable
+    checkpoint (none yet, or counted under older badge rules) every interval of the log is
+    folded into ``new_state``, which keeps all its periods for the rewritten journal.
+    """
+    state = load_checkpoint(checkpoint_path, use_sketches)
+    new_state = ChatAnalysisState(state.use_sketches)
+    for period in open_interval_range(chat_log_path, start_time=state.last_end_time):
+        new_state.add_interval(period)
+    state.merge(new_state)
+    save_checkpoint(checkpoint_path, state, new_state)
+    print(f"Added {len(new_state.period_data)} new intervals to {checkpoint_path}")
+    return state
+
+
+if __name__ == "__main__":
+    # Usage: python -m analysis.incremental_analysis <chat_log_store> <checkpoint_file> <output_file> [--sketch]
+    from analysis.chat_analysis import save_analysis_results
+
+    chat_log_path, checkpoint_path, output_path = sys.argv[1:4]
+    state = update_analysis(chat_log_path, checkpoint_path, use_sketches=True if "--sketch" in sys.argv[4:] else None)
+    save_analysis_results(output_path, list(iter_checkpoint_periods(checkpoint_path)), state.summary())
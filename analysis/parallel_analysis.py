@@ -0,0 +1,147 @@
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from analysis.chat_analysis import save_analysis_results
+from analysis.incremental_analysis import ChatAnalysisState
+from helper_functions.chat_store import ChatLogStore, open_interval_range
+
+SHARD_BYTES = 16 * 1024 * 1024  # Upper bound on the interval bytes one worker task reads
+SHARDS_PER_WORKER = 4  # Extra shards let fast workers pick up the slack of slow ones
+
+
+def channel_name(path):
+    """
+    Channel of a chat log store directory (``<channel>_chat_log``) or legacy JSON file.
+    """
+    name = os.path.basename(os.path.normpath(path))
+    for suffix in (".json", "_chat_log"):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    return name
+
+
+def plan_shards(paths, shard_bytes=SHARD_BYTES, workers=1):
+    """
+    Splits the logs into shards of consecutive intervals by channel and time range.
+
+    Store directories are cut on interval start times using only their indexes, so shards
+    hold about the same number of bytes; no shard exceeds ``shard_bytes`` and there are
+    enough of them to keep ``workers`` busy. A legacy JSON file is one shard.
+    """
+    logs = []
+    for path in paths:
+        if os.path.isdir(path):
+            store = ChatLogStore(path, writable=False)
+            entries = [entry for segment in store.segments() for entry in store.read_index(segment)]
+            entries.sort(key=lambda entry: entry["start_time"])
+        else:
+            entries = None
+        logs.append((path, entries))
+
+    total_bytes = sum(entry["length"] for _, entries in logs if entries for entry in entries)
+    target = max(1, min(shard_bytes, total_bytes // max(1, workers * SHARDS_PER_WORKER)))
+
+    shards = []
+    for path, entries in logs:
+        channel = channel_name(path)
+        if entries is None:
+            shards.append({"channel": channel, "path": path, "start_time": None, "end_time": None,
+                           "bytes": os.path.getsize(path)})
+            continue
+        shard_start, shard_bytes_so_far = 0, 0
+        for index, entry in enumerate(entries):
+            shard_bytes_so_far += entry["length"]
+            if shard_bytes_so_far >= target or index == len(entries) - 1:
+                shards.append({
+                    "channel": channel,
+                    "path": path,
+                    "start_time": entries[shard_start]["start_time"],
+                    # Up to the next interval's start, so every interval lands in exactly one shard
+                    "end_time": entries[index + 1]["start_time"] if index + 1 < len(entries) else None,
+                    "bytes": shard_bytes_so_far
+                })
+                shard_start, shard_bytes_so_far = index + 1, 0
+    return shards
+
+
+def analyze_shard(shard, use_sketches=False):
+    """
+    Worker: folds the intervals starting inside a shard into a partial ChatAnalysisState.
+    Returns the shard, the state, the number of intervals and the seconds it took.
+    """
+    started = time.perf_counter()
+    start_time, end_time = shard["start_time"], shard["end_time"]
+    state = ChatAnalysisState(use_sketches)
+    intervals = 0
+    for period in open_interval_range(shard["path"], start_time, end_time):
+        # The range read also returns intervals that merely overlap the shard's edges
+        if (start_time is None or period["start_time"] >= start_time) and \
+                (end_time is None or period["start_time"] < end_time):
+            state.add_interval(period)
+            intervals += 1
+    return shard, state, intervals, time.perf_counter() - started
+
+
+def analyze_logs_parallel(paths, workers=None, shard_bytes=SHARD_BYTES, use_sketches=False):
+    """
+    Analyzes many channel logs across a process pool.
+
+    Each shard yields a partial state; the partial states of a channel are merged into one
+    ChatAnalysisState in shard (time) order, whatever order they finished in, so chatters are
+    first seen in the order a serial pass sees them and every channel gets the same
+    ``period_data``/``overall_summary`` as ``extended_analyze_chat_logs``, ties included. Returns {channel: (period_data, overall_summary)}
+    and the per-shard timings.
+    """
+    workers = workers or os.cpu_count()
+    shards = plan_shards(paths, shard_bytes, workers)
+    print(f"Analyzing {len(paths)} logs as {len(shards)} shards on {workers} workers...")
+
+    started = time.perf_counter()
+    partial_states = [None] * len(shards)
+    timings = []
+    with ProcessPoolExecutor(workers) as executor:
+        futures = {executor.submit(analyze_shard, shard, use_sketches): index for index, shard in enumerate(shards)}
+        for done, future in enumerate(as_completed(futures), 1):
+            shard, state, intervals, seconds = future.result()
+            channel = shard["channel"]
+            partial_states[futures[future]] = state
+            timings.append({"channel": channel, "start_time": shard["start_time"], "intervals": intervals,
+                            "bytes": shard["bytes"], "seconds": round(seconds, 3)})
+            print(f"[{done}/{len(shards)}] {channel} from {shard['start_time'] or 'start'}: "
+                  f"{intervals} intervals in {seconds:.2f}s")
+
+    states = {}
+    for shard, state in zip(shards, partial_states):
+        if shard["channel"] in states:
+            states[shard["channel"]].merge(state)
+        else:
+            states[shard["channel"]] = state
+
+    elapsed = time.perf_counter() - started
+    busy = sum(timing["seconds"] for timing in timings)
+    if timings:
+        print(f"Done in {elapsed:.2f}s; shard time min {min(t['seconds'] for t in timings):.2f}s, "
+              f"median {statistics.median(t['seconds'] for t in timings):.2f}s, "
+              f"max {max(t['seconds'] for t in timings):.2f}s; "
+              f"{busy / elapsed:.1f}s of shard time per second of wall time")
+    results = {channel: (state.period_data, state.summary()) for channel, state in states.items()}
+    return results, timings
+
+
+if __name__ == "__main__":
+    # Usage: python -m analysis.parallel_analysis <output_dir> <chat_log> [<chat_log> ...] [--workers N] [--sketch]
+    parser = argparse.ArgumentParser(description="Analyze many chat logs in parallel.")
+    parser.add_argument("output_dir")
+    parser.add_argument("chat_logs", nargs="+")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--shard-mb", type=float, default=SHARD_BYTES / 2**20)
+    parser.add_argument("--sketch", action="store_true")
+    args = parser.parse_args()
+
+    results, _ = analyze_logs_parallel(args.chat_logs, args.workers, int(args.shard_mb * 2**20), args.sketch)
+    os.makedirs(args.output_dir, exist_ok=True)
+    for channel, (period_data, overall_summary) in results.items():
+        save_analysis_results(os.path.join(args.output_dir, f"{channel}_analysis.json"), period_data, overall_summary)
@@ -0,0 +1,239 @@
+import base64
+import heapq
+import math
+from array import array
+from hashlib import blake2b
+
+HLL_PRECISION = 14  # 16384 registers, ~0.8% standard error
+CMS_WIDTH = 1 << 14
+CMS_DEPTH = 4
+TOP_K = 100
+
+
+def hash64(item):
+    """
+    Stable 64-bit hash of a string. Unlike ``hash()`` it is the same in every process, which
+    sketches built by different workers need in order to be merged.
+    """
+    return int.from_bytes(blake2b(item.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """
+    Estimates the number of distinct items in a fixed 2**precision bytes.
+    """
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = registers if registers is not None else bytearray(1 << precision)
+
+    def add_hash(self, item_hash):
+        index = item_hash >> (64 - self.precision)
+        remainder = item_hash & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def add(self, item):
+        self.add_hash(hash64(item))
+
+    def count(self):
+        # NumPy is only needed once sketches are read or merged, so exact analysis runs without it
+        import numpy as np
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        # Registers hold small ranks, so the harmonic mean is taken over a histogram of them
+        histogram = np.bincount(np.frombuffer(self.registers, dtype=np.uint8))
+        estimate = alpha * m * m / float(histogram @ np.exp2(-np.arange(len(histogram))))
+        zeros = int(histogram[0])
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # Linear counting for small cardinalities
+        return round(estimate)
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs of different precision")
+        import numpy as np
+        self.registers = bytearray(np.maximum(np.frombuffer(self.registers, dtype=np.uint8),
+                                              np.frombuffer(other.registers, dtype=np.uint8)).tobytes())
+        return self
+
+    def to_dict(self):
+        return {"precision": self.precision, "registers": base64.b64encode(self.registers).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["precision"], bytearray(base64.b64decode(data["registers"])))
+
+
+class CountMinSketch:
+    """
+    Estimates per-item counts in ``width * depth`` counters. Estimates never undercount and
+    overcount by at most ``e / width`` of the total with high probability.
+    """
+
+    def __init__(self, width=CMS_WIDTH, depth=CMS_DEPTH, counters=None):
+        self.width = width
+        self.depth = depth
+        self.counters = counters if counters is not None else array('Q', bytes(8 * width * depth))
+
+    def _indexes(self, item_hash):
+        # Double hashing: derive every row's column from the two halves of one 64-bit hash
+        low, high = item_hash & 0xFFFFFFFF, item_hash >> 32
+        width = self.width
+        return [row * width + (low + row * high) % width for row in range(self.depth)]
+
+    def add_hash(self, item_hash, count=1):
+        counters = self.counters
+        for index in self._indexes(item_hash):
+            counters[index] += count
+
+    def add(self, item, count=1):
+        self.add_hash(hash64(item), count)
+
+    def estimate_hash(self, item_hash):
+        counters = self.counters
+        return min(counters[index] for index in self._indexes(item_hash))
+
+    def estimate(self, item):
+        return self.estimate_hash(hash64(item))
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge Count-Min sketches of different shapes")
+        self.counters = array('Q', map(sum, zip(self.counters, other.counters)))
+        return self
+
+    def to_dict(self):
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "counters": base64.b64encode(self.counters.tobytes()).decode('ascii')
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        counters = array('Q')
+        counters.frombytes(base64.b64decode(data["counters"]))
+        return cls(data["width"], data["depth"], counters)
+
+
+class SpaceSaving:
+    """
+    Space-Saving top-k: tracks at most ``k`` candidate heavy hitters. A new item evicts the
+    smallest candidate and inherits its count, so counts are upper bounds and every item
+    above ``total / k`` is guaranteed to be tracked.
+    """
+
+    def __init__(self, k=TOP_K, counts=None):
+        self.k = k
+        self.counts = counts if counts is not None else {}
+        self._heap = [(count, item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        # The heap holds stale entries for updated items; skip them lazily
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return item, count
+
+    def add(self, item, count=1):
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+        elif len(counts) < self.k:
+            counts[item] = count
+        else:
+            evicted, minimum = self._pop_min()
+            del counts[evicted]
+            counts[item] = minimum + count
+        heapq.heappush(self._heap, (counts[item], item))
+        if len(self._heap) > 4 * self.k:
+            self._heap = [(count, item) for item, count in counts.items()]
+            heapq.heapify(self._heap)
+
+    def minimum(self):
+        return min(self.counts.values()) if len(self.counts) >= self.k else 0
+
+    def top(self, n):
+        """
+        Returns the n largest (item, count) pairs.
+        """
+        return heapq.nlargest(n, self.counts.items(), key=lambda pair: pair[1])
+
+    def merge(self, other):
+        """
+        Merges another summary: items missing from a full summary are credited with that
+        summary's minimum, then the k largest are kept.
+        """
+        own_minimum, other_minimum = self.minimum(), other.minimum()
+        merged = {}
+        for item in self.counts.keys() | other.counts.keys():
+            merged[item] = self.counts.get(item, own_minimum) + other.counts.get(item, other_minimum)
+        self.k = max(self.k, other.k)
+        self.counts = dict(heapq.nlargest(self.k, merged.items(), key=lambda pair: pair[1]))
+        self._heap = [(count, item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+        return self
+
+    def to_dict(self):
+        return {"k": self.k, "counts": self.counts}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["k"], dict(data["counts"]))
+
+
+class ChatterSketches:
+    """
+    Approximate replacement for the exact chatter set and per-user Counter: HyperLogLog for
+    unique chatters, Count-Min plus Space-Saving for the most active chatters. Memory stays
+    fixed no matter how many usernames are seen.
+    """
+
+    def __init__(self, unique=None, frequencies=None, top=None):
+        self.unique = unique or HyperLogLog()
+        self.frequencies = frequencies or CountMinSketch()
+        self.top = top or SpaceSaving()
+
+    def add(self, username, count):
+        item_hash = hash64(username)
+        self.unique.add_hash(item_hash)
+        self.frequencies.add_hash(item_hash, count)
+        self.top.add(username, count)
+
+    def unique_chatters(self):
+        return self.unique.count()
+
+    def top_chatters(self, n):
+        """
+        Returns the n most active chatters. Both sketches overestimate, so the smaller of the
+        two estimates is reported.
+        """
+        estimates = [
+            (username, min(count, self.frequencies.estimate(username)))
+            for username, count in self.top.top(n)
+        ]
+        return dict(sorted(estimates, key=lambda pair: pair[1], reverse=True))
+
+    def merge(self, other):
+        self.unique.merge(other.unique)
+        self.frequencies.merge(other.frequencies)
+        self.top.merge(other.top)
+        return self
+
+    def to_dict(self):
+        return {
+            "unique": self.unique.to_dict(),
+            "frequencies": self.frequencies.to_dict(),
+            "top": self.top.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            HyperLogLog.from_dict(data["unique"]),
+            CountMinSketch.from_dict(data["frequencies"]),
+            SpaceSaving.from_dict(data["top"])
+        )
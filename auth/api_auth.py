@@ -1,7 +1,9 @@
 import os
 import json
 import requests
-from datetime import datetime, timedelta, UTC
+from datetime import datetime, UTC
+
+from auth.token_manager import TokenManager, expires_at_from, write_token_file
 
 # Define the tokens directory and ensure it exists
 TOKENS_DIR = "tokens"
@@ -11,9 +13,13 @@ TOKEN_FILE = os.path.join(TOKENS_DIR, "api_token.json")
 if not os.path.exists(TOKENS_DIR):
     os.makedirs(TOKENS_DIR)
 
-def get_app_access_token(client_id, client_secret):
+# Process-wide token manager, created on first use, and the credentials it was created with
+_token_manager = None
+_token_manager_credentials = None
+
+def request_app_access_token(client_id, client_secret):
     """
-    Requests a new access token using the Client Credentials flow.
+    Requests new token data from the token endpoint using the Client Credentials flow.
     """
     url = "https://id.twitch.tv/oauth2/token"
     payload = {
@@ -23,19 +29,36 @@ def get_app_access_token(client_id, client_secret):
     }
     response = requests.post(url, data=payload)
     if response.status_code == 200:
-        token_data = response.json()
-        token_data["expires_at"] = (datetime.now(UTC) + timedelta(seconds=token_data["expires_in"])).isoformat()
-        save_token(token_data)
-        return token_data["access_token"]
+        return expires_at_from(response.json())
     else:
         raise Exception(f"Failed to get token: {response.status_code}, {response.text}")
 
+def get_token_manager(client_id, client_secret):
+    """
+    Returns the in-memory manager of the app access token. There is one token file, so
+    asking for it with other credentials than the first caller is an error.
+    """
+    global _token_manager, _token_manager_credentials
+    if _token_manager is None:
+        _token_manager = TokenManager(
+            "API", TOKEN_FILE, lambda token_data: request_app_access_token(client_id, client_secret)
+        )
+        _token_manager_credentials = (client_id, client_secret)
+    elif _token_manager_credentials != (client_id, client_secret):
+        raise Exception(f"The API token manager was created for client {_token_manager_credentials[0]}, not {client_id}")
+    return _token_manager
+
+def get_app_access_token(client_id, client_secret):
+    """
+    Requests a new access token using the Client Credentials flow.
+    """
+    return get_token_manager(client_id, client_secret).refresh()["access_token"]
+
 def save_token(token_data):
     """
     Saves the token data to a local file in the tokens directory.
     """
-    with open(TOKEN_FILE, "w") as f:
-        json.dump(token_data, f)
+    write_token_file(TOKEN_FILE, token_data)
     print(f"Token saved to {TOKEN_FILE}")
 
 def load_token():
@@ -59,13 +82,10 @@ def is_token_valid(token_data):
 
 def get_valid_access_token(client_id, client_secret):
     """
-    Returns a valid access token, refreshing it if necessary.
+    Returns a valid access token, refreshing it if necessary. The token is kept in memory,
+    so the token file is only read once per process.
     """
-    token_data = load_token()
-    if token_data and is_token_valid(token_data):
-        return token_data["access_token"]
-    else:
-        return get_app_access_token(client_id, client_secret)
+    return get_token_manager(client_id, client_secret).get_access_token()
 
 def make_twitch_request(client_id, client_secret, endpoint, params=None):
     """
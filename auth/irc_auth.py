@@ -1,42 +1,33 @@
-import requests
-import json
 import os
 import requests
 
+from auth.token_manager import TokenManager
+
 IRC_TOKEN_FILE = os.path.join("tokens", "irc_token.json")
 
-def load_tokens(filename=IRC_TOKEN_FILE):
-    """Load tokens from a JSON file."""
-    if os.path.exists(filename):
-        with open(filename, "r") as file:
-            return json.load(file)
-    return None
-
-def save_tokens(tokens, filename=IRC_TOKEN_FILE):
-    """Save tokens to a JSON file."""
-    directory = os.path.dirname(filename)
-    if not os.path.exists(directory):
-        os.makedirs(directory)  # Create the directory if it doesn't exist
-    with open(filename, "w") as file:
-        json.dump(tokens, file)
-
-def is_token_expired(tokens):
-    """Check if the access token is expired."""
-    from datetime import datetime, timedelta
-    token_age = timedelta(seconds=tokens["expires_in"])
-    token_creation_time = datetime.fromtimestamp(os.path.getmtime(IRC_TOKEN_FILE))
-    return datetime.now() > token_creation_time + token_age
+# Process-wide token manager, created on first use, and the credentials it was created with
+_token_manager = None
+_token_manager_credentials = None
+
+def get_token_manager(client_id, client_secret):
+    """Return the in-memory manager of the IRC user access token, created for the first credentials asked with."""
+    global _token_manager, _token_manager_credentials
+    if _token_manager is None:
+        def refresh(tokens):
+            if tokens is None:
+                raise Exception(f"No IRC token found in {IRC_TOKEN_FILE}; authorize the bot account first.")
+            print("Refreshing access token...")
+            return refresh_user_access_token(client_id, client_secret, tokens["refresh_token"])
+
+        _token_manager = TokenManager("IRC", IRC_TOKEN_FILE, refresh)
+        _token_manager_credentials = (client_id, client_secret)
+    elif _token_manager_credentials != (client_id, client_secret):
+        raise Exception(f"The IRC token manager was created for client {_token_manager_credentials[0]}, not {client_id}")
+    return _token_manager
 
 def get_valid_access_token(client_id, client_secret):
     """Ensure a valid access token by refreshing it if needed."""
-    tokens = load_tokens()
-    if tokens is None or is_token_expired(tokens):
-        # Refresh the token
-        print("Refreshing access token...")
-        refreshed_tokens = refresh_user_access_token(client_id, client_secret, tokens["refresh_token"])
-        save_tokens(refreshed_tokens)
-        return refreshed_tokens["access_token"]
-    return tokens["access_token"]
+    return get_token_manager(client_id, client_secret).get_access_token()
 
 def refresh_user_access_token(client_id, client_secret, refresh_token):
     url = "https://id.twitch.tv/oauth2/token"
@@ -0,0 +1,182 @@
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime, timedelta, UTC
+from threading import Event, Lock, Timer
+
+REFRESH_MARGIN_SECONDS = 300  # Refresh tokens this long before they expire
+
+
+def expires_at_from(token_data):
+    """
+    Adds an absolute ``expires_at`` to a token response that only carries ``expires_in``.
+    """
+    if "expires_at" not in token_data and "expires_in" in token_data:
+        token_data["expires_at"] = (datetime.now(UTC) + timedelta(seconds=token_data["expires_in"])).isoformat()
+    return token_data
+
+
+def write_token_file(token_file, token_data):
+    """
+    Atomically replaces a token file so a crash never leaves a half-written token behind.
+    """
+    directory = os.path.dirname(token_file)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    temp_file = f"{token_file}.tmp"
+    with open(temp_file, "w") as f:
+        json.dump(token_data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_file, token_file)
+
+
+class TokenManager:
+    """
+    Process-wide, in-memory holder of one OAuth token.
+
+    The token file is read once; afterwards callers are served from memory. Refreshes happen
+    in the background ahead of ``expires_at``, concurrent callers that find the token expired
+    share a single in-flight refresh, and the file is rewritten only when the token changes.
+    """
+
+    def __init__(self, name, token_file, fetch_token, refresh_margin=REFRESH_MARGIN_SECONDS):
+        self.name = name
+        self.token_file = token_file
+        self.fetch_token = fetch_token  # Called with the current token data, returns new token data
+        self.refresh_margin = refresh_margin
+
+        self._lock = Lock()
+        self._token_data = None
+        self._loaded = False
+        self._refresh_done = None  # Event of the in-flight refresh, if any
+        self._refresh_error = None
+        self._timer = None
+        self._endpoint_hits = deque()
+        self.total_endpoint_hits = 0
+
+    def _load(self):
+        if os.path.exists(self.token_file):
+            with open(self.token_file, "r") as f:
+                token_data = json.load(f)
+            if "expires_at" not in token_data and "expires_in" in token_data:
+                # Older token files only carry expires_in, counted from when the file was written
+                written_at = datetime.fromtimestamp(os.path.getmtime(self.token_file), UTC)
+                token_data["expires_at"] = (written_at + timedelta(seconds=token_data["expires_in"])).isoformat()
+            self._token_data = token_data
+        self._loaded = True
+
+    def _seconds_left(self, token_data):
+        if not token_data or "expires_at" not in token_data:
+            return 0
+        return (datetime.fromisoformat(token_data["expires_at"]) - datetime.now(UTC)).total_seconds()
+
+    def token_data(self):
+        """
+        Returns the current token data, loading it from disk on first use.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            return self._token_data
+
+    def get_access_token(self):
+        """
+        Returns a valid access token, refreshing it only if it has expired.
+        """
+        token_data = self.token_data()
+        if self._seconds_left(token_data) > 0:
+            self._schedule_refresh(token_data, only_if_unscheduled=True)
+            return token_data["access_token"]
+        return self.refresh(only_if_expired=True)["access_token"]
+
+    def refresh(self, only_if_expired=False):
+        """
+        Fetches a new token. Callers arriving while a refresh is in flight wait for its result.
+        """
+        with self._lock:
+            in_flight = self._refresh_done
+            if in_flight is None:
+                # Each round reports its own outcome, not the failure of an earlier one
+                self._refresh_done = in_flight = Event()
+                self._refresh_error = None
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            in_flight.wait()
+            with self._lock:
+                if self._refresh_error is not None:
+                    raise self._refresh_error
+                return self._token_data
+
+        try:
+            # Another caller may have refreshed between our expiry check and taking the lead
+            if only_if_expired and self._seconds_left(self._token_data) > 0:
+                return self._token_data
+            self._record_endpoint_hit()
+            token_data = expires_at_from(self.fetch_token(self._token_data))
+            with self._lock:
+                changed = token_data != self._token_data
+                self._token_data = token_data
+                self._refresh_error = None
+            if changed:
+                write_token_file(self.token_file, token_data)
+            self._schedule_refresh(token_data)
+            return token_data
+        except Exception as e:
+            with self._lock:
+                self._refresh_error = e
+            raise
+        finally:
+            with self._lock:
+                self._refresh_done = None
+            in_flight.set()
+
+    def _schedule_refresh(self, token_data, delay=None, only_if_unscheduled=False):
+        # The check and the swap happen under the lock, so concurrent callers schedule one timer,
+        # and callers finding one already scheduled return before building another
+        with self._lock:
+            if self._timer is not None:
+                if only_if_unscheduled:
+                    return
+                self._timer.cancel()
+            if delay is None:
+                delay = max(self._seconds_left(token_data) - self.refresh_margin, 0)
+            timer = Timer(delay, self._background_refresh)
+            timer.daemon = True
+            self._timer = timer
+        timer.start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+            print(f"Refreshed {self.name} token in the background "
+                  f"({self.endpoint_hits_per_hour()} token endpoint hits in the last hour).")
+        except Exception as e:
+            print(f"Background refresh of {self.name} token failed: {e}")
+            # Try again shortly rather than waiting for a caller to hit an expired token
+            self._schedule_refresh(None, delay=60)
+
+    def start_background_refresh(self):
+        """
+        Schedules proactive refreshes from the token currently on disk or in memory.
+        """
+        self._schedule_refresh(self.token_data())
+
+    def _record_endpoint_hit(self):
+        with self._lock:
+            self._endpoint_hits.append(time.monotonic())
+            self.total_endpoint_hits += 1
+
+    def endpoint_hits_per_hour(self):
+        """
+        Number of token endpoint requests made in the last hour.
+        """
+        with self._lock:
+            cutoff = time.monotonic() - 3600
+            while self._endpoint_hits and self._endpoint_hits[0] < cutoff:
+                self._endpoint_hits.popleft()
+            return len(self._endpoint_hits)
@@ -0,0 +1,78 @@
+"""
+Compares the subscriber statistics of the chat analysis computed with per-message string
+checks on the designations, as before, against integer tests on badge codes.
+
+Designations include a sub-gifter badge ahead of the subscriber badge, whose version the
+string parse took for the subscribed months, a tier 2 badge and a founder badge. Run from the
+repository root:
+
+    python -m benchmarks.badges_bench [messages]
+"""
+import random
+import sys
+import time
+
+from helper_functions.badges import GIFTER_MASK, SUB_MONTHS_MASK, SUBSCRIBER, chat_badge_code, designation_code
+
+DESIGNATIONS = ["none", "subscriber/12, sub-gifter/5", "sub-gifter/50, subscriber/3", "subscriber/3",
+                "premium/1", "bits/100", "subscriber/2006, bits/1000", "subscriber/0", "founder/0"]
+
+
+def string_statistics(chat_logs):
+    subscribers = six_plus = gifters = 0
+    for chat in chat_logs:
+        designations = chat["designations"]
+        if "subscriber" in designations:
+            subscribers += 1
+            sub_duration = int(designations.split("/")[1].split(",")[0]) if "/" in designations else 0
+            if sub_duration >= 6:
+                six_plus += 1
+            if "sub-gifter" in designations:
+                gifters += 1
+    return subscribers, six_plus, gifters
+
+
+def code_statistics(chat_logs):
+    subscribers = six_plus = gifters = 0
+    for chat in chat_logs:
+        code = chat_badge_code(chat)
+        if code & SUBSCRIBER:
+            subscribers += 1
+            if (code & SUB_MONTHS_MASK) >= 6:
+                six_plus += 1
+            if code & GIFTER_MASK:
+                gifters += 1
+    return subscribers, six_plus, gifters
+
+
+def timed(function, chat_logs):
+    started = time.perf_counter()
+    result = function(chat_logs)
+    return result, time.perf_counter() - started
+
+
+def run(messages=1_000_000):
+    rng = random.Random(7)
+    legacy = [{"username": f"user{rng.randrange(5000)}", "designations": rng.choice(DESIGNATIONS)}
+              for _ in range(messages)]
+    coded = [dict(chat, badge_code=designation_code(chat["designations"])) for chat in legacy]
+
+    rows = [
+        ("string checks (before)", string_statistics, legacy),
+        ("designation codes", code_statistics, legacy),
+        ("stored badge codes", code_statistics, coded),
+    ]
+    print(f"{messages:,} messages; (subscribers, 6+ months, sub-gifters)")
+    for label, function, chat_logs in rows:
+        result, seconds = timed(function, chat_logs)
+        print(f"  {label:<24} {seconds:6.3f}s  {messages / seconds:12,.0f} messages/s  {result}")
+
+    for designations in DESIGNATIONS:
+        before = string_statistics([{"designations": designations}])
+        after = code_statistics([{"designations": designations}])
+        if before != after:
+            print(f"  {designations!r}: {before} before, {after} now")
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:2]))
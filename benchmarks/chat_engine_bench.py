@@ -0,0 +1,58 @@
+"""
+Measures how many messages per second one core of the asyncio chat engine can ingest.
+
+The fake IRC server runs in a separate process so the engine has its core to itself.
+Run from the repository root:
+
+    python -m benchmarks.chat_engine_bench [channels] [messages_per_channel]
+"""
+import asyncio
+import multiprocessing
+import sys
+import time
+
+from benchmarks.fake_irc_server import FakeIrcServer
+from helper_functions.chat_engine import ChatEngine, JoinRateLimiter
+
+CHANNELS_PER_CONNECTION = 100
+
+
+def serve_forever(port_queue, channels_per_connection, messages_per_channel):
+    async def main():
+        fake_server = FakeIrcServer(messages_per_channel, expected_joins=channels_per_connection)
+        server = await fake_server.serve()
+        port_queue.put(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+    asyncio.run(main())
+
+
+def run(channel_count=500, messages_per_channel=1000):
+    channels = [f"channel{index:04d}" for index in range(channel_count)]
+    port_queue = multiprocessing.Queue()
+    server_process = multiprocessing.Process(
+        target=serve_forever, args=(port_queue, min(CHANNELS_PER_CONNECTION, channel_count), messages_per_channel),
+        daemon=True
+    )
+    server_process.start()
+    port = port_queue.get(timeout=10)
+
+    # The fake server does not enforce Twitch's JOIN limits
+    engine = ChatEngine(
+        "testbot", channels, oauth_token="benchmark", host="127.0.0.1", port=port, tls=False,
+        channels_per_connection=CHANNELS_PER_CONNECTION, join_limiter=JoinRateLimiter(limit=10**9),
+        echo=False, flush=False, reconnect=False
+    )
+    started = time.perf_counter()
+    asyncio.run(engine.run())
+    elapsed = time.perf_counter() - started
+    server_process.terminate()
+
+    received = sum(aggregator.interval_buffer.stats()["total_messages"] for aggregator in engine.aggregators.values())
+    print(f"Channels: {channel_count}, connections: {len(engine.connections)}")
+    print(f"Messages: {received:,} in {elapsed:.2f}s -> {received / elapsed:,.0f} messages/s")
+    return received / elapsed
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:3]))
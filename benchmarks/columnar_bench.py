@@ -0,0 +1,56 @@
+"""
+Compares analysis of the same synthetic logs through the NDJSON chat log store and through
+the columnar store with the vectorized path.
+
+Run from the repository root:
+
+    python -m benchmarks.columnar_bench [periods] [messages_per_period]
+
+The defaults approximate a month of a busy channel: 4320 ten-minute intervals.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from analysis.chat_analysis import extended_analyze_chat_logs, iter_chat_logs
+from benchmarks.sketch_bench import synthetic_intervals
+from helper_functions.chat_store import ChatLogStore
+from helper_functions.columnar_store import append_interval_columns, load_columns
+
+
+def run(periods=4320, messages_per_period=300, users=50_000):
+    with tempfile.TemporaryDirectory() as directory:
+        store_dir = os.path.join(directory, "bench_chat_log")
+        columns_dir = os.path.join(directory, "bench_chat_columns")
+
+        started = time.perf_counter()
+        store = ChatLogStore(store_dir)
+        for interval_data in synthetic_intervals(periods, messages_per_period, users):
+            interval_data["special_events"] = [
+                {"timestamp": interval_data["start_time"], "username": "gifter", "designations": "",
+                 "event_type": "submysterygift", "gift_count": "5"},
+                {"timestamp": interval_data["start_time"], "username": "gifter", "designations": "",
+                 "event_type": "subgift", "recipient": "someone"},
+            ]
+            for chat in interval_data["chat_logs"]:
+                chat["timestamp"] = interval_data["start_time"]
+            store.append(interval_data)
+            append_interval_columns("bench", interval_data, columns_dir)
+        print(f"Wrote {periods} intervals x {messages_per_period} messages in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        ndjson_result = extended_analyze_chat_logs(iter_chat_logs(store_dir))
+        ndjson_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        columnar_result = extended_analyze_chat_logs(load_columns(columns_dir))
+        columnar_seconds = time.perf_counter() - started
+
+    print(f"NDJSON + per-message loop: {ndjson_seconds:6.2f}s")
+    print(f"Columnar + vectorized:     {columnar_seconds:6.2f}s ({ndjson_seconds / columnar_seconds:.1f}x)")
+    print(f"Results identical: {ndjson_result == columnar_result}")
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:3]))
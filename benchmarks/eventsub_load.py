@@ -0,0 +1,198 @@
+"""
+Load test for the EventSub webhook receiver with a local signer.
+
+Fires signed notifications (with Twitch-style retries and a few stale messages mixed in) at
+the ASGI app, first by calling it in-process to check the counts, then over HTTP against
+uvicorn in a separate process when uvicorn is installed. Run from the repository root:
+
+    python -m benchmarks.eventsub_load [requests] [connections]
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import multiprocessing
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, UTC
+
+from eventsub.event_counters import EventCounters
+from eventsub.eventsub_asgi import EventSubReceiver, create_app
+
+SECRET = "benchmark-secret"
+CHANNELS = [str(100000 + index) for index in range(50)]
+EVENT_TYPES = ["channel.subscribe", "channel.follow"]
+RETRY_RATE = 0.05
+STALE_RATE = 0.01
+
+
+def sign(secret, message_id, timestamp, body):
+    digest = hmac.new(secret.encode(), (message_id + timestamp).encode() + body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def signed_request(rng, secret=SECRET):
+    """
+    Returns (headers, body, broadcaster_user_id, event_type, is_stale) for one notification.
+    """
+    broadcaster_user_id, event_type = rng.choice(CHANNELS), rng.choice(EVENT_TYPES)
+    is_stale = rng.random() < STALE_RATE
+    sent_at = datetime.now(UTC) - timedelta(minutes=30 if is_stale else 0)
+    timestamp = sent_at.strftime('%Y-%m-%dT%H:%M:%S.%f') + "123Z"
+    message_id = str(uuid.UUID(int=rng.getrandbits(128)))
+    body = json.dumps({
+        "subscription": {"type": event_type, "version": "1", "condition": {"broadcaster_user_id": broadcaster_user_id}},
+        "event": {"broadcaster_user_id": broadcaster_user_id, "user_name": f"user{rng.randrange(10**6)}"}
+    }).encode()
+    headers = {
+        "twitch-eventsub-message-id": message_id,
+        "twitch-eventsub-message-timestamp": timestamp,
+        "twitch-eventsub-message-signature": sign(secret, message_id, timestamp, body),
+        "twitch-eventsub-message-type": "notification",
+    }
+    return headers, body, broadcaster_user_id, event_type, is_stale
+
+
+def build_requests(count, seed=1):
+    """
+    Builds count requests, where a fraction repeat an earlier request as a Twitch retry would.
+    Returns the requests and the expected per-channel counts.
+    """
+    rng = random.Random(seed)
+    requests, expected = [], {}
+    while len(requests) < count:
+        if requests and rng.random() < RETRY_RATE:
+            requests.append(rng.choice(requests))
+            continue
+        headers, body, broadcaster_user_id, event_type, is_stale = signed_request(rng)
+        requests.append((headers, body))
+        if not is_stale:
+            key = (broadcaster_user_id, event_type)
+            expected[key] = expected.get(key, 0) + 1
+    return requests, expected
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(label, latencies, elapsed):
+    print(f"{label}: {len(latencies):,} requests in {elapsed:.2f}s -> {len(latencies) / elapsed:,.0f} requests/s, "
+          f"ack p50 {percentile(latencies, 0.5) * 1000:.2f}ms p99 {percentile(latencies, 0.99) * 1000:.2f}ms")
+
+
+async def run_in_process(requests):
+    counters = EventCounters()
+    app = create_app(EventSubReceiver(SECRET, counters), echo=False)
+    latencies = []
+
+    async def call(headers, body):
+        scope = {
+            "type": "http", "method": "POST", "path": "/webhook",
+            "headers": [(name.encode(), value.encode()) for name, value in headers.items()]
+        }
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def receive():
+            return messages.pop()
+
+        async def send(message):
+            pass
+
+        started = time.perf_counter()
+        await app(scope, receive, send)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for headers, body in requests:
+        await call(headers, body)
+        await asyncio.sleep(0)  # A server yields between requests, which lets the consumer run
+    elapsed = time.perf_counter() - started
+    await asyncio.sleep(0.1)  # Let the consumer drain the queue
+    return counters, app.receiver.stats, latencies, elapsed
+
+
+def serve(port):
+    import uvicorn
+
+    uvicorn.run(create_app(EventSubReceiver(SECRET), echo=False), port=port, log_level="warning")
+
+
+async def post_all(port, requests, connections):
+    """
+    Posts the requests over keep-alive HTTP/1.1 connections and returns the latencies and statuses.
+    """
+    latencies, statuses = [], {}
+    queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+
+    async def worker():
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        while not queue.empty():
+            headers, body = queue.get_nowait()
+            head = "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+            started = time.perf_counter()
+            writer.write(
+                f"POST /webhook HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n{head}\r\n".encode() + body
+            )
+            status = int((await reader.readline()).split()[1])
+            content_length = 0
+            while (line := await reader.readline()) != b"\r\n":
+                if line.lower().startswith(b"content-length:"):
+                    content_length = int(line.split(b":")[1])
+            await reader.readexactly(content_length)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+        writer.close()
+
+    await asyncio.gather(*(worker() for _ in range(connections)))
+    return latencies, statuses
+
+
+def run_http(requests, connections, port=5099):
+    server_process = multiprocessing.Process(target=serve, args=(port,), daemon=True)
+    server_process.start()
+    for _ in range(100):
+        try:
+            asyncio.run(asyncio.wait_for(asyncio.open_connection("127.0.0.1", port), 1))
+            break
+        except OSError:
+            time.sleep(0.1)
+
+    started = time.perf_counter()
+    latencies, statuses = asyncio.run(post_all(port, requests, connections))
+    elapsed = time.perf_counter() - started
+    server_process.terminate()
+    report(f"HTTP, uvicorn, {connections} connections", latencies, elapsed)
+    print(f"Statuses: {dict(sorted(statuses.items()))}")
+
+
+def run(request_count=20_000, connections=8):
+    requests, expected = build_requests(request_count)
+
+    counters, stats, latencies, elapsed = asyncio.run(run_in_process(requests))
+    report("In-process ASGI", latencies, elapsed)
+    counted = {}
+    for broadcaster_user_id in CHANNELS:
+        totals = counters.get_and_reset(broadcaster_user_id)
+        for event_type, counter in (("channel.subscribe", "subscribers"), ("channel.follow", "followers")):
+            if totals[counter]:
+                counted[(broadcaster_user_id, event_type)] = totals[counter]
+    print(f"Receiver: {stats}")
+    print(f"Counts match unique, fresh notifications: {counted == expected}")
+
+    try:
+        import uvicorn  # noqa: F401
+    except ImportError:
+        print("uvicorn is not installed; skipping the HTTP run")
+        return
+    run_http(requests, connections)
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:3]))
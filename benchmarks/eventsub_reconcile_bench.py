@@ -0,0 +1,63 @@
+"""
+Reconciles the EventSub subscriptions of thousands of channels against the local Helix stub.
+
+The stub starts with most subscriptions in place and some missing, revoked or duplicated,
+as after a restart. It enforces Helix's 800 points per minute, so a fully empty account
+would take minutes whatever the client does. Run from the repository root:
+
+    python -m benchmarks.eventsub_reconcile_bench [channels] [latency_ms] [points_per_minute]
+"""
+import random
+import sys
+
+from benchmarks.fake_helix_server import FakeHelix
+from benchmarks.support import StaticToken
+from eventsub.eventsub_api import required_subscriptions
+from eventsub.eventsub_reconciler import EventSubReconciler, subscription_key
+
+TRANSPORT = {"method": "webhook", "callback": "https://example.com/webhook"}
+
+
+def run(channel_count=2000, latency_ms=20, points=800, seed=1):
+    rng = random.Random(seed)
+    helix = FakeHelix(points=points, window_seconds=60, latency=latency_ms / 1000)
+    required = [
+        subscription for index in range(channel_count)
+        for subscription in required_subscriptions(str(300000 + index))
+    ]
+    for subscription in required:
+        roll = rng.random()
+        if roll < 0.93:
+            helix.add(subscription["type"], subscription["condition"], TRANSPORT)
+        elif roll < 0.96:
+            helix.add(subscription["type"], subscription["condition"], TRANSPORT, status="authorization_revoked")
+        elif roll < 0.97:
+            helix.add(subscription["type"], subscription["condition"], TRANSPORT)
+            helix.add(subscription["type"], subscription["condition"], TRANSPORT)
+    server = helix.serve()
+    before = len(helix.subscriptions)
+
+    reconciler = EventSubReconciler(
+        "benchmark", "benchmark", base_url=f"http://127.0.0.1:{server.server_address[1]}", token_manager=StaticToken()
+    )
+    result = reconciler.reconcile(required, TRANSPORT)
+
+    enabled = {
+        subscription_key(s["type"], s["condition"], s["transport"])
+        for s in helix.subscriptions.values() if s["status"] == "enabled"
+    }
+    wanted = {subscription_key(s["type"], s["condition"], TRANSPORT) for s in required}
+    print(f"{channel_count} channels, {len(required)} required subscriptions, {before} existing before, "
+          f"{len(helix.subscriptions)} after, {latency_ms}ms per request")
+    print(f"Reconciled in {result['seconds']}s with {result['requests']} requests ({helix.requests['429']} rate limited)")
+    print(f"All required subscriptions enabled, nothing failed or duplicated: "
+          f"{enabled == wanted and len(helix.subscriptions) == len(wanted)}")
+
+    # A second pass only has to read the pages
+    result = reconciler.reconcile(required, TRANSPORT)
+    print(f"Second pass: {result['created']} created, {result['deleted']} deleted in {result['seconds']}s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:4]))
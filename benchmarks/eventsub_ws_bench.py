@@ -0,0 +1,75 @@
+"""
+Runs the EventSub WebSocket client against the local fake EventSub server and checks that
+every notification is counted once across a session_reconnect, reporting delivery latency.
+
+Run from the repository root:
+
+    python -m benchmarks.eventsub_ws_bench [notifications] [notifications_per_second]
+
+A rate of 0 sends as fast as possible, which measures throughput rather than latency.
+"""
+import asyncio
+import sys
+import time
+
+from benchmarks.eventsub_load import percentile
+from benchmarks.fake_eventsub_server import FakeEventSubServer
+from eventsub.event_counters import COUNTED_EVENTS, EventCounters
+from eventsub.eventsub_asgi import EventSubReceiver
+from eventsub.eventsub_websocket import EventSubWebSocket
+
+CHANNELS = [str(200000 + index) for index in range(20)]
+
+
+class TimingReceiver(EventSubReceiver):
+    def __init__(self):
+        super().__init__("unused", EventCounters())
+        self.latencies = []
+
+    def process(self, notification, echo=True):
+        self.latencies.append(time.perf_counter() - notification["event"]["sent_at"])
+        super().process(notification, echo)
+
+
+async def main(notification_count, rate):
+    fake_server = FakeEventSubServer(CHANNELS, notification_count, reconnect_after=notification_count // 2,
+                                     rate=rate or None)
+    server = await fake_server.serve()
+    receiver = TimingReceiver()
+    subscribed = []
+    client = EventSubWebSocket(
+        [{"type": event_type, "condition": {"broadcaster_user_id": channel}} for channel in CHANNELS for event_type in COUNTED_EVENTS],
+        subscribe=lambda session_id, subscriptions: subscribed.append(session_id),
+        url=f"ws://127.0.0.1:{fake_server.port}/ws", receiver=receiver, echo=False
+    )
+
+    started = time.perf_counter()
+    task = asyncio.create_task(client.run())
+    while client.stats["notifications"] < notification_count and time.perf_counter() - started < 60:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    client.stop()
+    task.cancel()
+    server.close()
+
+    counted = {}
+    for channel in CHANNELS:
+        totals = receiver.counters.get_and_reset(channel)
+        for event_type, counter in COUNTED_EVENTS.items():
+            if totals[counter]:
+                counted[(channel, event_type)] = totals[counter]
+
+    latencies = receiver.latencies
+    print(f"{client.stats['notifications']:,} notifications in {elapsed:.2f}s -> "
+          f"{client.stats['notifications'] / elapsed:,.0f}/s, latency p50 {percentile(latencies, 0.5) * 1000:.2f}ms "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f}ms")
+    print(f"Client: {client.stats}, subscribed sessions: {len(subscribed)}")
+    print(f"Counts match unique notifications: {counted == fake_server.expected}")
+
+
+def run(notification_count=10_000, rate=2_000):
+    asyncio.run(main(notification_count, rate))
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,118 @@
+"""
+Local stand-in for the EventSub WebSocket service used by the benchmarks.
+
+Welcomes every connection with a new session, streams synthetic notifications, sends a
+session_reconnect part-way through (the client moves to a second URL on the same server,
+while the old connection keeps delivering until it is closed) and a few duplicate deliveries, then keeps the session alive with keepalives.
+"""
+import asyncio
+import json
+import random
+import time
+import uuid
+from datetime import datetime, UTC
+
+import websockets
+
+EVENT_TYPES = ["channel.subscribe", "channel.follow", "stream.online"]
+
+
+def message(message_type, payload, subscription_type=None, message_id=None):
+    metadata = {
+        "message_id": message_id or str(uuid.uuid4()),
+        "message_type": message_type,
+        "message_timestamp": datetime.now(UTC).strftime('%Y-%m-%dT%H:%M:%S.%f') + "000Z",
+    }
+    if subscription_type:
+        metadata["subscription_type"] = subscription_type
+        metadata["subscription_version"] = "1"
+    return {"metadata": metadata, "payload": payload}
+
+
+def notification(broadcaster_user_id, event_type, rng):
+    event = {
+        "broadcaster_user_id": broadcaster_user_id,
+        "user_name": f"user{rng.randrange(10**6)}",
+        "sent_at": time.perf_counter(),  # Lets the benchmark measure delivery latency
+    }
+    payload = {
+        "subscription": {"type": event_type, "version": "1", "condition": {"broadcaster_user_id": broadcaster_user_id}},
+        "event": event
+    }
+    return message("notification", payload, event_type)
+
+
+class FakeEventSubServer:
+    """
+    Sends ``notification_count`` notifications for ``channels``, moving the client to a new
+    connection after ``reconnect_after`` of them and repeating every ``duplicate_every``-th one.
+    ``rate`` paces the notifications per second; None sends them as fast as possible. After
+    the session_reconnect, ``reconnect_overlap`` more notifications go out on the old
+    connection while the new one waits ``welcome_delay`` seconds for its welcome, as Twitch
+    keeps using the old connection until the new session is up.
+    """
+
+    def __init__(self, channels, notification_count=10_000, reconnect_after=5_000, duplicate_every=100,
+                 keepalive_seconds=10, rate=None, seed=1, reconnect_overlap=0, welcome_delay=0):
+        self.channels = channels
+        self.notification_count = notification_count
+        self.reconnect_after = reconnect_after
+        self.duplicate_every = duplicate_every
+        self.keepalive_seconds = keepalive_seconds
+        self.rate = rate
+        self.reconnect_overlap = reconnect_overlap
+        self.welcome_delay = welcome_delay
+        self.rng = random.Random(seed)
+        self.port = None
+        self.sent = 0
+        self.expected = {}  # (broadcaster_user_id, event type) -> unique notifications sent
+        self.sessions = 0
+
+    async def send_notification(self, websocket):
+        broadcaster_user_id, event_type = self.rng.choice(self.channels), self.rng.choice(EVENT_TYPES)
+        sent = notification(broadcaster_user_id, event_type, self.rng)
+        await websocket.send(json.dumps(sent))
+        if self.duplicate_every and self.sent % self.duplicate_every == 0:
+            await websocket.send(json.dumps(sent))
+        key = (broadcaster_user_id, event_type)
+        self.expected[key] = self.expected.get(key, 0) + 1
+        self.sent += 1
+
+    async def handle(self, websocket):
+        self.sessions += 1
+        if websocket.request.path == "/reconnect":
+            await asyncio.sleep(self.welcome_delay)
+        session = {
+            "id": str(uuid.uuid4()),
+            "status": "connected",
+            "keepalive_timeout_seconds": self.keepalive_seconds,
+            "reconnect_url": None,
+            "connected_at": datetime.now(UTC).isoformat()
+        }
+        await websocket.send(json.dumps(message("session_welcome", {"session": session})))
+
+        started, sent_before = time.perf_counter(), self.sent
+        try:
+            while self.sent < self.notification_count:
+                if self.rate:
+                    await asyncio.sleep(max(0, started + (self.sent - sent_before) / self.rate - time.perf_counter()))
+                if self.sent == self.reconnect_after and websocket.request.path != "/reconnect":
+                    reconnect = dict(session, status="reconnecting",
+                                     reconnect_url=f"ws://127.0.0.1:{self.port}/reconnect")
+                    await websocket.send(json.dumps(message("session_reconnect", {"session": reconnect})))
+                    for _ in range(self.reconnect_overlap):
+                        await self.send_notification(websocket)
+                    await websocket.wait_closed()
+                    return
+                await self.send_notification(websocket)
+
+            while True:
+                await asyncio.sleep(self.keepalive_seconds / 2)
+                await websocket.send(json.dumps(message("session_keepalive", {})))
+        except websockets.ConnectionClosed:
+            pass
+
+    async def serve(self, host="127.0.0.1", port=0):
+        server = await websockets.serve(self.handle, host, port)
+        self.port = server.sockets[0].getsockname()[1]
+        return server
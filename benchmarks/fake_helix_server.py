@@ -0,0 +1,149 @@
+"""
+Local stand-in for the Helix endpoints used by the benchmarks and tests.
+
+Serves GET (paginated, at most 100 per page), POST and DELETE on /eventsub/subscriptions
+and GET on /streams from memory, with Twitch's rate-limit headers and 429s once the points
+bucket is empty.
+"""
+import json
+import math
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PAGE_SIZE = 100
+
+
+class FakeHelix:
+    """
+    In-memory subscriptions and a token bucket of ``points`` refilled every ``window_seconds``.
+    ``latency`` adds a delay to every request, like the round trip to Twitch.
+    """
+
+    def __init__(self, points=800, window_seconds=60, latency=0.0):
+        self.points = points
+        self.window_seconds = window_seconds
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.subscriptions = {}  # id -> subscription, in creation order
+        self.keys = {}  # (type, condition, transport) as JSON -> number of subscriptions with it
+        self.remaining = points
+        self.reset = time.time() + window_seconds
+        self.requests = {"GET": 0, "POST": 0, "DELETE": 0, "429": 0, "streams": 0, "401": 0}
+        self.streams = {}  # Login of a live channel -> viewer count
+        self.unauthorized = 0  # Requests still to be answered with a 401, like an expired token
+
+    @staticmethod
+    def key(event_type, condition, transport):
+        return json.dumps([event_type, condition, transport], sort_keys=True)
+
+    def add(self, event_type, condition, transport, status="enabled"):
+        key = self.key(event_type, condition, transport)
+        self.keys[key] = self.keys.get(key, 0) + 1
+        subscription_id = str(uuid.uuid4())
+        self.subscriptions[subscription_id] = {
+            "id": subscription_id, "status": status, "type": event_type, "version": "1",
+            "condition": condition, "transport": transport, "created_at": "2024-01-01T00:00:00Z", "cost": 1
+        }
+        return subscription_id
+
+    def take_point(self):
+        with self.lock:
+            now = time.time()
+            if now >= self.reset:
+                self.remaining, self.reset = self.points, now + self.window_seconds
+            if self.remaining <= 0:
+                self.requests["429"] += 1
+                return False
+            self.remaining -= 1
+            return True
+
+    def handler(self):
+        helix = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # Headers and body are separate writes
+
+            def log_message(self, format, *args):
+                pass
+
+            def reply(self, status, body=None):
+                data = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("Ratelimit-Limit", str(helix.points))
+                self.send_header("Ratelimit-Remaining", str(max(helix.remaining, 0)))
+                # Whole seconds, rounded up so a client waiting until then finds the bucket refilled
+                self.send_header("Ratelimit-Reset", str(math.ceil(helix.reset)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def handle_method(self, method):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if helix.latency:
+                    time.sleep(helix.latency)
+                if url.path not in ("/eventsub/subscriptions", "/streams"):
+                    return self.reply(404, {"message": "not found"})
+                with helix.lock:
+                    if helix.unauthorized:
+                        helix.unauthorized -= 1
+                        helix.requests["401"] += 1
+                        return self.reply(401, {"message": "Invalid OAuth token"})
+                if not helix.take_point():
+                    return self.reply(429, {"message": "Too Many Requests"})
+                if url.path == "/streams":
+                    logins = query.get("user_login", [])
+                    if method != "GET" or len(logins) > PAGE_SIZE:
+                        return self.reply(400, {"message": "bad request"})
+                    helix.requests["streams"] += 1
+                    with helix.lock:
+                        data = [{"user_login": login, "viewer_count": helix.streams[login.lower()], "type": "live"}
+                                for login in logins if login.lower() in helix.streams]
+                    return self.reply(200, {"data": data, "pagination": {}})
+                helix.requests[method] += 1
+
+                with helix.lock:
+                    if method == "GET":
+                        ids = list(helix.subscriptions)
+                        start = int(query.get("after", ["0"])[0])
+                        first = min(int(query.get("first", [PAGE_SIZE])[0]), PAGE_SIZE)
+                        page = [helix.subscriptions[i] for i in ids[start:start + first]]
+                        pagination = {"cursor": str(start + first)} if start + first < len(ids) else {}
+                        return self.reply(200, {"data": page, "total": len(ids), "pagination": pagination})
+                    if method == "POST":
+                        request = json.loads(body)
+                        if helix.keys.get(helix.key(request["type"], request["condition"], request["transport"])):
+                            return self.reply(409, {"message": "subscription already exists"})
+                        subscription_id = helix.add(request["type"], request["condition"], request["transport"])
+                        return self.reply(202, {"data": [helix.subscriptions[subscription_id]]})
+                    removed = helix.subscriptions.pop(query.get("id", [""])[0], None)
+                    if removed is None:
+                        return self.reply(404, {"message": "not found"})
+                    helix.keys[helix.key(removed["type"], removed["condition"], removed["transport"])] -= 1
+                    return self.reply(204)
+
+            def do_GET(self):
+                self.handle_method("GET")
+
+            def do_POST(self):
+                self.handle_method("POST")
+
+            def do_DELETE(self):
+                self.handle_method("DELETE")
+
+        return Handler
+
+    def serve(self, host="127.0.0.1", port=0):
+        """
+        Starts the server in a daemon thread and returns it; its base URL is ``http://host:port``.
+        """
+        server = ThreadingHTTPServer((host, port), self.handler())
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -0,0 +1,159 @@
+"""
+Local stand-in for Twitch IRC used by the benchmarks.
+
+Accepts connections, answers the handshake and, once a connection has JOINed its channels,
+streams synthetic PRIVMSG traffic for those channels, or replays a recorded connection, and
+closes the connection.
+"""
+import asyncio
+import random
+import time
+
+USERNAMES = ["norafan42", "pixelmuse", "kappa_lord", "zerocool", "moonbeam_tv", "sirchats", "lurkmaster", "bluejay77"]
+BADGES = ["subscriber/12,sub-gifter/5", "subscriber/3", "premium/1", "bits/1000", "", "moderator/1,subscriber/24"]
+MESSAGES = ["LUL that was close", "PogChamp PogChamp", "gg", "hello chat!", "this song slaps", "Kappa"]
+
+
+def synthetic_privmsg(channel, index, rng=random):
+    """
+    Builds one tagged PRIVMSG line in Twitch's wire format.
+    """
+    user = rng.choice(USERNAMES)
+    return (
+        f"@badge-info=;badges={rng.choice(BADGES)};color=#1E90FF;display-name={user};emotes=;first-msg=0;"
+        f"flags=;id=00000000-0000-0000-0000-{index:012d};mod=0;room-id=1;subscriber=0;"
+        f"tmi-sent-ts=1700000000000;turbo=0;user-id=1;user-type= "
+        f":{user}!{user}@{user}.tmi.twitch.tv PRIVMSG #{channel} :{rng.choice(MESSAGES)}\r\n"
+    )
+
+
+class FakeIrcServer:
+    """
+    Sends ``messages_per_channel`` lines for every channel a connection JOINs, in chunks of
+    ``chunk_lines`` lines, then closes the connection.
+    """
+
+    def __init__(self, messages_per_channel=1000, chunk_lines=500, expected_joins=None, seed=1):
+        self.messages_per_channel = messages_per_channel
+        self.chunk_lines = chunk_lines
+        self.expected_joins = expected_joins
+        self.rng = random.Random(seed)
+        self.lines_sent = 0
+
+    async def handle(self, reader, writer):
+        writer.write(b":tmi.twitch.tv 001 testbot :Welcome, GLHF!\r\n")
+        channels = []
+        while self.expected_joins is None or len(channels) < self.expected_joins:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.startswith(b"JOIN #"):
+                channels.append(line[6:].strip().decode('utf-8'))
+                if self.expected_joins is None:
+                    break
+
+        # Interleave channels the way a busy shared connection would
+        chunk = []
+        for index in range(self.messages_per_channel):
+            for channel in channels:
+                chunk.append(synthetic_privmsg(channel, index, self.rng))
+                if len(chunk) >= self.chunk_lines:
+                    writer.write("".join(chunk).encode('utf-8'))
+                    self.lines_sent += len(chunk)
+                    chunk = []
+                    await writer.drain()
+        if chunk:
+            writer.write("".join(chunk).encode('utf-8'))
+            self.lines_sent += len(chunk)
+        await writer.drain()
+        writer.close()
+
+    async def serve(self, host="127.0.0.1", port=0):
+        """
+        Starts listening and returns the asyncio server.
+        """
+        return await asyncio.start_server(self.handle, host, port)
+
+
+def synthetic_recording(lines, seconds=30, rate=300, burst_every=10, burst_seconds=2, burst_factor=5,
+                        chunk_ms=5, seed=1):
+    """
+    Builds a recording in the shape of ``read_recording`` chunks from a corpus of lines, for
+    offline runs without a real capture: Poisson arrivals at ``rate`` lines per second, raised
+    ``burst_factor`` times for ``burst_seconds`` every ``burst_every`` seconds, with the lines
+    of each ``chunk_ms`` window arriving as one read.
+    """
+    rng = random.Random(seed)
+    chunk_seconds = chunk_ms / 1000
+    chunks, chunk, window = [], [], 0
+    arrival, index = 0.0, 0
+    while True:
+        burst = arrival % burst_every < burst_seconds
+        arrival += rng.expovariate(rate * (burst_factor if burst else 1))
+        if arrival >= seconds:
+            break
+        if int(arrival / chunk_seconds) != window:
+            if chunk:
+                chunks.append((int(window * chunk_seconds * 1e9), "".join(chunk).encode('utf-8')))
+                chunk = []
+            window = int(arrival / chunk_seconds)
+        chunk.append(lines[index % len(lines)] + "\r\n")
+        index += 1
+    if chunk:
+        chunks.append((int(window * chunk_seconds * 1e9), "".join(chunk).encode('utf-8')))
+    return chunks
+
+
+class ReplayIrcServer:
+    """
+    Replays recorded reads (``(nanoseconds since the start, bytes)`` chunks) to a connection
+    once it has JOINed a channel, each chunk in one write, then ends it.
+
+    With ``speed`` the chunks keep their recorded timing, divided by ``speed``; with None they
+    are written back to back. ``sent_ns`` holds when each chunk of the last replay was written,
+    in ``time.perf_counter_ns`` time.
+    """
+
+    def __init__(self, chunks, speed=1.0):
+        self.chunks = chunks
+        self.speed = speed
+        self.sent_ns = []
+
+    async def _discard(self, reader):
+        # PONGs and other client commands are read and ignored, so they never fill the socket
+        while await reader.read(65536):
+            pass
+
+    async def handle(self, reader, writer):
+        writer.write(b":tmi.twitch.tv 001 testbot :Welcome, GLHF!\r\n")
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            if line.startswith(b"JOIN #"):
+                break
+        discard = asyncio.ensure_future(self._discard(reader))
+
+        sent_ns = []
+        first_offset = self.chunks[0][0] if self.chunks else 0
+        started = time.perf_counter_ns()
+        for offset, data in self.chunks:
+            if self.speed is not None:
+                delay = (started + (offset - first_offset) / self.speed - time.perf_counter_ns()) / 1e9
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            sent_ns.append(time.perf_counter_ns())
+            writer.write(data)
+            await writer.drain()
+        self.sent_ns = sent_ns
+
+        # Half-close and let the client hang up, so its unread PONGs do not reset the connection
+        writer.write_eof()
+        await discard
+        writer.close()
+
+    async def serve(self, host="127.0.0.1", port=0):
+        """
+        Starts listening and returns the asyncio server.
+        """
+        return await asyncio.start_server(self.handle, host, port)
@@ -0,0 +1,92 @@
+"""
+Local TLS stand-in for Twitch IRC used by the benchmarks.
+
+Serves a self-signed certificate for "localhost" (made with the openssl command-line tool),
+echoes every line a client sends back as a NOTICE, and records what each connection sent
+and in how many reads, so the handshake coalescing and line endings can be checked.
+"""
+import asyncio
+import os
+import ssl
+import subprocess
+import tempfile
+import threading
+
+
+def self_signed_certificate(directory):
+    """
+    Writes a throwaway certificate and key for "localhost" and returns their paths.
+    """
+    cert_file = os.path.join(directory, "cert.pem")
+    key_file = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=DNS:localhost", "-keyout", key_file, "-out", cert_file],
+        check=True, capture_output=True
+    )
+    return cert_file, key_file
+
+
+class FakeTlsIrcServer:
+    """
+    TLS echo server running on its own event loop thread. ``client_context`` trusts its certificate.
+    """
+
+    def __init__(self):
+        self._directory = tempfile.TemporaryDirectory()
+        cert_file, key_file = self_signed_certificate(self._directory.name)
+        self.server_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        self.server_context.load_cert_chain(cert_file, key_file)
+        self.client_context = ssl.create_default_context(cafile=cert_file)
+        self.connections = []  # (bytes received, number of reads) per connection
+        self.port = None
+        self._loop = None
+        self._server = None
+
+    async def handle(self, reader, writer):
+        received, reads = bytearray(), 0
+        record = [received, 0]
+        self.connections.append(record)
+        writer.write(b":tmi.twitch.tv 001 testbot :Welcome, GLHF!\r\n")
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                received += data
+                reads += 1
+                record[1] = reads
+                for line in data.split(b"\r\n"):
+                    if line:
+                        writer.write(b":tmi.twitch.tv NOTICE * :" + line + b"\r\n")
+                await writer.drain()
+        except (ConnectionError, ssl.SSLError):
+            pass  # Clients hang up without a TLS close_notify
+        finally:
+            writer.close()
+
+    def start(self):
+        ready = threading.Event()
+
+        async def serve():
+            self._server = await asyncio.start_server(self.handle, "127.0.0.1", 0, ssl=self.server_context)
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            async with self._server:
+                await self._server.serve_forever()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(serve())
+            except asyncio.CancelledError:
+                pass
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait(10)
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+        self._directory.cleanup()
@@ -0,0 +1,93 @@
+"""
+Measures what the ingest instrumentation costs: read-path throughput on the IRC corpus with
+metrics off, with metrics on, and with metrics on while the sampling profiler runs. Many short rounds alternate between the
+settings, in rotating order, so drift in machine speed affects them alike; each setting is
+compared with metrics off in the same round, and the median and interquartile range of
+those ratios are reported. A range spanning zero means the difference is within run-to-run
+noise, so the cost of the recording calls themselves is also timed directly and shown
+against the time of a batch.
+Run from the repository root:
+
+    python -m benchmarks.instrumentation_bench [rounds] [batches_per_round]
+"""
+import os
+import statistics
+import sys
+import time
+import timeit
+
+from benchmarks.support import load_corpus
+from helper_functions.chat_outbound import OutboundQueue
+from helper_functions.instrumentation import RECV_WAIT_SECONDS, metrics, observe_ingest, profiler
+from helper_functions.interval_buffer import IntervalBuffer
+from helper_functions.log_chat import handle_chat_lines
+
+
+def ingest_rate(lines, batches):
+    outbound = OutboundQueue()
+    interval_buffer = IntervalBuffer(max_messages=10**9)
+    started = time.perf_counter()
+    for _ in range(batches):
+        handle_chat_lines(outbound, lines, interval_buffer)
+    return len(lines) * batches / (time.perf_counter() - started)
+
+
+def recording_cost(lines, number=100_000):
+    """
+    Seconds the instrumentation of one batch takes: the recv wait, the ingest observations
+    and the clock reads around them.
+    """
+    clock = time.perf_counter_ns
+
+    def record_batch():
+        started = clock()
+        RECV_WAIT_SECONDS.observe(0.001)
+        parsed = clock()
+        recorded = clock()
+        observe_ingest(lines, parsed - started, recorded - parsed)
+        clock()
+
+    return timeit.timeit(record_batch, number=number) / number
+
+
+def run(rounds=40, batches=100):
+    # Console output would dominate the read path; the sink is configured on first use
+    os.environ["CHAT_LOG_LEVEL"] = "off"
+    lines = load_corpus()
+    settings = {"metrics off": (False, False), "metrics on": (True, False), "metrics + profiler": (True, True)}
+    rates = {label: [] for label in settings}
+    labels = list(settings)
+    for round_number in range(rounds):
+        # Each setting takes every position in turn, so the order of a round does not favor one
+        shift = round_number % len(labels)
+        for label in labels[shift:] + labels[:shift]:
+            enabled, profiling = settings[label]
+            metrics.enabled = enabled
+            if profiling:
+                profiler.start()
+            rates[label].append(ingest_rate(lines, batches))
+            if profiling:
+                profiler.stop()
+    metrics.enabled = True
+
+    baseline = statistics.median(rates["metrics off"])
+    print(f"{rounds} rounds x {batches} batches of {len(lines)} lines; change against metrics off in the same round")
+    for label, samples in rates.items():
+        rate = statistics.median(samples)
+        if label == "metrics off":
+            print(f"  {label:<20} {rate:12,.0f} lines/s")
+            continue
+        changes = [sample / off - 1 for sample, off in zip(samples, rates["metrics off"])]
+        low, median, high = statistics.quantiles(changes, n=4)
+        print(f"  {label:<20} {rate:12,.0f} lines/s (median {median:+.1%}, interquartile {low:+.1%} to {high:+.1%})")
+    print(f"  profiler took {profiler.samples} samples")
+
+    cost = recording_cost(len(lines))
+    batch_seconds = len(lines) / baseline
+    line_seconds = batch_seconds / len(lines)
+    print(f"Recording one batch: {cost * 1e6:.2f} us, {cost / batch_seconds:.2%} of a {len(lines)}-line batch; "
+          f"under 1% for reads of {cost / line_seconds / 0.01:.0f} lines or more")
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:3]))
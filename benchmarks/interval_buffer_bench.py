@@ -0,0 +1,89 @@
+"""
+Measures the memory an interval buffer holds per 100k chat messages: one dict per message
+with a formatted ISO timestamp, as before, against the compact ChatRecords arrays.
+
+Messages come from the IRC corpus, parsed the way the ingest path parses them, so every
+message carries its own username and designations strings. Run from the repository root:
+
+    python -m benchmarks.interval_buffer_bench [messages]
+"""
+import sys
+import time
+import tracemalloc
+from datetime import datetime, UTC
+
+from benchmarks.support import load_corpus
+from helper_functions.badges import badge_code
+from helper_functions.interval_buffer import ChatRecords
+from helper_functions.irc_parser import filter_badges, parse_lines
+
+
+def parsed_batches(lines, messages):
+    """
+    Yields lists of (username, designations, badge_code, message) rows until ``messages`` rows were produced.
+    """
+    produced = 0
+    while produced < messages:
+        rows = []
+        for irc_message in parse_lines(lines):
+            if irc_message.command != "PRIVMSG":
+                continue
+            badges = irc_message.tag("badges", "")
+            rows.append((irc_message.tag("display-name", "anonymous"), filter_badges(badges),
+                         badge_code(badges, irc_message.tag("badge-info", "")), irc_message.trailing or ""))
+        rows = rows[:messages - produced]
+        produced += len(rows)
+        yield rows
+
+
+def dict_records(batches):
+    chat_logs = []
+    for rows in batches:
+        for username, designations, code, message in rows:
+            chat_logs.append({
+                "timestamp": datetime.now(UTC).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                "username": username,
+                "designations": designations,
+                "badge_code": code,
+                "message": message
+            })
+    return chat_logs
+
+
+def compact_records(batches):
+    chat_logs = ChatRecords()
+    for rows in batches:
+        chat_logs.extend(time.time_ns() // 1_000_000, rows)
+    return chat_logs
+
+
+def measure(build, lines, messages):
+    """
+    Returns the bytes the built records keep alive (parsed strings included) and the records.
+    """
+    tracemalloc.start()
+    records = build(parsed_batches(lines, messages))
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return held, records
+
+
+def run(messages=100_000):
+    lines = load_corpus()
+    per_100k = 100_000 / messages
+    print(f"{messages:,} messages from a corpus of {len(lines)} lines")
+    results = {}
+    for label, build in (("dicts (before)", dict_records), ("ChatRecords", compact_records)):
+        held, records = measure(build, lines, messages)
+        results[label] = records
+        print(f"{label:>15}: {held * per_100k / 2**20:8.1f} MiB per 100k messages "
+              f"({held / messages:.0f} bytes/message)")
+
+    # Same rows apart from the timestamps, which were taken at different times
+    before, after = results.values()
+    assert [(r["username"], r["designations"], r["message"]) for r in before] == \
+           [(r["username"], r["designations"], r["message"]) for r in after]
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:2]))
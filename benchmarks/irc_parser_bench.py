@@ -0,0 +1,60 @@
+"""
+Compares the IRCv3 tag parser against the dict comprehension it replaced.
+
+Run from the repository root:
+
+    python -m benchmarks.irc_parser_bench
+"""
+import timeit
+
+from benchmarks.support import load_corpus
+from helper_functions.irc_parser import filter_badges, parse_lines
+
+
+def dict_comprehension_path(lines):
+    """
+    The previous PRIVMSG handling: split every tag twice and filter badges per message.
+    """
+    results = []
+    for response in lines:
+        if "PRIVMSG" not in response:
+            continue
+        parts = response.split(" :", 1)
+        if len(parts) < 2:
+            continue
+        tags = parts[0]
+        tag_parts = {tag.split('=')[0]: tag.split('=')[1] for tag in tags.split(';') if '=' in tag}
+        username = tag_parts.get("display-name", "anonymous")
+        badges = tag_parts.get("badges", "").split(',')
+        filtered_badges = [
+            badge for badge in badges
+            if badge.startswith("subscriber") or badge.startswith("sub-gifter") or badge.startswith(
+                "bits") or badge.startswith("premium")
+        ]
+        results.append((username, ", ".join(filtered_badges) if filtered_badges else "none"))
+    return results
+
+
+def parser_path(lines):
+    """
+    The parser module: one pass per line, lazy tag lookup and memoized badge filtering.
+    """
+    results = []
+    for irc_message in parse_lines(lines):
+        if irc_message.command != "PRIVMSG":
+            continue
+        results.append((irc_message.tag("display-name", "anonymous"), filter_badges(irc_message.tag("badges", ""))))
+    return results
+
+
+def run(repeat=5, copies=50):
+    lines = load_corpus() * copies
+    print(f"Corpus: {len(lines)} lines")
+
+    for name, func in (("dict comprehension", dict_comprehension_path), ("irc_parser", parser_path)):
+        best = min(timeit.repeat(lambda: func(lines), number=1, repeat=repeat))
+        print(f"{name:>20}: {best * 1e9 / len(lines):8.0f} ns/line  ({len(lines) / best:,.0f} lines/s)")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,67 @@
+"""
+Checks the chat connection layer against the local TLS stand-in and measures what session
+resumption saves on reconnects.
+
+For each connection the handshake is sent, the echoed welcome read, and the socket closed.
+Reports full and resumed connect times, whether the handshake arrived in one read with
+``\\r\\n`` line endings, and the socket options in effect. Run from the repository root:
+
+    python -m benchmarks.irc_tls_bench [connections]
+"""
+import socket
+import statistics
+import sys
+import time
+
+from benchmarks.fake_tls_server import FakeTlsIrcServer
+from benchmarks.support import read_welcome
+from helper_functions.irc_connection import IrcConnector, handshake_bytes
+
+
+def connect_times(connector, connections):
+    times = []
+    for _ in range(connections):
+        started = time.perf_counter()
+        sock = connector.connect("benchmark", "testbot", ["channel000", "channel001"])
+        read_welcome(sock)
+        times.append(time.perf_counter() - started)
+        sock.close()
+    return times
+
+
+def run(connections=50):
+    server = FakeTlsIrcServer().start()
+    try:
+        # A fresh connector per connection never has a session to resume
+        full = []
+        for _ in range(connections):
+            full += connect_times(IrcConnector("localhost", server.port, ssl_context=server.client_context), 1)
+
+        connector = IrcConnector("localhost", server.port, ssl_context=server.client_context)
+        resumed = connect_times(connector, connections)
+        stats = connector.stats()
+
+        print(f"{connections} connections to the TLS stand-in")
+        print(f"    full handshake: median {statistics.median(full) * 1000:.2f} ms")
+        print(f"  shared connector: median {statistics.median(resumed[1:]) * 1000:.2f} ms "
+              f"({stats['resumed']} of {stats['connects']} sessions resumed)")
+
+        expected = handshake_bytes("benchmark", "testbot", ["channel000", "channel001"])
+        received, reads = server.connections[-1]
+        bare_newlines = received.replace(b"\r\n", b"").count(b"\n")
+        print(f"Handshake: {reads} read(s), matches coalesced payload: {bytes(received) == expected}, "
+              f"bare newlines: {bare_newlines}")
+
+        sock = connector.open()
+        print(f"TCP_NODELAY={sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)} "
+              f"SO_KEEPALIVE={sock.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE)} "
+              f"SO_RCVBUF={sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)} "
+              f"(requested {connector.rcvbuf}; Linux reports double, capped by net.core.rmem_max)")
+        sock.close()
+        time.sleep(0.05)  # Lets the stand-in see the close before it stops
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,103 @@
+"""
+Measures the live metrics layer.
+
+1. Ingest throughput of the read path on the IRC corpus, with and without live metrics on
+   the channel's interval buffer, one simulated second per batch.
+2. Query latency of a channel with an hour of history: in process, and through the local
+   HTTP/JSON endpoint over a keep-alive connection.
+
+Run from the repository root:
+
+    python -m benchmarks.live_metrics_bench [batches] [requests]
+"""
+import http.client
+import socket
+import statistics
+import sys
+import threading
+import time
+
+import uvicorn
+
+from benchmarks.support import load_corpus
+from helper_functions.interval_buffer import IntervalBuffer
+from helper_functions.irc_parser import parse_lines
+from helper_functions.live_metrics import LiveMetrics
+from helper_functions.log_chat import record_chat_messages
+from helper_functions.log_sink import OFF_SINK
+from helper_functions.metrics_server import create_metrics_app
+
+START_MS = 1_700_000_000_000
+
+
+def ingest_rate(lines, batches, live):
+    interval_buffer = IntervalBuffer(max_messages=10**9, live=live)
+    started = time.perf_counter()
+    for batch in range(batches):
+        record_chat_messages(parse_lines(lines), START_MS + batch * 1000, lambda channel: interval_buffer, OFF_SINK)
+    return interval_buffer.stats()["total_messages"] / (time.perf_counter() - started)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(app, port):
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def run(batches=3600, requests=2000):
+    lines = load_corpus()
+    without = ingest_rate(lines, batches, None)
+    live = LiveMetrics()
+    with_live = ingest_rate(lines, batches, live.channel("benchchannel"))
+    print(f"Ingest without live metrics: {without:12,.0f} messages/s")
+    print(f"Ingest with live metrics:    {with_live:12,.0f} messages/s ({with_live / without - 1:+.1%})")
+
+    metrics = live.get("benchchannel")
+    now = START_MS / 1000 + batches - 0.5
+    for label, query in (("summary", lambda: metrics.summary(now)),
+                         ("1s buckets", lambda: metrics.buckets("1s", None, now)),
+                         ("1m buckets", lambda: metrics.buckets("1m", None, now)),
+                         ("10m buckets", lambda: metrics.buckets("10m", None, now))):
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            query()
+            timings.append(time.perf_counter() - started)
+        p50, p99 = percentiles(timings)
+        print(f"  in process {label:<12} p50 {p50 * 1e6:7.1f} us, p99 {p99 * 1e6:7.1f} us")
+
+    port = free_port()
+    server = serve(create_metrics_app(live), port)
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    try:
+        for path in ("/live", "/live/benchchannel?resolution=1m&limit=10"):
+            timings = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                connection.request("GET", path)
+                response = connection.getresponse()
+                response.read()
+                timings.append(time.perf_counter() - started)
+            p50, p99 = percentiles(timings)
+            print(f"  HTTP GET {path:<42} p50 {p50 * 1e6:7.1f} us, p99 {p99 * 1e6:7.1f} us "
+                  f"(status {response.status})")
+    finally:
+        connection.close()
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:3]))
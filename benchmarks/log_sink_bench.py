@@ -0,0 +1,84 @@
+"""
+Measures chat ingest throughput (parse + record into the interval buffer) with console echo
+through a synchronous print, as before, and through the LogSink at each level.
+
+Output goes to a pipe drained by a child process that reads ``drain_bytes_per_second``
+(0 = as fast as it can), standing in for a terminal or log collector. Run from the
+repository root:
+
+    python -m benchmarks.log_sink_bench [batches] [drain_bytes_per_second]
+"""
+import subprocess
+import sys
+import time
+
+from benchmarks.support import load_corpus
+from helper_functions.interval_buffer import IntervalBuffer, format_epoch_ms
+from helper_functions.irc_parser import parse_lines
+from helper_functions.log_chat import record_chat_messages
+from helper_functions.log_sink import LogSink
+
+DRAIN_SCRIPT = """
+import sys, time
+rate = int(sys.argv[1])
+while True:
+    data = sys.stdin.buffer.read1(65536)
+    if not data:
+        break
+    if rate:
+        time.sleep(len(data) / rate)
+"""
+
+
+class PrintSink:
+    """
+    The previous behavior: one formatted print per message on the reader thread.
+    """
+    enabled = True
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def chat(self, timestamp_ms, channel, username, designations, message):
+        print(f"[{format_epoch_ms(timestamp_ms)}] {username} [{designations}]: {message}", file=self.stream, flush=True)
+
+    def event(self, timestamp_ms, channel, event_data):
+        print(f"[{event_data['timestamp']}] {event_data['username']} [{event_data['designations']}] {event_data['event_type']}",
+              file=self.stream, flush=True)
+
+
+def measure(sink, batches, lines):
+    interval_buffer = IntervalBuffer(max_messages=10**9)
+    started = time.perf_counter()
+    for _ in range(batches):
+        record_chat_messages(parse_lines(lines), 1_704_067_200_000, lambda channel: interval_buffer, sink)
+    elapsed = time.perf_counter() - started
+    return interval_buffer.stats()["total_messages"] / elapsed
+
+
+def run(batches=500, drain_bytes_per_second=1_000_000):
+    lines = load_corpus()
+    drain = subprocess.Popen(
+        [sys.executable, "-c", DRAIN_SCRIPT, str(drain_bytes_per_second)], stdin=subprocess.PIPE, text=True
+    )
+    sinks = {
+        "print (before)": PrintSink(drain.stdin),
+        "LogSink full": LogSink("full", stream=drain.stdin),
+        "LogSink sampled": LogSink("sampled", stream=drain.stdin),
+        "LogSink off": LogSink("off"),
+    }
+    print(f"{batches} batches of {len(lines)} lines, output drained at "
+          f"{drain_bytes_per_second or 'unlimited'} bytes/s")
+    for label, sink in sinks.items():
+        rate = measure(sink, batches, lines)
+        extra = ""
+        if isinstance(sink, LogSink) and sink.enabled:
+            sink.flush()
+            extra = f" (echoed at most {sink.max_echo_per_second}/s, {sink.dropped} dropped from the queue)"
+        print(f"{label:>16}: {rate:12,.0f} messages/s{extra}")
+    drain.stdin.close()
+    drain.terminate()
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,91 @@
+"""
+Exercises the outbound chat pipeline.
+
+1. Drives the OutboundQueue in simulated time with a backlog of messages for three channels
+   (one of them moderated) and checks that no 30-second window exceeds Twitch's limits,
+   including the user limit shared by the channels not moderated, counting how many socket writes the messages took.
+2. Measures ingest throughput of the read path with and without the command dispatcher,
+   on the IRC corpus with every twentieth message turned into a command.
+
+Run from the repository root:
+
+    python -m benchmarks.outbound_bench [messages_per_channel] [batches]
+"""
+import sys
+import time
+
+from benchmarks.support import load_corpus, max_in_window
+from helper_functions.chat_outbound import (
+    CommandDispatcher, MODERATOR_MESSAGES_PER_WINDOW, OutboundQueue, RATE_WINDOW_SECONDS, USER_MESSAGES_PER_WINDOW
+)
+from helper_functions.interval_buffer import IntervalBuffer
+from helper_functions.irc_parser import parse_lines
+from helper_functions.log_chat import record_chat_messages
+from helper_functions.log_sink import OFF_SINK
+
+
+def simulate(messages_per_channel):
+    outbound = OutboundQueue()
+    outbound.set_moderator("moderated", True)
+    channels = ["moderated", "regular_a", "regular_b"]
+    for index in range(messages_per_channel):
+        for channel in channels:
+            outbound.send_message(channel, f"message {index}")
+    outbound.send_raw("PONG :tmi.twitch.tv")
+
+    # Time only moves when the queue says something will become sendable
+    started = now = time.monotonic()
+    send_times = {channel: [] for channel in channels}
+    all_times = []
+    while True:
+        payload, wait = outbound.take_ready(now)
+        for line in payload.decode('utf-8').split("\r\n"):
+            if line.startswith("PRIVMSG #"):
+                send_times[line[9:line.index(" :")]].append(now)
+                all_times.append(now)
+        if wait is None:
+            break
+        now += wait
+
+    stats = outbound.stats()
+    print(f"{stats['sent']} messages in {now - started:.0f}s of simulated time, {stats['writes']} writes")
+    for channel, times in send_times.items():
+        limit = MODERATOR_MESSAGES_PER_WINDOW if channel == "moderated" else USER_MESSAGES_PER_WINDOW
+        print(f"  #{channel}: {len(times)} sent, at most {max_in_window(times)} in any "
+              f"{RATE_WINDOW_SECONDS}s (limit {limit})")
+    regular_times = sorted(send_times["regular_a"] + send_times["regular_b"])
+    print(f"  not moderated: at most {max_in_window(regular_times)} in any {RATE_WINDOW_SECONDS}s "
+          f"(limit {USER_MESSAGES_PER_WINDOW})")
+    print(f"  connection: at most {max_in_window(all_times)} in any {RATE_WINDOW_SECONDS}s "
+          f"(limit {MODERATOR_MESSAGES_PER_WINDOW})")
+
+
+def ingest_rate(lines, batches, commands):
+    interval_buffer = IntervalBuffer(max_messages=10**9)
+    started = time.perf_counter()
+    for _ in range(batches):
+        record_chat_messages(parse_lines(lines), 0, lambda channel: interval_buffer, OFF_SINK, commands)
+    return interval_buffer.stats()["total_messages"] / (time.perf_counter() - started)
+
+
+def run(messages_per_channel=150, batches=500):
+    simulate(messages_per_channel)
+
+    lines = load_corpus()
+    privmsgs = [index for index, line in enumerate(lines) if " PRIVMSG #" in line]
+    for index in privmsgs[::20]:
+        prefix, _, _ = lines[index].rpartition(" :")
+        lines[index] = f"{prefix} :!uptime please"
+
+    outbound = OutboundQueue()
+    commands = CommandDispatcher(send=outbound.send_message)
+    commands.register("uptime", lambda channel, username, args: "Up for 3 hours")
+    without = ingest_rate(lines, batches, None)
+    with_commands = ingest_rate(lines, batches, commands)
+    print(f"Ingest without dispatcher: {without:12,.0f} messages/s")
+    print(f"Ingest with dispatcher:    {with_commands:12,.0f} messages/s "
+          f"({outbound.stats()['queued']} replies queued, {outbound.dropped} over the queue limit)")
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:3]))
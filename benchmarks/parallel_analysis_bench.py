@@ -0,0 +1,60 @@
+"""
+Measures how the sharded, process-pool chat analysis scales with workers, against analyzing
+each channel one after another, on synthetic chat log stores.
+
+Results are checked against the serial analysis: period data and summaries must be identical,
+top chatters and the order of their ties included. Run from the repository root:
+
+    python -m benchmarks.parallel_analysis_bench [channels] [periods] [messages_per_period]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from analysis.chat_analysis import extended_analyze_chat_logs, iter_chat_logs
+from analysis.parallel_analysis import analyze_logs_parallel
+from benchmarks.sketch_bench import synthetic_intervals
+from benchmarks.support import comparable
+from helper_functions.chat_store import ChatLogStore
+
+
+def write_stores(directory, channels, periods, messages_per_period):
+    paths = []
+    for index in range(channels):
+        path = os.path.join(directory, f"channel{index:03d}_chat_log")
+        store = ChatLogStore(path)
+        for period in synthetic_intervals(periods, messages_per_period, users=20_000, seed=index):
+            store.append(period)
+        paths.append(path)
+    return paths
+
+
+def run(channels=16, periods=144, messages_per_period=2000):
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_stores(directory, channels, periods, messages_per_period)
+
+        started = time.perf_counter()
+        serial = {os.path.basename(path)[:-len("_chat_log")]: extended_analyze_chat_logs(iter_chat_logs(path))
+                  for path in paths}
+        serial_seconds = time.perf_counter() - started
+
+        cores = os.cpu_count()
+        worker_counts = sorted({1, 2, 4, 8, 16, 32, cores} & set(range(1, cores + 1)))
+        rows = []
+        for workers in worker_counts:
+            started = time.perf_counter()
+            results, timings = analyze_logs_parallel(paths, workers)
+            seconds = time.perf_counter() - started
+            matches = all(comparable(*results[channel]) == comparable(*serial[channel]) for channel in serial)
+            rows.append((workers, len(timings), seconds, matches))
+
+        print(f"\n{channels} channels x {periods} intervals x {messages_per_period} messages, {cores} cores")
+        print(f"{'serial':>10}: {serial_seconds:7.2f}s")
+        for workers, shards, seconds, matches in rows:
+            print(f"{workers:>3} workers: {seconds:7.2f}s, {shards} shards, speedup {serial_seconds / seconds:5.2f}x, "
+                  f"matches serial: {matches}")
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,96 @@
+"""
+Measures how long the chat engine takes to get its channels back after the server drops
+connections, and checks that the time without a connection shows up as gaps in the
+interval buffers.
+
+The fake server streams messages to each connection, then ends it alternately with a
+RECONNECT notice and a plain close. Run from the repository root:
+
+    python -m benchmarks.reconnect_bench [drops] [channels]
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime, UTC
+
+from benchmarks.fake_irc_server import synthetic_privmsg
+from helper_functions.chat_engine import ChatEngine, JoinRateLimiter
+from helper_functions.irc_reconnect import ReconnectStats
+
+MESSAGES_PER_CONNECTION = 200
+
+
+class FlakyIrcServer:
+    """
+    Drops every connection once its channels are JOINed and a burst of messages is sent,
+    until ``drops`` connections were dropped; later connections stay open.
+    """
+
+    def __init__(self, channel_count, drops):
+        self.channel_count = channel_count
+        self.drops = drops
+        self.dropped = 0
+        self.all_dropped = asyncio.Event()
+        self.rejoined = asyncio.Event()
+
+    async def handle(self, reader, writer):
+        writer.write(b":tmi.twitch.tv 001 testbot :Welcome, GLHF!\r\n")
+        channels = []
+        while len(channels) < self.channel_count:
+            line = await reader.readline()
+            if not line:
+                return
+            if line.startswith(b"JOIN #"):
+                channels.append(line[6:].strip().decode('utf-8'))
+
+        writer.write("".join(
+            synthetic_privmsg(channels[index % len(channels)], index) for index in range(MESSAGES_PER_CONNECTION)
+        ).encode('utf-8'))
+        if self.dropped >= self.drops:
+            self.rejoined.set()
+            await reader.read()
+            return
+        self.dropped += 1
+        if self.dropped % 2:
+            writer.write(b":tmi.twitch.tv RECONNECT\r\n")
+        await writer.drain()
+        writer.close()
+
+
+def run(drops=10, channel_count=50):
+    async def main():
+        server = FlakyIrcServer(channel_count, drops)
+        listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        engine = ChatEngine(
+            "testbot", [f"channel{index:03d}" for index in range(channel_count)], oauth_token="benchmark",
+            host="127.0.0.1", port=listener.sockets[0].getsockname()[1], tls=False,
+            channels_per_connection=channel_count,
+            join_limiter=JoinRateLimiter(limit=10**9), echo=False, flush=False,
+            backoff_base=0.05, backoff_cap=0.5  # Capped low so the run stays short
+        )
+        engine.reconnect_stats = ReconnectStats()
+        interval_start = datetime.now(UTC)
+        started = time.perf_counter()
+        task = asyncio.create_task(engine.run())
+        await asyncio.wait_for(server.rejoined.wait(), 120)
+        await asyncio.sleep(0.1)
+        elapsed = time.perf_counter() - started
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0.05)  # Lets the server see the close
+        listener.close()
+
+        stats = engine.reconnect_stats.snapshot()
+        gaps = engine.buffer_for("channel000").take_gaps(interval_start, datetime.now(UTC))
+        print(f"{drops} drops of a {channel_count}-channel connection in {elapsed:.2f}s")
+        print(f"Reconnect metrics: {stats}")
+        print(f"Gaps in channel000: {len(gaps)}, {sum(gap['seconds'] for gap in gaps):.3f}s in total, "
+              f"reasons {sorted({gap['reason'] for gap in gaps})}")
+        if stats["reconnects"]:
+            print(f"Mean reconnect time: {stats['total_reconnect_seconds'] / stats['reconnects']:.3f}s")
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:3]))
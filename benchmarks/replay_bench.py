@@ -0,0 +1,161 @@
+"""
+Replays an IRC recording through the whole logging pipeline, offline and deterministically.
+
+A local fake Twitch IRC server replays the recording (made with IRC_RECORD_DIR set, see
+``connect_to_chat``) at its recorded pace, N times faster, or as fast as it can be read.
+Without a recording, one is synthesized from the IRC corpus: 30 seconds of Poisson traffic
+with bursts. The bot side is the production path: ``manage_intervals`` with its chat
+supervisor, interval buffer and file writers, then ``extended_analyze_chat_logs`` over what
+was written. Replays alternate between metrics off and on, in rotating order, in a scratch
+directory; the medians over the rounds are reported:
+
+- throughput: messages from the first write of the server to the last message buffered
+- latency per message: from the server's write to the message entering the interval buffer
+- flush time of the interval files (taken from the metrics, so only with them on) and time
+  to analyze them
+- peak RSS of the process (the server's copy of the recording included)
+
+Run from the repository root, with speed "max" or a factor (1 replays in real time):
+
+    python -m benchmarks.replay_bench [speed] [recording] [log_format] [rounds]
+
+An empty recording argument selects the synthetic one.
+"""
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from analysis.chat_analysis import extended_analyze_chat_logs, iter_chat_logs
+from benchmarks.fake_irc_server import ReplayIrcServer, synthetic_recording
+from benchmarks.support import StaticViewerPoller, load_corpus, privmsg_counts, start_server
+from helper_functions.chat_store import store_path
+from helper_functions.instrumentation import FLUSH_SECONDS, metrics
+from helper_functions.irc_connection import IrcConnector
+from helper_functions.irc_recorder import read_recording
+from helper_functions.live_metrics import ChannelMetrics, LiveMetrics
+from helper_functions.log_chat import manage_intervals
+
+INTERVAL_MINUTES = 10 / 60  # Short intervals, so real-time replays flush several times
+
+
+class ProbedChannelMetrics(ChannelMetrics):
+    """
+    Live metrics of a channel that also note when each batch of messages was buffered.
+    """
+
+    def __init__(self, resolutions):
+        super().__init__(resolutions)
+        self.batches = []  # (perf_counter_ns, messages)
+
+    def add_messages(self, timestamp_ms, rows):
+        self.batches.append((time.perf_counter_ns(), len(rows)))
+        super().add_messages(timestamp_ms, rows)
+
+
+class ProbedLiveMetrics(LiveMetrics):
+    def channel(self, name):
+        name = name.lower().lstrip('#')
+        with self._lock:
+            return self._channels.setdefault(name, ProbedChannelMetrics(self.resolutions))
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def flush_seconds():
+    return sum(value for name, _, _, value in FLUSH_SECONDS.samples() if name.endswith("_sum"))
+
+
+def replay(chunks, expected, speed, channel, log_format):
+    fake_server = ReplayIrcServer(chunks, speed)
+    loop, port = start_server(fake_server)
+    live = ProbedLiveMetrics()
+    flushed = flush_seconds()
+    try:
+        sock = IrcConnector("127.0.0.1", port, tls=False).connect("replay", "testbot", [channel])
+        manage_intervals(sock, channel, INTERVAL_MINUTES, log_format, live=live, poller=StaticViewerPoller())
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+    flushed = flush_seconds() - flushed
+
+    started = time.perf_counter()
+    _, summary = extended_analyze_chat_logs(iter_chat_logs(store_path(channel)))
+    analyzed = time.perf_counter() - started
+
+    batches = np.array(live.get(channel).batches, dtype=np.int64).reshape(-1, 2)
+    buffered = np.cumsum(batches[:, 1])
+    if buffered.size == 0 or buffered[-1] != expected[-1] or summary["total_messages"] != expected[-1]:
+        raise Exception(f"Replayed {expected[-1]} messages but {buffered[-1] if buffered.size else 0} were "
+                        f"buffered and {summary['total_messages']} analyzed")
+
+    # The n-th message was written with the first chunk completing it and buffered with the first batch holding it
+    messages = np.arange(expected[-1])
+    sent_ns = np.array(fake_server.sent_ns)[np.searchsorted(expected, messages, side="right")]
+    buffered_ns = batches[np.searchsorted(buffered, messages, side="right"), 0]
+    latencies = (buffered_ns - sent_ns) / 1e6
+    elapsed = (batches[-1, 0] - fake_server.sent_ns[0]) / 1e9
+    return {
+        "throughput": expected[-1] / elapsed,
+        "p50": np.percentile(latencies, 50),
+        "p99": np.percentile(latencies, 99),
+        "max": latencies.max(),
+        "flush": flushed,
+        "analysis": analyzed
+    }
+
+
+def run(speed="max", recording=None, log_format="ndjson", rounds=3):
+    # Console output would dominate the read path; the sink is configured on first use
+    os.environ["CHAT_LOG_LEVEL"] = "off"
+    if recording:
+        _, chunks = read_recording(recording)
+        source = recording
+    else:
+        chunks = synthetic_recording(load_corpus())
+        source = "synthetic"
+    expected = np.array(privmsg_counts(chunks))
+    speed = None if speed == "max" else float(speed)
+    duration = (chunks[-1][0] - chunks[0][0]) / 1e9 if chunks else 0
+    print(f"Recording: {source}, {len(chunks):,} reads, {expected[-1]:,} messages over {duration:.1f}s; "
+          f"speed {'max' if speed is None else f'{speed:g}x'}, format {log_format}")
+
+    settings = {"metrics off": False, "metrics on": True}
+    labels = list(settings)
+    runs = {label: [] for label in labels}
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            for round_number in range(int(rounds)):
+                shift = round_number % len(labels)
+                for label in labels[shift:] + labels[:shift]:
+                    metrics.enabled = settings[label]
+                    channel = f"{label.replace(' ', '')}{round_number}"
+                    runs[label].append(replay(chunks, expected, speed, channel, log_format))
+        finally:
+            metrics.enabled = True
+            os.chdir(cwd)
+
+    results = {label: {key: statistics.median(result[key] for result in samples) for key in samples[0]}
+               for label, samples in runs.items()}
+    baseline = results["metrics off"]["throughput"]
+    print(f"Medians of {rounds} rounds:")
+    for label, result in results.items():
+        flush = f"{result['flush'] * 1000:6.1f} ms" if settings[label] else "   n/a"
+        print(f"  {label:<12} {result['throughput']:10,.0f} messages/s ({result['throughput'] / baseline - 1:+.1%}), "
+              f"latency p50 {result['p50']:7.2f} ms, p99 {result['p99']:7.2f} ms, max {result['max']:7.2f} ms, "
+              f"flush {flush}, analysis {result['analysis'] * 1000:6.1f} ms")
+    print(f"Peak RSS: {peak_rss_mb():.1f} MB")
+    return results
+
+
+if __name__ == "__main__":
+    run(*sys.argv[1:5])
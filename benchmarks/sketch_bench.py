@@ -0,0 +1,83 @@
+"""
+Compares the exact and sketched chat analysis on synthetic logs: accuracy of the unique
+chatter count and top chatters against the memory each state holds.
+
+Run from the repository root:
+
+    python -m benchmarks.sketch_bench [periods] [messages_per_period] [users]
+"""
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from analysis.incremental_analysis import ChatAnalysisState
+
+DESIGNATIONS = ["none", "subscriber/12, sub-gifter/5", "subscriber/3", "premium/1", "bits/100", "subscriber/7"]
+
+
+def synthetic_intervals(periods, messages_per_period, users, seed=1):
+    """
+    Yields interval records whose chatters follow a long-tailed (Zipf-like) activity distribution.
+    """
+    rng = random.Random(seed)
+    for period in range(periods):
+        minute = period * 10
+        yield {
+            "start_time": f"2024-01-{1 + minute // 1440:02d}T{minute // 60 % 24:02d}:{minute % 60:02d}:00Z",
+            "end_time": f"2024-01-{1 + (minute + 10) // 1440:02d}T{(minute + 10) // 60 % 24:02d}:{(minute + 10) % 60:02d}:00Z",
+            "chat_logs": [
+                {
+                    "timestamp": "2024-01-01T00:00:00Z",
+                    "username": f"user{int(rng.paretovariate(1.1) * 7) % users}_{rng.randrange(users) if rng.random() < 0.5 else 0}",
+                    "designations": rng.choice(DESIGNATIONS),
+                    "message": "hi"
+                }
+                for _ in range(messages_per_period)
+            ],
+            "special_events": []
+        }
+
+
+def measure(use_sketches, intervals):
+    tracemalloc.start()
+    started = time.perf_counter()
+    state = ChatAnalysisState(use_sketches)
+    for period in intervals:
+        state.add_interval(period)
+        period.clear()  # Keep the measurement about the state, not the input
+    summary = state.summary()
+    state.period_data = []
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    checkpoint_bytes = len(json.dumps(state.to_dict()))
+    return summary, elapsed, peak, checkpoint_bytes
+
+
+def run(periods=100, messages_per_period=5000, users=200_000):
+    results = {}
+    for use_sketches in (False, True):
+        results[use_sketches] = measure(use_sketches, synthetic_intervals(periods, messages_per_period, users))
+
+    exact, sketched = results[False][0], results[True][0]
+    true_unique = exact["total_unique_chatters"]
+    unique_error = abs(sketched["total_unique_chatters"] - true_unique) / true_unique * 100
+    exact_top = exact["total_chats_per_user"]
+    overlap = len(exact_top.keys() & sketched["total_chats_per_user"].keys())
+    count_errors = [
+        abs(sketched["total_chats_per_user"][user] - count) / count * 100
+        for user, count in exact_top.items() if user in sketched["total_chats_per_user"]
+    ]
+
+    print(f"{periods} periods x {messages_per_period} messages, {true_unique:,} unique chatters")
+    for use_sketches, label in ((False, "exact"), (True, "sketch")):
+        _, elapsed, peak, checkpoint_bytes = results[use_sketches]
+        print(f"{label:>7}: {elapsed:6.2f}s, peak memory {peak / 2**20:7.1f} MiB, checkpoint {checkpoint_bytes / 2**20:6.1f} MiB")
+    print(f"Unique chatters: exact {true_unique:,}, sketch {sketched['total_unique_chatters']:,} ({unique_error:.2f}% error)")
+    print(f"Top 10 overlap: {overlap}/10, mean count error {sum(count_errors) / max(len(count_errors), 1):.2f}%")
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:4]))
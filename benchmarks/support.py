@@ -0,0 +1,106 @@
+"""
+Helpers shared by the benchmarks and the tests: offline stand-ins for the Twitch API, the IRC
+corpus and small measurement helpers.
+
+Unlike the benchmark scripts, importing this module changes nothing in the process, so tests
+can use it without inheriting a benchmark's settings.
+"""
+import asyncio
+import os
+import threading
+from collections import deque
+
+from helper_functions.chat_outbound import RATE_WINDOW_SECONDS
+
+CORPUS_FILE = os.path.join(os.path.dirname(__file__), "data", "irc_corpus.txt")
+
+
+class StaticViewerPoller:
+    """
+    Viewer counts without the Twitch API.
+    """
+
+    def fetch_viewer_counts(self, channels):
+        return {channel: 1000 for channel in channels}
+
+
+class StaticToken:
+    """
+    Token manager that always returns the same app token.
+    """
+
+    def get_access_token(self):
+        return "static"
+
+    def refresh(self):
+        return {"access_token": "static"}
+
+
+def load_corpus(path=CORPUS_FILE):
+    """
+    Loads the corpus of IRC lines, one per line without the ``\\r\\n``.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        return [line.rstrip("\n") for line in file if line.strip()]
+
+
+def privmsg_counts(chunks):
+    """
+    Returns, for each chunk of a recording, how many PRIVMSG lines were complete once it arrived.
+    """
+    counts, complete, pending = [], 0, b""
+    for _, data in chunks:
+        pending += data
+        end = pending.rfind(b"\r\n")
+        if end >= 0:
+            complete += sum(1 for line in pending[:end].split(b"\r\n") if b" PRIVMSG #" in line)
+            pending = pending[end + 2:]
+        counts.append(complete)
+    return counts
+
+
+def start_server(fake_server):
+    """
+    Runs a fake IRC server on its own event loop thread. Returns the loop and the port.
+    """
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(fake_server.serve())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop, server.sockets[0].getsockname()[1]
+
+
+def read_welcome(sock):
+    """
+    Reads from a chat socket until the server's NOTICE arrives. Returns the bytes read.
+    """
+    # Reading also processes the TLS 1.3 session ticket the server sends after the handshake
+    data = b""
+    while b"NOTICE" not in data:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def max_in_window(send_times, window=RATE_WINDOW_SECONDS):
+    """
+    Largest number of sends that fall in any window of ``window`` seconds.
+    """
+    recent, peak = deque(), 0
+    for sent_at in send_times:
+        recent.append(sent_at)
+        while sent_at - recent[0] >= window:
+            recent.popleft()
+        peak = max(peak, len(recent))
+    return peak
+
+
+def comparable(period_data, summary):
+    """
+    Analysis results in a form that compares equal only if tied top chatters are in the same order.
+    """
+    # Dicts compare equal whatever their order, but the order of tied top chatters matters here
+    summary = dict(summary, total_chats_per_user=list(summary["total_chats_per_user"].items()))
+    periods = [dict(period, chats_per_user=list(period["chats_per_user"].items())) for period in period_data]
+    return periods, summary
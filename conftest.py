@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+# Tests never print chat lines; the sink is configured on first use
+os.environ.setdefault("CHAT_LOG_LEVEL", "off")
+
+
+@pytest.fixture
+def in_tmp_path(tmp_path, monkeypatch):
+    """
+    Runs the test in an empty directory, where chat log stores are created.
+    """
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def helix_server():
+    """
+    Serves a FakeHelix for the test. Returns its base URL.
+    """
+    servers = []
+
+    def start(helix):
+        server = helix.serve()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+    yield start
+    for server in servers:
+        server.shutdown()
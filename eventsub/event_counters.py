@@ -0,0 +1,107 @@
+import itertools
+import threading
+from datetime import datetime, timedelta, UTC
+
+# EventSub subscription types counted per channel and interval
+COUNTED_EVENTS = {
+    "channel.subscribe": "subscribers",
+    "channel.follow": "followers",
+    "stream.online": "online",
+}
+
+# Event fields holding the time the event happened; other events use the message timestamp
+EVENT_TIME_FIELDS = ("followed_at", "started_at")
+
+SHARD_COUNT = 16
+
+
+def parse_event_time(value):
+    """
+    Parses an EventSub RFC 3339 timestamp, e.g. "2024-01-01T10:11:12.634234626Z", into an aware
+    datetime. Twitch sends nanoseconds, which datetime cannot hold, so they are cut to microseconds.
+    """
+    base, _, fraction = value.rstrip("Z").partition(".")
+    event_time = datetime.fromisoformat(base).replace(tzinfo=UTC)
+    if fraction:
+        event_time += timedelta(microseconds=int(fraction[:6].ljust(6, "0")))
+    return event_time
+
+
+def event_time_of(event, message_time):
+    """
+    Returns when an event happened: its own timestamp field when it has one, otherwise the time
+    Twitch sent the message.
+    """
+    for field in EVENT_TIME_FIELDS:
+        if field in event:
+            return parse_event_time(event[field])
+    return message_time
+
+
+class CounterShard:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}  # broadcaster_user_id -> {(counter, epoch second): count}
+
+
+class EventCounters:
+    """
+    Counts EventSub notifications per channel (``broadcaster_user_id``) and per second of
+    event time, so counts are attributed to the interval the events happened in rather than
+    the interval in which they arrived.
+
+    Counts are split over shards handed out to threads round-robin on their first event, so
+    webhook threads do not contend on one lock; ``take_until`` merges the shards when an
+    interval rolls over, reading only the counts of the channel it closes.
+    """
+
+    def __init__(self, shard_count=SHARD_COUNT):
+        self.shards = [CounterShard() for _ in range(shard_count)]
+        self._next_shard = itertools.count()
+        self._local = threading.local()
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            # itertools.count is atomic under the GIL, so no two threads get the same index by accident
+            shard = self._local.shard = self.shards[next(self._next_shard) % len(self.shards)]
+        return shard
+
+    def record(self, broadcaster_user_id, event_type, event_time):
+        counter = COUNTED_EVENTS.get(event_type)
+        if counter is None:
+            return
+        shard = self._shard()
+        key = (counter, int(event_time.timestamp()))
+        with shard.lock:
+            counts = shard.counts.setdefault(broadcaster_user_id, {})
+            counts[key] = counts.get(key, 0) + 1
+
+    def take_until(self, broadcaster_user_id, end_time=None):
+        """
+        Returns the totals of a channel's events that happened before end_time (all of them when
+        end_time is None) and forgets them. Events that arrived late for an interval that was
+        already closed are counted in the next one taken.
+        """
+        end_second = None if end_time is None else int(end_time.timestamp())
+        totals = {counter: 0 for counter in COUNTED_EVENTS.values()}
+        for shard in self.shards:
+            with shard.lock:
+                counts = shard.counts.get(broadcaster_user_id)
+                if not counts:
+                    continue
+                if end_second is None:
+                    keys = list(counts)
+                else:
+                    keys = [key for key in counts if key[1] < end_second]
+                for key in keys:
+                    totals[key[0]] += counts.pop(key)
+                if not counts:
+                    del shard.counts[broadcaster_user_id]
+        return totals
+
+    def get_and_reset(self, broadcaster_user_id):
+        """
+        Returns the totals counted for a channel since the last call and forgets them.
+        """
+        return self.take_until(broadcaster_user_id)
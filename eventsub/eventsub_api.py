@@ -1,7 +1,6 @@
 import requests
 import os
 from dotenv import load_dotenv
-from auth.api_auth import get_app_access_token
 
 # Load environment variables from .env file
 load_dotenv()
@@ -12,19 +11,48 @@ webhook_secret = os.getenv("TWITCH_WEBHOOK_SECRET")
 callback_url = "https://fe42-174-160-52-35.ngrok-free.app"
 
 def fetch_eventsub(access_token):
+    """
+    Returns every EventSub subscription, following the pagination cursor past the first 100.
+    """
     url = "https://api.twitch.tv/helix/eventsub/subscriptions"
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Client-Id": client_id
     }
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        return response.json().get("data", [])
-    else:
-        raise Exception(f"Failed to fetch EventSub subscriptions: {response.status_code}, {response.text}")
+    subscriptions = []
+    params = {"first": 100}
+    while True:
+        response = requests.get(url, headers=headers, params=params)
+        if response.status_code != 200:
+            raise Exception(f"Failed to fetch EventSub subscriptions: {response.status_code}, {response.text}")
+        page = response.json()
+        subscriptions.extend(page.get("data", []))
+        cursor = page.get("pagination", {}).get("cursor")
+        if not cursor:
+            return subscriptions
+        params = {"first": 100, "after": cursor}
+
+
+def webhook_transport():
+    return {
+        "method": "webhook",
+        "callback": callback_url,
+        "secret": webhook_secret
+    }
 
 
-def sub_eventsub(access_token, event_type, condition):
+def websocket_transport(session_id):
+    """
+    Transport for subscriptions delivered over an EventSub WebSocket session. They require a
+    user access token and are removed by Twitch when the session ends.
+    """
+    return {
+        "method": "websocket",
+        "session_id": session_id
+    }
+
+
+def sub_eventsub(access_token, event_type, condition, transport=None):
     url = "https://api.twitch.tv/helix/eventsub/subscriptions"
     headers = {
         "Authorization": f"Bearer {access_token}",
@@ -35,11 +63,7 @@ def sub_eventsub(access_token, event_type, condition):
         "type": event_type,
         "version": "1",
         "condition": condition,
-        "transport": {
-            "method": "webhook",
-            "callback": callback_url,
-            "secret": webhook_secret
-        }
+        "transport": transport or webhook_transport()
     }
     response = requests.post(url, headers=headers, json=payload)
     if response.status_code == 202:
@@ -48,31 +72,25 @@ def sub_eventsub(access_token, event_type, condition):
         raise Exception(f"Failed to subscribe to {event_type}: {response.status_code}, {response.text}")
 
 
-def verify_eventsub(streamer_id):
+def required_subscriptions(streamer_id):
     """
-    Ensure the correct EventSub subscriptions for the specified streamer.
+    Required EventSub topics for the streamer
     """
-    access_token = get_app_access_token(client_id, client_secret)
-
-    # Required EventSub topics for the streamer
-    required_subscriptions = [
+    return [
         {"type": "stream.online", "condition": {"broadcaster_user_id": streamer_id}},
         {"type": "channel.subscribe", "condition": {"broadcaster_user_id": streamer_id}},
         {"type": "channel.follow", "condition": {"broadcaster_user_id": streamer_id}},
     ]
 
-    # Fetch existing subscriptions
-    existing_subscriptions = fetch_eventsub(access_token)
 
-    # Extract active subscription types and conditions
-    existing_conditions = [
-        {"type": sub["type"], "condition": sub["condition"]}
-        for sub in existing_subscriptions
-    ]
+def verify_eventsub(streamer_ids):
+    """
+    Ensure the correct EventSub subscriptions for the specified streamer, or list of streamers.
+    Missing subscriptions are created and failed ones deleted in one pass over all channels.
+    """
+    from eventsub.eventsub_reconciler import get_reconciler
 
-    # Check and subscribe to missing topics
-    for required in required_subscriptions:
-        if required not in existing_conditions:
-            sub_eventsub(access_token, required["type"], required["condition"])
-        else:
-            print(f"Already subscribed to {required['type']} for {streamer_id}")
\ No newline at end of file
+    if isinstance(streamer_ids, str):
+        streamer_ids = [streamer_ids]
+    required = [subscription for streamer_id in streamer_ids for subscription in required_subscriptions(streamer_id)]
+    return get_reconciler().reconcile(required, webhook_transport())
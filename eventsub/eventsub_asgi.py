@@ -0,0 +1,270 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, UTC
+from threading import Lock
+
+from dotenv import load_dotenv
+
+from eventsub.event_counters import EventCounters, event_time_of, parse_event_time
+
+# Load environment variables
+load_dotenv()
+
+WEBHOOK_PATH = "/webhook"
+MAX_MESSAGE_AGE_SECONDS = 600  # Twitch recommends rejecting messages older than 10 minutes
+DEDUPE_TTL_SECONDS = 600
+DEDUPE_MAX_ENTRIES = 100_000
+QUEUE_SIZE = 10_000
+
+
+class DedupeCache:
+    """
+    Remembers message IDs for ``ttl`` seconds, holding at most ``max_entries``. Twitch retries
+    a notification with the same Twitch-Eventsub-Message-Id, so a seen ID is a retry.
+
+    The webhook's event loop and the WebSocket client's thread share one cache, so every
+    access holds a lock.
+    """
+
+    def __init__(self, ttl=DEDUPE_TTL_SECONDS, max_entries=DEDUPE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.expiry = OrderedDict()  # message_id -> expiry, oldest first
+        self._lock = Lock()
+
+    def _evict(self, now):
+        expiry = self.expiry
+        while expiry and (len(expiry) > self.max_entries or next(iter(expiry.values())) <= now):
+            expiry.popitem(last=False)
+
+    def seen(self, message_id, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._evict(now)
+            return message_id in self.expiry
+
+    def add(self, message_id, now=None):
+        """
+        Remembers a message ID. Returns False if it was already remembered.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._evict(now)
+            new = message_id not in self.expiry
+            self.expiry[message_id] = now + self.ttl
+            self.expiry.move_to_end(message_id)
+            return new
+
+    def discard(self, message_id):
+        with self._lock:
+            self.expiry.pop(message_id, None)
+
+
+class EventSubReceiver:
+    """
+    Checks incoming EventSub webhook requests and counts their notifications.
+
+    ``check`` does only the work needed to answer Twitch: signature, timestamp and duplicate
+    checks. Notifications it accepts are counted later by ``process``, off the request path.
+    Without a secret every request is refused, as anyone could sign with an empty one.
+    """
+
+    def __init__(self, secret, counters=None, max_age=MAX_MESSAGE_AGE_SECONDS, dedupe=None):
+        self.secret = secret.encode() if isinstance(secret, str) else secret
+        self.counters = counters or EventCounters()
+        self.max_age = max_age
+        self.dedupe = dedupe or DedupeCache()
+        self.stats = {"accepted": 0, "duplicates": 0, "stale": 0, "invalid": 0}
+        self._stats_lock = Lock()  # Request threads and the WebSocket client's thread count concurrently
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def verify_signature(self, headers, body):
+        if not self.secret:
+            return False
+        message_id = headers.get("twitch-eventsub-message-id", "")
+        timestamp = headers.get("twitch-eventsub-message-timestamp", "")
+        signature = headers.get("twitch-eventsub-message-signature", "")
+        digest = hmac.new(self.secret, (message_id + timestamp).encode() + body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(f"sha256={digest}", signature)
+
+    def check(self, headers, body):
+        """
+        Returns (status, response body, notification). ``headers`` has lower-case names and
+        ``body`` is the raw request bytes; notification is None unless it should be processed.
+        """
+        if not self.verify_signature(headers, body):
+            self._count("invalid")
+            return 403, b"Invalid signature", None
+
+        try:
+            message_time = parse_event_time(headers["twitch-eventsub-message-timestamp"])
+        except (KeyError, ValueError):
+            self._count("invalid")
+            return 400, b"Invalid timestamp", None
+        if (datetime.now(UTC) - message_time).total_seconds() > self.max_age:
+            self._count("stale")
+            return 403, b"Stale message", None
+
+        message_id = headers["twitch-eventsub-message-id"]
+        if self.dedupe.seen(message_id):
+            # Already handled: acknowledge so Twitch stops retrying
+            self._count("duplicates")
+            return 204, b"", None
+
+        message_type = headers.get("twitch-eventsub-message-type")
+        if message_type == "webhook_callback_verification":
+            return 200, json.loads(body)["challenge"].encode(), None
+        if message_type == "revocation":
+            subscription = json.loads(body)["subscription"]
+            print(f"EventSub subscription {subscription['type']} revoked: {subscription['status']}")
+            return 204, b"", None
+        if message_type == "notification":
+            notification = json.loads(body)
+            notification["message_id"] = message_id
+            notification["message_timestamp"] = message_time
+            return 204, b"", notification
+        return 400, b"Unhandled message type", None
+
+    def accept(self, notification):
+        """
+        Marks a notification as handled once it is queued, so retries of it are dropped.
+        Returns False if it had been accepted already, e.g. by the other transport.
+        """
+        if not self.dedupe.add(notification["message_id"]):
+            return False
+        self._count("accepted")
+        return True
+
+    def release(self, notification):
+        """
+        Undoes ``accept`` for a notification that could not be queued after all, so Twitch's
+        retry of it is not taken for a duplicate.
+        """
+        self.dedupe.discard(notification["message_id"])
+        self._count("accepted", -1)
+
+    def process(self, notification, echo=True):
+        event_type = notification["subscription"]["type"]
+        event = notification["event"]
+        event_time = event_time_of(event, notification["message_timestamp"])
+        self.counters.record(event["broadcaster_user_id"], event_type, event_time)
+        if echo:
+            if event_type == "channel.subscribe":
+                print(f"New subscriber: {event['user_name']}")
+            elif event_type == "channel.follow":
+                print(f"New follower: {event['user_name']}")
+
+
+def create_app(receiver, queue_size=QUEUE_SIZE, echo=True):
+    """
+    Returns an ASGI application serving ``receiver`` at /webhook.
+
+    Requests are answered as soon as a notification is checked and queued; one consumer task
+    per event loop drains the queue into the counters. Run it with any ASGI server, e.g.
+    ``uvicorn eventsub.eventsub_asgi:app --port 5000``.
+    """
+    state = {"queue": None, "consumer": None}
+
+    async def consume(queue):
+        while True:
+            notification = await queue.get()
+            try:
+                receiver.process(notification, echo)
+            except Exception as e:
+                print(f"Error processing EventSub notification {notification.get('message_id')}: {e}")
+
+    def get_queue():
+        # Created on first use so the queue and consumer belong to the server's event loop
+        if state["queue"] is None:
+            state["queue"] = asyncio.Queue(queue_size)
+            state["consumer"] = asyncio.get_running_loop().create_task(consume(state["queue"]))
+        return state["queue"]
+
+    async def respond(send, status, body):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"text/plain"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    if not receiver.secret:
+                        await send({"type": "lifespan.startup.failed",
+                                    "message": "TWITCH_WEBHOOK_SECRET is not set; refusing to serve the EventSub webhook"})
+                        return
+                    get_queue()
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    if state["consumer"] is not None:
+                        state["consumer"].cancel()
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        if scope["type"] != "http":
+            return
+        if scope["path"] != WEBHOOK_PATH or scope["method"] != "POST":
+            await respond(send, 404, b"Not found")
+            return
+
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+
+        status, body, notification = receiver.check(headers, b"".join(chunks))
+        # Accepted before queueing, so the WebSocket transport cannot count it in between
+        if notification is not None and receiver.accept(notification):
+            try:
+                get_queue().put_nowait(notification)
+            except asyncio.QueueFull:
+                # Not acknowledged, so Twitch will retry it later
+                receiver.release(notification)
+                status, body = 503, b"Busy"
+        await respond(send, status, body)
+
+    app.receiver = receiver
+    return app
+
+
+# Receiver and app for the webhook secret in .env; without one the app refuses to start
+receiver = EventSubReceiver(os.getenv("TWITCH_WEBHOOK_SECRET", ""))
+app = create_app(receiver)
+
+
+def take_interval_counts(broadcaster_user_id, interval_end):
+    """
+    Returns {"subscribers", "followers", "online"} counts of a channel's events that happened
+    before interval_end and have not been taken yet.
+    """
+    return receiver.counters.take_until(broadcaster_user_id, interval_end)
+
+
+def get_and_reset_counters(broadcaster_user_id):
+    """
+    Returns (subscribers, followers) gained by a channel since the last call and resets them.
+    """
+    totals = receiver.counters.get_and_reset(broadcaster_user_id)
+    return totals["subscribers"], totals["followers"]
+
+
+if __name__ == "__main__":
+    # uvicorn is only needed to serve the app on its own
+    import uvicorn
+
+    uvicorn.run(app, port=5000)
@@ -0,0 +1,223 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from auth.api_auth import get_token_manager
+
+HELIX_URL = "https://api.twitch.tv/helix"
+PAGE_SIZE = 100  # Helix returns at most 100 subscriptions per page
+MIN_RATELIMIT_REMAINING = 5
+POOL_SIZE = 20
+
+# Subscriptions in these states never deliver again and are deleted
+FAILED_STATUSES = {
+    "authorization_revoked",
+    "user_removed",
+    "version_removed",
+    "notification_failures_exceeded",
+    "webhook_callback_verification_failed",
+    "websocket_disconnected",
+    "websocket_failed_ping_pong",
+    "websocket_received_inbound_traffic",
+    "websocket_connection_unused",
+    "websocket_internal_error",
+    "websocket_network_timeout",
+    "websocket_network_error",
+}
+
+
+def transport_key(transport):
+    """
+    Identifies where a subscription delivers: the webhook callback or the WebSocket session.
+    """
+    return transport["method"], transport.get("callback") or transport.get("session_id")
+
+
+def subscription_key(event_type, condition, transport):
+    """
+    Hashable identity of a subscription, used to index existing subscriptions in a set.
+    """
+    return event_type, json.dumps(condition, sort_keys=True), transport_key(transport)
+
+
+class EventSubReconciler:
+    """
+    Brings the EventSub subscriptions of many channels in line with what is required.
+
+    Every page of existing subscriptions is fetched and indexed by (type, condition, transport),
+    so the diff for all channels costs one set lookup per required subscription. Missing
+    subscriptions are created and failed or duplicate ones deleted concurrently over one
+    keep-alive session, within the app's Helix rate limit.
+    """
+
+    def __init__(self, client_id, client_secret, base_url=HELIX_URL, pool_size=POOL_SIZE,
+                 min_remaining=MIN_RATELIMIT_REMAINING, token_manager=None):
+        self.client_id = client_id
+        self.token_manager = token_manager or get_token_manager(client_id, client_secret)
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.min_remaining = min_remaining
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.ratelimit_lock = Lock()
+        self.ratelimit_remaining = None
+        self.ratelimit_reset = None  # Epoch seconds at which the bucket refills
+        self.requests_made = 0
+
+    def _take_ratelimit_point(self):
+        # Points are counted down locally so concurrent requests cannot overshoot the bucket.
+        # The wait is worked out under the lock but slept outside it, so a waiting request does
+        # not hold up responses updating the bucket.
+        while True:
+            with self.ratelimit_lock:
+                delay = 0
+                if self.ratelimit_remaining is not None and self.ratelimit_remaining <= self.min_remaining:
+                    if self.ratelimit_reset is None:
+                        self.ratelimit_reset = int(time.time())
+                    # Ratelimit-Reset is rounded down to the second, so wait one more
+                    delay = self.ratelimit_reset + 1 - time.time()
+                    if delay <= 0:
+                        self.ratelimit_remaining = None
+                if delay <= 0:
+                    if self.ratelimit_remaining is not None:
+                        self.ratelimit_remaining -= 1
+                    self.requests_made += 1
+                    return
+            print(f"Helix rate limit nearly exhausted, waiting {delay:.1f}s...")
+            time.sleep(delay)
+
+    def _track_ratelimit(self, response):
+        remaining = response.headers.get("Ratelimit-Remaining")
+        reset = response.headers.get("Ratelimit-Reset")
+        with self.ratelimit_lock:
+            if remaining is not None:
+                self.ratelimit_remaining = min(int(remaining), self.ratelimit_remaining or int(remaining))
+            if reset is not None:
+                self.ratelimit_reset = int(reset)
+
+    def _request(self, method, params=None, payload=None, expected=(200,)):
+        for attempt in range(5):
+            self._take_ratelimit_point()
+            headers = {
+                'Authorization': f'Bearer {self.token_manager.get_access_token()}',
+                'Client-Id': self.client_id
+            }
+            response = self.session.request(
+                method, f"{self.base_url}/eventsub/subscriptions", headers=headers, params=params, json=payload
+            )
+            self._track_ratelimit(response)
+
+            if response.status_code in expected:
+                return response
+            if response.status_code == 401:
+                self.token_manager.refresh()
+            elif response.status_code == 429:
+                with self.ratelimit_lock:
+                    self.ratelimit_remaining = 0
+            else:
+                break
+        raise Exception(f"EventSub {method} failed: {response.status_code}, {response.text}")
+
+    def fetch_all(self):
+        """
+        Returns every existing subscription, following the pagination cursor.
+        """
+        subscriptions = []
+        params = {"first": PAGE_SIZE}
+        while True:
+            page = self._request("GET", params=params).json()
+            subscriptions.extend(page.get("data", []))
+            cursor = page.get("pagination", {}).get("cursor")
+            if not cursor:
+                return subscriptions
+            params = {"first": PAGE_SIZE, "after": cursor}
+
+    def create(self, subscription, transport):
+        payload = {
+            "type": subscription["type"],
+            "version": subscription.get("version", "1"),
+            "condition": subscription["condition"],
+            "transport": transport
+        }
+        # 409 means the subscription already exists, which is what we want
+        return self._request("POST", payload=payload, expected=(202, 409)).status_code == 202
+
+    def delete(self, subscription_id):
+        self._request("DELETE", params={"id": subscription_id}, expected=(204, 404))
+
+    def plan(self, required, transport, existing):
+        """
+        Returns (subscriptions to create, IDs to delete) for the required subscriptions
+        delivered through ``transport``.
+        """
+        # Of duplicates, an enabled subscription is kept over one still pending verification
+        best = {}
+        to_delete = []
+        for subscription in existing:
+            key = subscription_key(subscription["type"], subscription["condition"], subscription["transport"])
+            if subscription["status"] in FAILED_STATUSES:
+                to_delete.append(subscription["id"])
+            elif key not in best:
+                best[key] = subscription
+            elif best[key]["status"] != "enabled" and subscription["status"] == "enabled":
+                to_delete.append(best[key]["id"])
+                best[key] = subscription
+            else:
+                to_delete.append(subscription["id"])
+        kept = set(best)
+
+        to_create = []
+        for subscription in required:
+            key = subscription_key(subscription["type"], subscription["condition"], transport)
+            if key not in kept:
+                kept.add(key)
+                to_create.append(subscription)
+        return to_create, to_delete
+
+    def reconcile(self, required, transport):
+        """
+        Creates missing subscriptions and deletes failed or duplicate ones. Returns counts of
+        what was found and changed.
+        """
+        started, requests_before = time.perf_counter(), self.requests_made
+        existing = self.fetch_all()
+        to_create, to_delete = self.plan(required, transport, existing)
+
+        with ThreadPoolExecutor(self.pool_size) as executor:
+            deleted = list(executor.map(self.delete, to_delete))
+            created = list(executor.map(lambda subscription: self.create(subscription, transport), to_create))
+
+        result = {
+            "existing": len(existing),
+            "required": len(required),
+            "created": sum(created),
+            "already_existed": len(created) - sum(created),
+            "deleted": len(deleted),
+            "requests": self.requests_made - requests_before,
+            "seconds": round(time.perf_counter() - started, 2)
+        }
+        print(f"EventSub reconcile: {result}")
+        return result
+
+
+# Process-wide reconciler, created on first use
+_reconciler = None
+
+
+def get_reconciler():
+    """
+    Returns the shared reconciler configured from the environment.
+    """
+    global _reconciler
+    if _reconciler is None:
+        _reconciler = EventSubReconciler(os.getenv("TWITCH_CLIENT_ID"), os.getenv("TWITCH_CLIENT_SECRET"))
+    return _reconciler
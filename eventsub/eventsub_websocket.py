@@ -0,0 +1,181 @@
+import asyncio
+import json
+import random
+
+import websockets
+
+from eventsub.event_counters import parse_event_time
+from eventsub.eventsub_asgi import receiver as webhook_receiver
+
+EVENTSUB_WS_URL = "wss://eventsub.wss.twitch.tv/ws"
+WELCOME_TIMEOUT_SECONDS = 10
+KEEPALIVE_GRACE_SECONDS = 5
+MAX_BACKOFF_SECONDS = 60
+
+
+def subscribe_session(session_id, subscriptions):
+    """
+    Creates the subscriptions on a WebSocket session. WebSocket subscriptions need a user
+    access token, so the IRC token is used rather than the app token.
+    """
+    from auth.irc_auth import get_valid_access_token
+    from eventsub.eventsub_api import client_id, client_secret, sub_eventsub, websocket_transport
+
+    access_token = get_valid_access_token(client_id, client_secret)
+    for subscription in subscriptions:
+        sub_eventsub(access_token, subscription["type"], subscription["condition"], websocket_transport(session_id))
+
+
+class EventSubWebSocket:
+    """
+    Receives EventSub notifications over one persistent WebSocket session instead of the
+    webhook, so no public HTTP endpoint is needed.
+
+    Notifications feed the same receiver, and so the same per-channel counters, as the
+    webhook. ``session_reconnect`` moves to the new URL without resubscribing, reading the old
+    connection until the new one is welcomed; a dropped connection or a missed keepalive
+    starts a new session and subscribes again.
+    """
+
+    def __init__(self, subscriptions, subscribe=subscribe_session, url=EVENTSUB_WS_URL, receiver=None, echo=True):
+        self.subscriptions = subscriptions
+        self.subscribe = subscribe
+        self.url = url
+        self.receiver = receiver or webhook_receiver
+        self.echo = echo
+        self.session_id = None
+        self.stopped = False
+        self.stats = {"sessions": 0, "reconnects": 0, "notifications": 0, "duplicates": 0, "keepalives": 0}
+
+    async def _connect(self, url):
+        """
+        Opens a connection and waits for its session_welcome. Returns (websocket, session).
+        """
+        websocket = await websockets.connect(url)
+        try:
+            message = json.loads(await asyncio.wait_for(websocket.recv(), WELCOME_TIMEOUT_SECONDS))
+            if message["metadata"]["message_type"] != "session_welcome":
+                raise Exception(f"Expected session_welcome, got {message['metadata']['message_type']}")
+        except BaseException:
+            await websocket.close()
+            raise
+        session = message["payload"]["session"]
+        self.session_id = session["id"]
+        return websocket, session
+
+    def _handle_notification(self, metadata, payload):
+        notification = {
+            "subscription": payload["subscription"],
+            "event": payload["event"],
+            "message_id": metadata["message_id"],
+            "message_timestamp": parse_event_time(metadata["message_timestamp"]),
+        }
+        # Checking and remembering the ID is one step, as the webhook may accept it meanwhile
+        if not self.receiver.accept(notification):
+            self.stats["duplicates"] += 1
+            return
+        self.receiver.process(notification, self.echo)
+        self.stats["notifications"] += 1
+
+    def _handle_message(self, message):
+        """
+        Handles one message. Returns the reconnect URL of a session_reconnect, else None.
+        """
+        metadata, payload = message["metadata"], message["payload"]
+        message_type = metadata["message_type"]
+        if message_type == "notification":
+            self._handle_notification(metadata, payload)
+        elif message_type == "session_keepalive":
+            self.stats["keepalives"] += 1
+        elif message_type == "session_reconnect":
+            return payload["session"]["reconnect_url"]
+        elif message_type == "revocation":
+            subscription = payload["subscription"]
+            print(f"EventSub subscription {subscription['type']} revoked: {subscription['status']}")
+        return None
+
+    async def _move(self, websocket, reconnect_url):
+        """
+        Connects to the reconnect URL while still handling what arrives on the old connection,
+        which Twitch keeps delivering to until the new session is welcomed. Subscriptions move
+        with the session. Returns the new (websocket, session).
+        """
+        connecting = asyncio.ensure_future(self._connect(reconnect_url))
+        try:
+            while not connecting.done():
+                receiving = asyncio.ensure_future(websocket.recv())
+                await asyncio.wait({connecting, receiving}, return_when=asyncio.FIRST_COMPLETED)
+                if not receiving.done():
+                    receiving.cancel()  # Safe: a cancelled recv loses no message
+                    break
+                try:
+                    self._handle_message(json.loads(receiving.result()))
+                except websockets.ConnectionClosed:
+                    break  # Nothing more will come on the old connection
+            new_websocket, new_session = await connecting
+        except BaseException:
+            connecting.cancel()
+            raise
+        finally:
+            await websocket.close()
+        self.stats["reconnects"] += 1
+        return new_websocket, new_session
+
+    async def _listen(self, websocket, session):
+        """
+        Handles messages until the session moves. Returns the (websocket, session) to continue
+        with after a session_reconnect; raises when the connection drops or goes quiet.
+        """
+        keepalive_timeout = (session.get("keepalive_timeout_seconds") or 10) + KEEPALIVE_GRACE_SECONDS
+        while not self.stopped:
+            message = json.loads(await asyncio.wait_for(websocket.recv(), keepalive_timeout))
+            reconnect_url = self._handle_message(message)
+            if reconnect_url is not None:
+                return await self._move(websocket, reconnect_url)
+        await websocket.close()
+        return None, None
+
+    async def run(self):
+        backoff = 1
+        websocket = session = None
+        while not self.stopped:
+            try:
+                if websocket is None:
+                    websocket, session = await self._connect(self.url)
+                    self.stats["sessions"] += 1
+                    # Subscription requests block, so they run off the event loop
+                    await asyncio.to_thread(self.subscribe, session["id"], self.subscriptions)
+                    print(f"EventSub WebSocket session {session['id']} subscribed to {len(self.subscriptions)} topics")
+                    backoff = 1
+                websocket, session = await self._listen(websocket, session)
+            except Exception as e:
+                if websocket is not None:
+                    await websocket.close()
+                websocket = session = None
+                delay = backoff + random.uniform(0, backoff / 2)
+                print(f"EventSub WebSocket session failed ({e!r}); reconnecting in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+
+    def stop(self):
+        self.stopped = True
+
+
+def start_eventsub_websocket(subscriptions, url=EVENTSUB_WS_URL):
+    """
+    Runs an EventSub WebSocket session in a daemon thread and returns the client.
+    """
+    from threading import Thread
+
+    client = EventSubWebSocket(subscriptions, url=url)
+    Thread(target=asyncio.run, args=(client.run(),), daemon=True).start()
+    return client
+
+
+if __name__ == "__main__":
+    # Usage: python -m eventsub.eventsub_websocket <broadcaster_user_id>
+    import sys
+
+    from eventsub.eventsub_api import required_subscriptions
+
+    asyncio.run(EventSubWebSocket(required_subscriptions(sys.argv[1])).run())
@@ -0,0 +1,114 @@
+from bisect import bisect_right
+from functools import lru_cache
+
+# Version of the rules that turn badges into subscriber statistics, saved with analysis state.
+# 1: substring checks on the stored designations. Founders were not subscribers, and the months
+#    were read after the first "/", so "sub-gifter/50, subscriber/3" was a 50-month subscriber.
+# 2: badge codes. Founders are subscribers (the founder badge is kept in the designations since),
+#    and the months come from badge-info or the subscriber badge. Records stored under rule 1 are
+#    re-derived from their designations, so founders in them still count as non-subscribers.
+BADGE_RULES = 2
+
+# Bit layout of a badge code, a small int stored per chat message
+SUB_MONTHS_MASK = 0x3FF  # Bits 0-9: subscribed months, capped at 1023
+SUBSCRIBER = 1 << 10  # Founders are subscribers too
+TIER_SHIFT = 11  # Bits 11-12: subscription tier 1-3
+TIER_MASK = 0b11 << TIER_SHIFT
+FOUNDER = 1 << 13
+PREMIUM = 1 << 14  # Prime Gaming
+GIFTER_SHIFT = 15  # Bits 15-19: index + 1 of the sub-gifter badge in GIFTER_LEVELS
+GIFTER_MASK = 0b11111 << GIFTER_SHIFT
+BITS_SHIFT = 20  # Bits 20-24: index + 1 of the bits badge in BITS_LEVELS
+BITS_MASK = 0b11111 << BITS_SHIFT
+
+# Badge versions of the gift and cheer badges; a version between two levels maps to the lower one
+GIFTER_LEVELS = (1, 5, 10, 25, 50, 100, 150, 200, 250, 300, 350, 400, 450, 500, 550, 600, 650, 700, 750,
+                 800, 850, 900, 950, 1000, 1500, 2000, 2500, 3000, 4000, 5000)
+BITS_LEVELS = (1, 100, 1000, 5000, 10000, 25000, 50000, 75000, 100000, 200000, 300000, 400000, 500000,
+               600000, 700000, 800000, 900000, 1000000, 1250000, 1500000, 1750000, 2000000, 2500000,
+               3000000, 3500000, 4000000, 4500000, 5000000)
+
+
+def _version(value):
+    try:
+        return int(value)
+    except ValueError:
+        return 0
+
+
+def _encode(badges, months=None):
+    """
+    Packs (name, version) badge pairs into a code. ``months`` is the exact tenure from the
+    ``badge-info`` tag; without it the months are read off the subscriber badge's version.
+    """
+    code = 0
+    for name, version in badges:
+        if name == "subscriber":
+            version = _version(version)
+            # Tier 2 and 3 badges are versioned 2000 + months and 3000 + months
+            tier, badge_months = (1, version) if version < 1000 else divmod(version, 1000)
+            code &= ~(TIER_MASK | SUB_MONTHS_MASK)
+            code |= SUBSCRIBER | (min(tier, 3) << TIER_SHIFT) | min(badge_months, SUB_MONTHS_MASK)
+        elif name == "founder":
+            code |= SUBSCRIBER | FOUNDER
+            if not code & TIER_MASK:
+                code |= 1 << TIER_SHIFT
+        elif name == "sub-gifter":
+            code |= bisect_right(GIFTER_LEVELS, _version(version)) << GIFTER_SHIFT
+        elif name == "bits":
+            code |= bisect_right(BITS_LEVELS, _version(version)) << BITS_SHIFT
+        elif name == "premium":
+            code |= PREMIUM
+    if months is not None and code & SUBSCRIBER:
+        code = (code & ~SUB_MONTHS_MASK) | min(months, SUB_MONTHS_MASK)
+    return code
+
+
+@lru_cache(maxsize=16384)
+def badge_code(badges, badge_info=""):
+    """
+    Badge code of the raw ``badges`` and ``badge-info`` tags of a message, e.g.
+    ``"subscriber/3012,sub-gifter/5"`` and ``"subscriber/14"``.
+
+    Chatters repeat the same badge strings, so the parse is memoized per unique pair.
+    """
+    months = None
+    for info in badge_info.split(','):
+        name, _, value = info.partition('/')
+        if name == "subscriber" or name == "founder":
+            months = _version(value)
+    return _encode((badge.partition('/')[::2] for badge in badges.split(',') if badge), months)
+
+
+@lru_cache(maxsize=4096)
+def designation_code(designations):
+    """
+    Badge code of a stored designations string such as ``"subscriber/12, sub-gifter/5"``, for
+    interval records written before badge codes were stored. Badges may come in any order.
+    """
+    return _encode(badge.strip().partition('/')[::2] for badge in designations.split(','))
+
+
+def chat_badge_code(chat):
+    """
+    Badge code of a chat record, derived from its designations if it has none stored.
+    """
+    code = chat.get("badge_code")
+    return designation_code(chat["designations"]) if code is None else code
+
+
+def decode_badges(code):
+    """
+    Unpacks a badge code into a dict, with the gifter and bits badges as their badge versions.
+    """
+    gifter = (code & GIFTER_MASK) >> GIFTER_SHIFT
+    bits = (code & BITS_MASK) >> BITS_SHIFT
+    return {
+        "subscriber": bool(code & SUBSCRIBER),
+        "founder": bool(code & FOUNDER),
+        "tier": (code & TIER_MASK) >> TIER_SHIFT,
+        "months": code & SUB_MONTHS_MASK,
+        "gifter": GIFTER_LEVELS[gifter - 1] if gifter else 0,
+        "bits": BITS_LEVELS[bits - 1] if bits else 0,
+        "premium": bool(code & PREMIUM)
+    }
@@ -0,0 +1,369 @@
+import asyncio
+import os
+import ssl
+import sys
+import time
+from collections import deque
+from datetime import datetime, timedelta, UTC
+
+from auth.irc_auth import get_valid_access_token
+from helper_functions.chat_outbound import OutboundQueue
+from helper_functions.instrumentation import RECV_WAIT_SECONDS, observe_ingest, watch_buffer, watch_outbound
+from helper_functions.interval_buffer import IntervalBuffer
+from helper_functions.irc_connection import (
+    IRC_PLAIN_PORT, IRC_SERVER, IRC_TLS_PORT, RCVBUF_BYTES, handshake_bytes, tune_socket
+)
+from helper_functions.irc_parser import parse_lines
+from helper_functions.irc_reader import LineReader, RECV_WINDOW
+from helper_functions.irc_reconnect import (
+    BACKOFF_BASE_SECONDS, BACKOFF_CAP_SECONDS, READ_TIMEOUT_SECONDS, STABLE_SECONDS, backoff_delay, disconnect_reason, reconnect_stats, refresh_irc_token
+)
+from helper_functions.live_metrics import live_metrics
+from helper_functions.log_chat import finish_interval, get_chat_log_store, record_chat_messages
+from helper_functions.log_sink import OFF_SINK, get_log_sink
+from helper_functions.viewer_sampler import ViewerSampler
+
+CHANNELS_PER_CONNECTION = 100
+JOIN_LIMIT = 20  # JOIN attempts allowed per window for a regular (unverified) bot account
+JOIN_WINDOW_SECONDS = 10
+
+
+class JoinRateLimiter:
+    """
+    Sliding-window limiter for JOINs. Twitch counts JOINs per account, so one limiter is
+    shared by every connection of the engine.
+    """
+
+    def __init__(self, limit=JOIN_LIMIT, window_seconds=JOIN_WINDOW_SECONDS):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self._sent = deque()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """
+        Waits until one more JOIN fits in the window.
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._sent and now - self._sent[0] >= self.window_seconds:
+                    self._sent.popleft()
+                if len(self._sent) < self.limit:
+                    self._sent.append(now)
+                    return
+                await asyncio.sleep(self.window_seconds - (now - self._sent[0]))
+
+
+class ChannelAggregator:
+    """
+    Per-channel equivalent of ``manage_intervals``: owns the channel's interval buffer and
+    closes an interval every ``interval_minutes``.
+    """
+
+    def __init__(self, streamer_username, viewer_sampler, interval_minutes=10, flush=True, log_format="ndjson",
+                 broadcaster_user_id=None, live=None):
+        self.streamer_username = streamer_username
+        self.broadcaster_user_id = broadcaster_user_id
+        self.log_format = log_format
+        self.viewer_sampler = viewer_sampler
+        self.interval_minutes = interval_minutes
+        self.flush = flush
+        self.interval_buffer = IntervalBuffer(live=live.channel(streamer_username) if live is not None else None)
+        watch_buffer(streamer_username, self.interval_buffer)
+
+    async def _close(self, interval_start, interval_end):
+        if self.flush:
+            # File appends block, so they run off the event loop
+            try:
+                await asyncio.to_thread(
+                    finish_interval, self.streamer_username, self.interval_buffer, self.viewer_sampler,
+                    interval_start, interval_end, self.log_format, self.broadcaster_user_id
+                )
+            except Exception as e:
+                print(f"Error closing interval for {self.streamer_username}: {e}")
+        else:
+            self.interval_buffer.swap()
+
+    async def run(self):
+        """
+        Closes an interval every ``interval_minutes`` until cancelled; the interval in progress
+        when it is cancelled is closed early, so a shutdown or disconnect keeps its messages.
+        """
+        if self.flush:
+            get_chat_log_store(self.streamer_username)
+        interval_start = datetime.now(UTC)
+        closing = None
+        try:
+            while True:
+                interval_end = interval_start + timedelta(minutes=self.interval_minutes)
+                await asyncio.sleep((interval_end - datetime.now(UTC)).total_seconds())
+
+                # Shielded, so a cancellation does not abandon a write half done
+                closing = asyncio.ensure_future(self._close(interval_start, interval_end))
+                interval_start = interval_end
+                await asyncio.shield(closing)
+        except asyncio.CancelledError:
+            if closing is not None and not closing.done():
+                await closing
+            await self._close(interval_start, max(interval_start, datetime.now(UTC)))
+            raise
+
+
+class IrcConnection:
+    """
+    One IRC connection carrying a share of the engine's channels.
+
+    When the engine reconnects, a dropped connection (closed, read error, silent past
+    READ_TIMEOUT_SECONDS, RECONNECT notice, failed login) is reopened with jittered exponential
+    backoff and every channel is JOINed again. Each channel's buffer gets a gap from the last
+    read until its JOIN is re-sent.
+
+    Outbound commands wait in ``outbound`` across reconnects; a writer task sends whatever is
+    due as one write, so the read loop never waits on rate limits or the socket.
+    """
+
+    def __init__(self, engine, channels):
+        self.engine = engine
+        self.channels = channels
+        self.last_read = time.monotonic()
+        self.disconnected = None  # Monotonic time the previous connection was lost
+        self.outbound = OutboundQueue()
+
+    async def run(self):
+        engine = self.engine
+        attempt = 0
+        while True:
+            connected_at = time.monotonic()
+            reason, last_read = await self._run_once()
+            if not engine.reconnect:
+                break
+
+            disconnected = time.monotonic()
+            for channel in self.channels:
+                engine.buffer_for(channel).open_gap(last_read, reason)
+            engine.reconnect_stats.record_disconnect()
+            print(f"Connection for {len(self.channels)} channels lost ({reason}).")
+            if reason == "auth_failed":
+                try:
+                    engine.oauth_token = await asyncio.to_thread(refresh_irc_token)
+                except Exception as e:
+                    print(f"Error refreshing IRC token: {e}")
+
+            # Flapping connections keep backing off; a stable one starts over
+            attempt = 0 if disconnected - connected_at >= STABLE_SECONDS else attempt + 1
+            delay = backoff_delay(attempt, engine.backoff_base, engine.backoff_cap)
+            print(f"Reconnecting in {delay:.1f}s (attempt {attempt + 1})...")
+            await asyncio.sleep(delay)
+            if self.disconnected is None:
+                self.disconnected = disconnected
+
+    async def _run_once(self):
+        """
+        Runs one connection until it drops. Returns the reason and the time of the last read.
+        """
+        engine = self.engine
+        last_read = datetime.now(UTC)
+        try:
+            reader, writer = await asyncio.open_connection(
+                engine.host, engine.port, ssl=engine.ssl_context,
+                server_hostname=engine.host if engine.ssl_context else None
+            )
+        except OSError as e:
+            engine.reconnect_stats.record_failure()
+            return f"connect failed: {e}", last_read
+
+        tune_socket(writer.get_extra_info("socket"), engine.rcvbuf)
+        writer.write(handshake_bytes(engine.oauth_token, engine.bot_username))
+        join_task = asyncio.create_task(self._join_channels(writer))
+        self.last_read = time.monotonic()
+        watchdog_task = asyncio.create_task(self._watchdog(writer))
+        send_task = asyncio.create_task(self._send_outbound(writer))
+        outbound = self.outbound
+        framer = LineReader(None)
+        reason = "closed"
+        try:
+            await writer.drain()
+            while True:
+                read_started = time.perf_counter()
+                data = await reader.read(RECV_WINDOW)
+                RECV_WAIT_SECONDS.observe(time.perf_counter() - read_started)
+                if not data:
+                    if time.monotonic() - self.last_read >= READ_TIMEOUT_SECONDS:
+                        reason = "timeout"
+                    print(f"Connection for {len(self.channels)} channels closed by server.")
+                    break
+                self.last_read = time.monotonic()
+                last_read = datetime.now(UTC)
+
+                lines = framer.feed(data)
+                if not lines:
+                    continue
+                timestamp_ms = time.time_ns() // 1_000_000
+                started = time.perf_counter_ns()
+                irc_messages = parse_lines(lines)
+                parsed = time.perf_counter_ns()
+                other_messages = record_chat_messages(irc_messages, timestamp_ms, engine.buffer_for, engine.sink,
+                                                      engine.commands)
+                observe_ingest(len(lines), parsed - started, time.perf_counter_ns() - parsed)
+                for irc_message in other_messages:
+                    if irc_message.command == "PING":
+                        outbound.send_raw(f"PONG :{irc_message.trailing}")
+                    elif irc_message.command == "USERSTATE":
+                        outbound.update_user_state(irc_message)
+                    else:
+                        reason = disconnect_reason(irc_message) or reason
+                if reason != "closed":
+                    break
+        except OSError as e:
+            print(f"Connection for {len(self.channels)} channels failed: {e}")
+            reason = "error"
+        finally:
+            join_task.cancel()
+            watchdog_task.cancel()
+            send_task.cancel()
+            self.outbound.notify = None
+            writer.close()
+        return reason, last_read
+
+    async def _send_outbound(self, writer):
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+        # Messages may be queued from other threads, e.g. an interval summary
+        self.outbound.notify = lambda: loop.call_soon_threadsafe(wakeup.set)
+        while True:
+            wakeup.clear()
+            payload, wait = self.outbound.take_ready()
+            if payload:
+                writer.write(payload)
+                await writer.drain()
+                continue
+            try:
+                await asyncio.wait_for(wakeup.wait(), wait)
+            except TimeoutError:
+                pass
+
+    async def _watchdog(self, writer):
+        # Closing the transport makes the pending read return, so a silent link is noticed
+        while True:
+            await asyncio.sleep(READ_TIMEOUT_SECONDS / 4)
+            if time.monotonic() - self.last_read >= READ_TIMEOUT_SECONDS:
+                writer.close()
+                return
+
+    async def _join_channels(self, writer):
+        engine = self.engine
+        for channel in self.channels:
+            await engine.join_limiter.acquire()
+            writer.write(f"JOIN #{channel}\r\n".encode('utf-8'))
+            await writer.drain()
+            engine.buffer_for(channel).close_gap(datetime.now(UTC))
+        print(f"Joined {len(self.channels)} channels on one connection.")
+        if self.disconnected is not None:
+            reconnect_seconds = time.monotonic() - self.disconnected
+            engine.reconnect_stats.record_reconnect(round(reconnect_seconds, 3))
+            print(f"Reconnected {len(self.channels)} channels after {reconnect_seconds:.1f}s.")
+            self.disconnected = None
+
+
+class ChatEngine:
+    """
+    Logs many channels from one process: channels are spread over a small pool of IRC
+    connections and every message is routed to the interval aggregator of its channel.
+    ``broadcaster_ids`` maps channels to Twitch user IDs for the EventSub counts of each interval.
+    ``echo`` is True for the shared log sink, False for no output, or a LogSink. ``tls`` is
+    True for TLS on 6697, False for plaintext on 6667, or an SSLContext to use. With
+    ``reconnect`` set, dropped connections are reopened and their channels re-JOINed.
+    ``commands`` (a CommandDispatcher) answers chat commands through ``send``. ``live`` (a
+    LiveMetrics, or None) receives per-second message, event and viewer counts of every channel.
+    """
+
+    def __init__(self, bot_username, channels, oauth_token=None, host=IRC_SERVER, port=None, tls=True,
+                 rcvbuf=RCVBUF_BYTES, channels_per_connection=CHANNELS_PER_CONNECTION, join_limiter=None,
+                 interval_minutes=10, echo=True, flush=True, log_format="ndjson", broadcaster_ids=None,
+                 reconnect=True, backoff_base=BACKOFF_BASE_SECONDS, backoff_cap=BACKOFF_CAP_SECONDS, commands=None,
+                 live=live_metrics):
+        if oauth_token is None:
+            oauth_token = get_valid_access_token(os.getenv("TWITCH_CLIENT_ID"), os.getenv("TWITCH_CLIENT_SECRET"))
+        self.bot_username = bot_username
+        self.oauth_token = oauth_token
+        self.host = host
+        self.port = port or (IRC_TLS_PORT if tls else IRC_PLAIN_PORT)
+        self.ssl_context = ssl.create_default_context() if tls is True else tls or None
+        self.rcvbuf = rcvbuf
+        self.sink = get_log_sink() if echo is True else OFF_SINK if echo is False else echo
+        self.join_limiter = join_limiter
+        self.reconnect = reconnect
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.reconnect_stats = reconnect_stats
+        self.commands = commands
+        if commands is not None:
+            commands.send = self.send
+
+        channels = [channel.lower().lstrip('#') for channel in channels]
+        # One sampler polls every channel with batched Helix requests
+        self.viewer_sampler = ViewerSampler(channels, live=live)
+        self.flush = flush
+        broadcaster_ids = broadcaster_ids or {}
+        self.aggregators = {
+            channel: ChannelAggregator(
+                channel, self.viewer_sampler, interval_minutes, flush, log_format, broadcaster_ids.get(channel), live
+            )
+            for channel in channels
+        }
+        self.connections = [
+            IrcConnection(self, channels[i:i + channels_per_connection])
+            for i in range(0, len(channels), channels_per_connection)
+        ]
+        for index, connection in enumerate(self.connections):
+            watch_outbound(str(index), connection.outbound)
+        self.connection_for = {
+            channel: connection for connection in self.connections for channel in connection.channels
+        }
+
+    def send(self, channel, text):
+        """
+        Queues a chat message on the connection that carries the channel. Returns False if it was dropped.
+        """
+        channel = channel.lower().lstrip('#')
+        connection = self.connection_for.get(channel)
+        if connection is None:
+            raise Exception(f"Channel {channel} is not monitored by this engine")
+        return connection.outbound.send_message(channel, text)
+
+    def buffer_for(self, channel):
+        """
+        Returns the interval buffer of a monitored channel, or None.
+        """
+        aggregator = self.aggregators.get(channel)
+        return aggregator.interval_buffer if aggregator else None
+
+    async def run(self):
+        """
+        Runs every connection and aggregator until all connections have closed, then closes
+        the interval in progress of every channel.
+        """
+        if self.join_limiter is None:
+            self.join_limiter = JoinRateLimiter()
+        if self.flush:
+            self.viewer_sampler.start()
+
+        aggregator_tasks = [asyncio.create_task(aggregator.run()) for aggregator in self.aggregators.values()]
+        try:
+            await asyncio.gather(*(connection.run() for connection in self.connections))
+        finally:
+            # Cancelled aggregators write their partial interval before they finish
+            for task in aggregator_tasks:
+                task.cancel()
+            await asyncio.gather(*aggregator_tasks, return_exceptions=True)
+            self.viewer_sampler.stop()
+
+
+if __name__ == "__main__":
+    # Usage: python -m helper_functions.chat_engine <bot_username> <channel> [<channel> ...]
+    engine = ChatEngine(sys.argv[1], sys.argv[2:])
+    try:
+        asyncio.run(engine.run())
+    except KeyboardInterrupt:
+        print("Shutting down...")
@@ -0,0 +1,243 @@
+import time
+from collections import deque
+from threading import Lock
+
+RATE_WINDOW_SECONDS = 30
+USER_MESSAGES_PER_WINDOW = 20  # Twitch's limit while the bot is not a moderator
+MODERATOR_MESSAGES_PER_WINDOW = 100  # Limit in channels where the bot is a moderator or the broadcaster
+BURST_FRACTION = 0.25  # Share of a window's messages that may go out back to back
+MAX_QUEUED_PER_CHANNEL = 100
+MAX_MESSAGE_CHARS = 500
+
+
+class TokenBucket:
+    """
+    Token bucket sized so no rate window ever sees more than ``limit`` messages: it holds
+    ``burst`` tokens and refills the remaining ``limit - burst`` over the window, since a
+    full bucket plus a window's refill is the most that can be spent in one window.
+    """
+
+    def __init__(self, limit, window_seconds=RATE_WINDOW_SECONDS, burst_fraction=BURST_FRACTION):
+        self.window_seconds = window_seconds
+        self.burst_fraction = burst_fraction
+        self.updated = time.monotonic()
+        self.tokens = 0.0
+        self.set_limit(limit)
+        self.tokens = self.burst
+
+    def set_limit(self, limit):
+        self.limit = limit
+        self.burst = max(1, int(limit * self.burst_fraction))
+        self.rate = (limit - self.burst) / self.window_seconds
+        self.tokens = min(self.tokens, self.burst)
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now):
+        """
+        Seconds until one token is available (0 if one is available now).
+        """
+        self._refill(now)
+        # The tolerance keeps rounding error from asking for waits too small to advance the clock
+        return 0.0 if self.tokens >= 1 - 1e-9 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+
+def privmsg_line(channel, text):
+    """
+    Formats a PRIVMSG, flattening line breaks so the text cannot smuggle in another command.
+    """
+    text = " ".join(text.splitlines()).strip()[:MAX_MESSAGE_CHARS]
+    return f"PRIVMSG #{channel} :{text}\r\n"
+
+
+class OutboundQueue:
+    """
+    Outbound commands of one chat connection.
+
+    Callers only append to the queue, so sending never blocks whoever asked for it; the
+    connection's writer calls ``take_ready`` and sends everything that is due as one write.
+    Protocol replies such as PONG bypass the limits. PRIVMSGs are released round-robin across
+    channels, each within its channel's bucket and the connection's bucket at the moderator
+    limit; a channel's bucket is raised to the moderator limit once a USERSTATE shows the bot
+    moderates it, and the channels it does not moderate also share one bucket at the user
+    limit, since Twitch counts the user limit across all of them.
+    ``notify``, if set, is called after every enqueue so an idle writer can wake up.
+    """
+
+    def __init__(self, user_limit=USER_MESSAGES_PER_WINDOW, moderator_limit=MODERATOR_MESSAGES_PER_WINDOW,
+                 window_seconds=RATE_WINDOW_SECONDS, max_queued_per_channel=MAX_QUEUED_PER_CHANNEL):
+        self.user_limit = user_limit
+        self.moderator_limit = moderator_limit
+        self.window_seconds = window_seconds
+        self.max_queued_per_channel = max_queued_per_channel
+        self.notify = None
+
+        self._lock = Lock()
+        self._raw = []
+        self._pending = {}  # Channel -> deque of PRIVMSG lines, only while non-empty
+        self._buckets = {}
+        self._moderated = set()
+        self._connection_bucket = TokenBucket(moderator_limit, window_seconds)
+        self._user_bucket = TokenBucket(user_limit, window_seconds)  # Shared by the channels not moderated
+
+        self.sent = 0
+        self.writes = 0
+        self.dropped = 0
+
+    def _bucket(self, channel):
+        bucket = self._buckets.get(channel)
+        if bucket is None:
+            limit = self.moderator_limit if channel in self._moderated else self.user_limit
+            bucket = self._buckets[channel] = TokenBucket(limit, self.window_seconds)
+        return bucket
+
+    def send_raw(self, line):
+        """
+        Queues a protocol line (without its ``\\r\\n``) that is not rate limited, e.g. a PONG.
+        """
+        with self._lock:
+            self._raw.append(f"{line}\r\n")
+        if self.notify:
+            self.notify()
+
+    def send_message(self, channel, text):
+        """
+        Queues a chat message. Returns False if the channel's queue is full and it was dropped.
+        """
+        channel = channel.lower().lstrip('#')
+        with self._lock:
+            queue = self._pending.get(channel)
+            if queue is None:
+                queue = self._pending[channel] = deque()
+            elif len(queue) >= self.max_queued_per_channel:
+                self.dropped += 1
+                return False
+            queue.append(privmsg_line(channel, text))
+        if self.notify:
+            self.notify()
+        return True
+
+    def set_moderator(self, channel, is_moderator):
+        """
+        Applies the bot's status in a channel, as reported by USERSTATE.
+        """
+        with self._lock:
+            if is_moderator:
+                self._moderated.add(channel)
+            else:
+                self._moderated.discard(channel)
+            self._bucket(channel).set_limit(self.moderator_limit if is_moderator else self.user_limit)
+
+    def update_user_state(self, irc_message):
+        badges = irc_message.tag("badges", "")
+        self.set_moderator(
+            irc_message.channel,
+            irc_message.tag("mod") == "1" or "broadcaster/" in badges or "moderator/" in badges
+        )
+
+    def pending(self):
+        with self._lock:
+            return len(self._raw) + sum(len(queue) for queue in self._pending.values())
+
+    def take_ready(self, now=None):
+        """
+        Returns (payload, wait): everything that may be sent now as one bytes object, and the
+        seconds until more becomes sendable (None when nothing else is queued).
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            lines, self._raw = self._raw, []
+            wait = None
+            connection_bucket = self._connection_bucket
+            user_bucket = self._user_bucket
+            progressed = True
+            while self._pending and progressed:
+                progressed = False
+                for channel in list(self._pending):
+                    connection_wait = connection_bucket.wait_time(now)
+                    if connection_wait:
+                        wait = connection_wait
+                        break
+                    bucket = self._bucket(channel)
+                    channel_wait = bucket.wait_time(now)
+                    moderated = channel in self._moderated
+                    if not moderated:
+                        channel_wait = max(channel_wait, user_bucket.wait_time(now))
+                    if channel_wait:
+                        wait = channel_wait if wait is None else min(wait, channel_wait)
+                        continue
+                    queue = self._pending[channel]
+                    lines.append(queue.popleft())
+                    if not queue:
+                        del self._pending[channel]
+                    bucket.take(now)
+                    if not moderated:
+                        user_bucket.take(now)
+                    connection_bucket.take(now)
+                    self.sent += 1
+                    progressed = True
+            if not self._pending:
+                wait = None
+            if lines:
+                self.writes += 1
+        return "".join(lines).encode('utf-8'), wait
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": len(self._raw) + sum(len(queue) for queue in self._pending.values()),
+                "sent": self.sent,
+                "writes": self.writes,
+                "dropped": self.dropped
+            }
+
+
+class CommandDispatcher:
+    """
+    Chat commands keyed on their first word (``!name``), found with one dict lookup.
+
+    Handlers are called as ``handler(channel, username, args)`` on the read loop, so they
+    must be quick; a returned string is queued as the reply through ``send``, which the
+    connection owning the dispatcher sets to its outbound queue.
+    """
+
+    def __init__(self, prefix="!", send=None):
+        self.prefix = prefix
+        self.send = send
+        self.handlers = {}
+
+    def register(self, name, handler):
+        self.handlers[self.prefix + name.lower()] = handler
+
+    def command(self, name):
+        """
+        Decorator form of ``register``.
+        """
+        def decorator(handler):
+            self.register(name, handler)
+            return handler
+        return decorator
+
+    def dispatch(self, channel, username, message):
+        """
+        Runs the handler of a message starting with the prefix. Returns True if one matched.
+        """
+        name, _, args = message.partition(" ")
+        handler = self.handlers.get(name.lower())
+        if handler is None:
+            return False
+        try:
+            reply = handler(channel, username, args.strip())
+        except Exception as e:
+            print(f"Error in command {name} from {username} in #{channel}: {e}")
+            return True
+        if reply and self.send is not None:
+            self.send(channel, reply)
+        return True
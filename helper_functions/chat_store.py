@@ -0,0 +1,204 @@
+import json
+import os
+import shutil
+
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024  # Start a new segment once the current one reaches 64 MB
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def store_path(streamer_username):
+    """
+    Returns the directory holding the chat log segments of a streamer.
+    """
+    return f"{streamer_username}_chat_log"
+
+
+def _format_time(value):
+    """
+    Normalizes a datetime or ISO string to the timestamp format used in interval records.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    return value.strftime(TIME_FORMAT)
+
+
+def _append_line(path, line):
+    """
+    Appends one newline-terminated record and makes it durable before returning.
+    """
+    with open(path, "ab") as file:
+        offset = file.tell()
+        file.write(line)
+        file.flush()
+        os.fsync(file.fileno())
+    return offset
+
+
+class ChatLogStore:
+    """
+    Append-only store of interval records kept as newline-delimited JSON segments.
+
+    Each segment ``segment_NNNNN.ndjson`` holds one interval per line and has a sibling
+    ``segment_NNNNN.idx`` with the start/end time, byte offset and length of every interval,
+    so a flush costs only the size of the interval and readers can seek to a time range.
+    """
+
+    def __init__(self, path, segment_max_bytes=SEGMENT_MAX_BYTES, writable=True):
+        self.path = path
+        self.segment_max_bytes = segment_max_bytes
+
+        # Only the writer repairs the tail; readers never modify files on disk
+        if writable:
+            os.makedirs(path, exist_ok=True)
+        segments = self.segments()
+        self._segment = segments[-1] if segments else 0
+        if writable:
+            self._recover(self._segment)
+
+    def _data_file(self, segment):
+        return os.path.join(self.path, f"segment_{segment:05d}.ndjson")
+
+    def _index_file(self, segment):
+        return os.path.join(self.path, f"segment_{segment:05d}.idx")
+
+    def segments(self):
+        """
+        Lists the segment numbers present on disk in ascending order.
+        """
+        segments = []
+        for name in os.listdir(self.path):
+            if name.startswith("segment_") and name.endswith(".ndjson"):
+                segments.append(int(name[len("segment_"):-len(".ndjson")]))
+        return sorted(segments)
+
+    def read_index(self, segment):
+        """
+        Returns the index entries of a segment, ignoring a torn trailing line.
+        """
+        index_file = self._index_file(segment)
+        if not os.path.exists(index_file):
+            return []
+        entries = []
+        with open(index_file, "rb") as file:
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                entries.append(json.loads(line))
+        return entries
+
+    def _recover(self, segment):
+        """
+        Brings the last segment back to a consistent state after a crash.
+
+        Complete interval lines that were written but never indexed are indexed now;
+        a partially written trailing line is truncated away.
+        """
+        data_file = self._data_file(segment)
+        index_file = self._index_file(segment)
+        if not os.path.exists(data_file):
+            return
+
+        if os.path.exists(index_file):
+            with open(index_file, "rb+") as file:
+                file.truncate(file.read().rfind(b"\n") + 1)
+        entries = self.read_index(segment)
+
+        indexed_end = entries[-1]["offset"] + entries[-1]["length"] if entries else 0
+        with open(data_file, "rb") as file:
+            file.seek(indexed_end)
+            tail = file.read()
+
+        offset = indexed_end
+        for line in tail.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                interval_data = json.loads(line)
+            except ValueError:
+                break
+            self._write_index(segment, interval_data, offset, len(line))
+            offset += len(line)
+
+        if offset < indexed_end + len(tail):
+            with open(data_file, "ab") as file:
+                file.truncate(offset)
+            print(f"Truncated {indexed_end + len(tail) - offset} bytes of partial interval data in {data_file}")
+
+    def _write_index(self, segment, interval_data, offset, length):
+        entry = {
+            "start_time": interval_data.get("start_time"),
+            "end_time": interval_data.get("end_time"),
+            "offset": offset,
+            "length": length
+        }
+        _append_line(self._index_file(segment), json.dumps(entry, separators=(",", ":")).encode('utf-8') + b"\n")
+
+    def append(self, interval_data):
+        """
+        Appends one interval record, rolling over to a new segment when the current one is full.
+        """
+        line = json.dumps(interval_data, separators=(",", ":")).encode('utf-8') + b"\n"
+
+        data_file = self._data_file(self._segment)
+        size = os.path.getsize(data_file) if os.path.exists(data_file) else 0
+        if size and size + len(line) > self.segment_max_bytes:
+            self._segment += 1
+            data_file = self._data_file(self._segment)
+
+        offset = _append_line(data_file, line)
+        self._write_index(self._segment, interval_data, offset, len(line))
+        return data_file
+
+    def iter_intervals(self, start_time=None, end_time=None):
+        """
+        Yields interval records overlapping [start_time, end_time) without parsing the rest of the history.
+        """
+        start_time, end_time = _format_time(start_time), _format_time(end_time)
+        for segment in self.segments():
+            entries = [
+                entry for entry in self.read_index(segment)
+                if (start_time is None or entry["end_time"] > start_time)
+                and (end_time is None or entry["start_time"] < end_time)
+            ]
+            if not entries:
+                continue
+            with open(self._data_file(segment), "rb") as file:
+                for entry in entries:
+                    file.seek(entry["offset"])
+                    yield json.loads(file.read(entry["length"]))
+
+
+def open_interval_range(path, start_time=None, end_time=None):
+    """
+    Reads intervals from a segmented store directory or, for older logs, a single JSON file.
+    """
+    if os.path.isdir(path):
+        yield from ChatLogStore(path, writable=False).iter_intervals(start_time, end_time)
+        return
+
+    start_time, end_time = _format_time(start_time), _format_time(end_time)
+    with open(path, 'r') as file:
+        for interval_data in json.load(file):
+            if start_time is not None and interval_data["end_time"] <= start_time:
+                continue
+            if end_time is not None and interval_data["start_time"] >= end_time:
+                continue
+            yield interval_data
+
+
+def migrate_json_log(json_path, path):
+    """
+    Copies an existing single-file JSON chat log into a segmented store.
+
+    The store is built in a sibling directory and renamed into place once every interval is
+    in it, so ``path`` only exists after a complete migration; an interrupted one starts over.
+    """
+    migrating_path = f"{path}.migrating"
+    if os.path.exists(migrating_path):
+        shutil.rmtree(migrating_path)
+    store = ChatLogStore(migrating_path)
+    with open(json_path, 'r') as file:
+        for interval_data in json.load(file):
+            store.append(interval_data)
+    os.replace(migrating_path, path)
+    return ChatLogStore(path)
@@ -0,0 +1,354 @@
+import json
+import os
+from datetime import datetime, UTC
+
+import numpy as np
+
+from helper_functions.badges import chat_badge_code, designation_code
+
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+# One binary file per column. Rows of intervals.bin are (start_ms, end_ms, viewers, chat_rows,
+# event_rows) and are written after the columns, so an interval row commits its data.
+INTERVAL_FIELDS = 5
+CHAT_COLUMNS = {
+    "chat_timestamp": np.int64,
+    "chat_username": np.int32,
+    "chat_designations": np.int32,
+    "chat_badges": np.int32,
+}
+EVENT_COLUMNS = {
+    "event_timestamp": np.int64,
+    "event_username": np.int32,
+    "event_type": np.int32,
+    "event_recipient": np.int32,
+    "event_months": np.int64,
+    "event_gift_count": np.int64,
+    "event_raider_count": np.int64,
+}
+
+# Special event fields stored as numbers; missing values are stored as -1
+EVENT_NUMBER_FIELDS = ("months", "gift_count", "raider_count")
+
+# Dictionaries shared by every interval: one JSON string per line, the line number is the code
+DICTIONARIES = ("usernames", "designations", "event_types")
+
+
+def columns_path(streamer_username):
+    """
+    Returns the directory holding the columnar chat log of a streamer.
+    """
+    return f"{streamer_username}_chat_columns"
+
+
+def to_epoch_ms(timestamp, cache):
+    """
+    Converts an interval-record timestamp to int64 epoch milliseconds. Messages of one read
+    share a timestamp, so conversions are cached.
+    """
+    epoch_ms = cache.get(timestamp)
+    if epoch_ms is None:
+        epoch_ms = int(datetime.strptime(timestamp, TIME_FORMAT).replace(tzinfo=UTC).timestamp() * 1000)
+        cache[timestamp] = epoch_ms
+    return epoch_ms
+
+
+def from_epoch_ms(epoch_ms):
+    return datetime.fromtimestamp(epoch_ms / 1000, UTC).strftime(TIME_FORMAT)
+
+
+def _read_complete(path):
+    """
+    Returns the contents of a file up to its last newline, ignoring a torn last line.
+    """
+    if not os.path.exists(path):
+        return b""
+    with open(path, 'rb') as file:
+        data = file.read()
+    return data[:data.rfind(b"\n") + 1]
+
+
+def _read_dictionary(path):
+    # json.dumps escapes newlines, so the lines of JSON strings join into one JSON array
+    data = _read_complete(path).decode('utf-8')
+    return json.loads("[" + data.rstrip("\n").replace("\n", ",") + "]")
+
+
+def _append_bytes(path, data):
+    with open(path, 'ab') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+class ColumnarLogStore:
+    """
+    Append-only columnar chat log of one streamer.
+
+    Usernames, designations and event types are dictionary-encoded into int32 codes that are
+    global to the store, and timestamps are int64 epoch milliseconds, so a reader loads a
+    whole month with one ``np.fromfile`` per column. Badges are also kept as int32 badge codes
+    (see ``helper_functions.badges``) so analysis tests bits instead of strings. Message text is kept one JSON string per
+    line in ``chat_message.jsonl``; analysis never needs it.
+    """
+
+    def __init__(self, path, writable=True):
+        self.path = path
+        self.writable = writable
+        if writable:
+            os.makedirs(path, exist_ok=True)
+        self.dictionaries = {
+            name: _read_dictionary(self._file(f"{name}.jsonl")) for name in DICTIONARIES
+        }
+        self.codes = {
+            name: {symbol: code for code, symbol in enumerate(symbols)}
+            for name, symbols in self.dictionaries.items()
+        }
+        if writable:
+            self._recover()
+            self._backfill_badges()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def read_intervals(self):
+        """
+        Returns the committed interval rows as an (n, 5) int64 array.
+        """
+        path = self._file("intervals.bin")
+        if not os.path.exists(path):
+            return np.empty((0, INTERVAL_FIELDS), dtype=np.int64)
+        rows = np.fromfile(path, dtype=np.int64)
+        count = len(rows) // INTERVAL_FIELDS
+        return rows[:count * INTERVAL_FIELDS].reshape(count, INTERVAL_FIELDS)
+
+    def _recover(self):
+        """
+        Truncates everything written after the last committed interval, e.g. by a crash in the
+        middle of ``append``. Extra dictionary entries are harmless and kept.
+        """
+        intervals = self.read_intervals()
+        chat_rows, event_rows = int(intervals[:, 3].sum()), int(intervals[:, 4].sum())
+        sizes = {"intervals.bin": intervals.nbytes}
+        for columns, rows in ((CHAT_COLUMNS, chat_rows), (EVENT_COLUMNS, event_rows)):
+            for name, dtype in columns.items():
+                sizes[f"{name}.bin"] = rows * np.dtype(dtype).itemsize
+        messages = _read_complete(self._file("chat_message.jsonl"))
+        sizes["chat_message.jsonl"] = sum(len(line) + 1 for line in messages.split(b"\n")[:chat_rows])
+        for name in DICTIONARIES:
+            sizes[f"{name}.jsonl"] = len(_read_complete(self._file(f"{name}.jsonl")))
+
+        for name, size in sizes.items():
+            with open(self._file(name), 'ab') as file:
+                if file.tell() > size:
+                    print(f"Truncating uncommitted tail of {self._file(name)}")
+                    file.truncate(size)
+
+    def _designation_badges(self):
+        """
+        Badge code of every designation in the dictionary, indexed by designation code.
+        """
+        return np.array([designation_code(designation) for designation in self.dictionaries["designations"]],
+                        dtype=np.int32)
+
+    def _badge_rows(self):
+        path = self._file("chat_badges.bin")
+        return os.path.getsize(path) // np.dtype(np.int32).itemsize if os.path.exists(path) else 0
+
+    def _backfill_badges(self):
+        """
+        Derives the badge codes of messages stored before the ``chat_badges`` column existed
+        from their designations.
+        """
+        chat_rows = int(self.read_intervals()[:, 3].sum())
+        badge_rows = self._badge_rows()
+        if badge_rows < chat_rows:
+            print(f"Deriving badge codes of {chat_rows - badge_rows} messages in {self.path}")
+            designations = self._read_column("chat_designations", np.int32, badge_rows, chat_rows - badge_rows)
+            _append_bytes(self._file("chat_badges.bin"), self._designation_badges()[designations].tobytes())
+
+    def _encode(self, name, values, new_symbols):
+        """
+        Dictionary-encodes strings. Symbols seen for the first time get the next free codes in
+        new_symbols ({name: {symbol: code}}); the store's tables are left as they are.
+        """
+        table, pending = self.codes[name], new_symbols[name]
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = table.get(value)
+            if code is None:
+                code = pending.get(value)
+                if code is None:
+                    code = pending[value] = len(self.dictionaries[name]) + len(pending)
+            codes[i] = code
+        return codes
+
+    def _write(self, contents):
+        """
+        Appends to several files, in order. If a write fails, every file is cut back to its
+        size before the call, so the files never run ahead of the store's tables.
+        """
+        sizes = {}
+        try:
+            for name, data in contents:
+                path = self._file(name)
+                sizes[path] = os.path.getsize(path) if os.path.exists(path) else 0
+                _append_bytes(path, data)
+        except BaseException:
+            for path, size in sizes.items():
+                with open(path, 'ab') as file:
+                    file.truncate(size)
+            raise
+
+    def append(self, interval_data):
+        """
+        Appends one interval record and returns the store directory.
+
+        Everything is encoded before the first write, and symbols seen for the first time
+        only join the dictionaries once every file is written, so a failed append leaves the
+        store as it was. ``intervals.bin`` is written last; after a crash, ``_recover`` cuts
+        the columns back to the intervals it holds.
+        """
+        if not self.writable:
+            raise Exception(f"Columnar chat log {self.path} was opened read-only")
+
+        time_cache = {}
+        new_symbols = {name: {} for name in DICTIONARIES}
+        chat_logs = interval_data["chat_logs"]
+        events = interval_data.get("special_events", [])
+
+        columns = {
+            "chat_timestamp": np.array([to_epoch_ms(chat["timestamp"], time_cache) for chat in chat_logs], dtype=np.int64),
+            "chat_username": self._encode("usernames", [chat["username"] for chat in chat_logs], new_symbols),
+            "chat_designations": self._encode("designations", [chat["designations"] for chat in chat_logs], new_symbols),
+            "chat_badges": np.array([chat_badge_code(chat) for chat in chat_logs], dtype=np.int32),
+            "event_timestamp": np.array([to_epoch_ms(event["timestamp"], time_cache) for event in events], dtype=np.int64),
+            "event_username": self._encode("usernames", [event.get("username", "") for event in events], new_symbols),
+            "event_type": self._encode("event_types", [event.get("event_type", "") for event in events], new_symbols),
+            "event_recipient": self._encode("usernames", [event.get("recipient", "") for event in events], new_symbols),
+        }
+        for field in EVENT_NUMBER_FIELDS:
+            columns[f"event_{field}"] = np.array([int(event.get(field, -1)) for event in events], dtype=np.int64)
+
+        viewers = interval_data.get("viewers")
+        interval_row = np.array([
+            to_epoch_ms(interval_data["start_time"], time_cache),
+            to_epoch_ms(interval_data["end_time"], time_cache),
+            -1 if viewers is None else viewers,
+            len(chat_logs),
+            len(events)
+        ], dtype=np.int64)
+
+        contents = [
+            (f"{name}.jsonl", "".join(json.dumps(symbol) + "\n" for symbol in symbols).encode('utf-8'))
+            for name, symbols in new_symbols.items() if symbols
+        ]
+        contents.extend((f"{name}.bin", values.tobytes()) for name, values in columns.items())
+        contents.append(("chat_message.jsonl",
+                         "".join(json.dumps(chat["message"]) + "\n" for chat in chat_logs).encode('utf-8')))
+        contents.append(("intervals.bin", interval_row.tobytes()))
+        self._write(contents)
+
+        for name, symbols in new_symbols.items():
+            self.dictionaries[name].extend(symbols)
+            self.codes[name].update(symbols)
+        return self.path
+
+    def _read_column(self, name, dtype, first_row, rows):
+        path = self._file(f"{name}.bin")
+        if not rows or not os.path.exists(path):
+            return np.empty(0, dtype=dtype)
+        return np.fromfile(path, dtype=dtype, count=rows, offset=first_row * np.dtype(dtype).itemsize)
+
+    def load(self, start_time=None, end_time=None):
+        """
+        Loads the intervals overlapping [start_time, end_time) as a dict of columns.
+
+        ``chat_interval`` / ``event_interval`` index into the ``interval_start`` /
+        ``interval_end`` arrays and string columns are codes into the ``usernames``,
+        ``designations`` and ``event_types`` lists. Times are ISO strings.
+        """
+        time_cache = {}
+        intervals = self.read_intervals()
+        selected = np.ones(len(intervals), dtype=bool)
+        if start_time:
+            selected &= intervals[:, 1] > to_epoch_ms(start_time, time_cache)
+        if end_time:
+            selected &= intervals[:, 0] < to_epoch_ms(end_time, time_cache)
+
+        # Intervals are appended in time order, so a range is one contiguous run of rows
+        indexes = np.flatnonzero(selected)
+        first, last = (int(indexes[0]), int(indexes[-1]) + 1) if len(indexes) else (0, 0)
+        chat_offsets = np.concatenate(([0], np.cumsum(intervals[:, 3])))
+        event_offsets = np.concatenate(([0], np.cumsum(intervals[:, 4])))
+        intervals = intervals[first:last]
+
+        columns = {}
+        for table, offsets in ((CHAT_COLUMNS, chat_offsets), (EVENT_COLUMNS, event_offsets)):
+            for name, dtype in table.items():
+                columns[name] = self._read_column(name, dtype, int(offsets[first]), int(offsets[last] - offsets[first]))
+        if self._badge_rows() < chat_offsets[last]:
+            # Stores written before the badge column only get it once opened for writing
+            columns["chat_badges"] = self._designation_badges()[columns["chat_designations"]]
+
+        interval_numbers = np.arange(len(intervals), dtype=np.int32)
+        columns["chat_interval"] = np.repeat(interval_numbers, intervals[:, 3])
+        columns["event_interval"] = np.repeat(interval_numbers, intervals[:, 4])
+        columns["interval_start"] = intervals[:, 0].copy()
+        columns["interval_end"] = intervals[:, 1].copy()
+        columns["viewers"] = intervals[:, 2].copy()
+        columns.update(self.dictionaries)
+        return columns
+
+
+# Open columnar stores, keyed by directory, so dictionaries are read once per process
+_stores = {}
+
+
+def append_interval_columns(streamer_username, interval_data, path=None):
+    """
+    Appends one interval to the streamer's columnar chat log and returns its directory.
+    """
+    path = path or columns_path(streamer_username)
+    if path not in _stores:
+        _stores[path] = ColumnarLogStore(path)
+    return _stores[path].append(interval_data)
+
+
+def load_columns(path, start_time=None, end_time=None):
+    """
+    Loads a columnar chat log without modifying it, optionally limited to a time range.
+    """
+    return ColumnarLogStore(path, writable=False).load(start_time, end_time)
+
+
+def export_parquet(intervals, parquet_path):
+    """
+    Exports interval records to a Parquet file of chat messages with dictionary-encoded
+    string columns. Requires pyarrow.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    time_cache = {}
+    interval_starts, timestamps, usernames, designations, badge_codes, messages = [], [], [], [], [], []
+    for interval_data in intervals:
+        start_ms = to_epoch_ms(interval_data["start_time"], time_cache)
+        for chat in interval_data["chat_logs"]:
+            interval_starts.append(start_ms)
+            timestamps.append(to_epoch_ms(chat["timestamp"], time_cache))
+            usernames.append(chat["username"])
+            designations.append(chat["designations"])
+            badge_codes.append(chat_badge_code(chat))
+            messages.append(chat["message"])
+
+    table = pa.table({
+        "interval_start": pa.array(interval_starts, type=pa.int64()),
+        "timestamp": pa.array(timestamps, type=pa.int64()),
+        "username": pa.array(usernames).dictionary_encode(),
+        "designations": pa.array(designations).dictionary_encode(),
+        "badge_code": pa.array(badge_codes, type=pa.int32()),
+        "message": pa.array(messages),
+    })
+    pq.write_table(table, parquet_path)
+    return parquet_path
@@ -0,0 +1,360 @@
+import collections
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from threading import Lock, Thread
+from weakref import WeakMethod, ref
+
+# Upper bounds of the histogram buckets, in seconds
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+PER_LINE_BUCKETS = (0.25e-6, 0.5e-6, 1e-6, 2e-6, 4e-6, 8e-6, 16e-6, 32e-6, 64e-6, 128e-6, 256e-6)
+
+PROFILE_INTERVAL_SECONDS = 0.005
+PROFILE_MAX_DEPTH = 64
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Sharded:
+    """
+    Per-thread series of a metric: each recording thread updates its own dict without a
+    lock, and a scrape adds the threads' series up. Once a thread has exited, its series are
+    folded into the retired series, so threads that come and go do not pile up shards.
+    """
+
+    def __init__(self, registry, name, help_text, labels):
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._local = threading.local()
+        self._shards = []  # (weak reference to the recording thread, its series)
+        self._retired = {}
+        self._lock = Lock()
+
+    def _series(self, label_values):
+        shard = getattr(self._local, "series", None)
+        if shard is None:
+            shard = self._local.series = {}
+            with self._lock:
+                self._retire_exited()
+                self._shards.append((ref(threading.current_thread()), shard))
+        series = shard[label_values] = self._new_series()
+        return series
+
+    def _retire_exited(self):
+        # Called with the lock held; an exited thread no longer writes to its series
+        live = []
+        for thread_ref, shard in self._shards:
+            thread = thread_ref()
+            if thread is not None and thread.is_alive():
+                live.append((thread_ref, shard))
+                continue
+            for label_values, series in shard.items():
+                retired = self._retired.get(label_values)
+                self._retired[label_values] = list(series) if retired is None else [a + b for a, b in zip(retired, series)]
+        self._shards = live
+
+    def _totals(self):
+        with self._lock:
+            self._retire_exited()
+            totals = {label_values: list(series) for label_values, series in self._retired.items()}
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            for label_values, series in list(shard.items()):
+                total = totals.get(label_values)
+                totals[label_values] = list(series) if total is None else [a + b for a, b in zip(total, series)]
+        return totals
+
+
+class Counter(_Sharded):
+    """
+    Monotonic counter, optionally split by labels (``inc(1, ("streams",))``).
+    """
+
+    kind = "counter"
+
+    def _new_series(self):
+        return [0]
+
+    def inc(self, amount=1, label_values=()):
+        if not self.registry.enabled:
+            return
+        try:
+            series = self._local.series[label_values]
+        except (AttributeError, KeyError):
+            series = self._series(label_values)
+        series[0] += amount
+
+    def samples(self):
+        return [(self.name, self.labels, label_values, series[0]) for label_values, series in self._totals().items()]
+
+
+class Histogram(_Sharded):
+    """
+    Cumulative histogram with fixed buckets. ``observe`` takes a ``count`` so a batch can
+    record its per-item average once for every item it held.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, registry, name, help_text, buckets=DURATION_BUCKETS, labels=()):
+        super().__init__(registry, name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def _new_series(self):
+        return [0] * (len(self.buckets) + 1) + [0.0]  # Bucket counts, +Inf count, sum
+
+    def observe(self, value, count=1, label_values=()):
+        if not self.registry.enabled:
+            return
+        try:
+            series = self._local.series[label_values]
+        except (AttributeError, KeyError):
+            series = self._series(label_values)
+        series[bisect_left(self.buckets, value)] += count
+        series[-1] += value * count
+
+    def samples(self):
+        samples = []
+        bucket_labels = self.labels + ("le",)
+        for label_values, series in self._totals().items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", bucket_labels, label_values + (_format_value(bound),), cumulative))
+            samples.append((f"{self.name}_sum", self.labels, label_values, series[-1]))
+            samples.append((f"{self.name}_count", self.labels, label_values, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms of the process, rendered in the Prometheus text format.
+
+    Hot paths record once per batch rather than per line, into series owned by the recording
+    thread, so the cost is a few clock reads and list updates per read from the socket. Stats
+    that other objects already keep (buffers, outbound queues, reconnects) are not copied:
+    ``watch`` registers their ``stats`` method and it is read at scrape time. Setting ``enabled`` to False turns recording off.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self._metrics = []
+        self._watched = {}  # Prefix -> {"label", "counters", "sources": {label value: reader}}
+        self._lock = Lock()
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(self, name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, buckets=DURATION_BUCKETS, labels=()):
+        metric = Histogram(self, name, help_text, buckets, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def watch(self, prefix, read, label_value=None, label="channel", counters=()):
+        """
+        Exports the numbers in the dict returned by ``read`` as ``<prefix>_<key>`` gauges (or
+        counters, for keys in ``counters``), labelled with ``label_value`` if given. Bound
+        methods are held weakly, so watching an object does not keep it alive.
+        """
+        reader = WeakMethod(read) if hasattr(read, "__self__") else (lambda: read)
+        with self._lock:
+            group = self._watched.setdefault(prefix, {"label": label, "counters": set(), "sources": {}})
+            group["counters"].update(counters)
+            group["sources"][label_value] = reader
+
+    def _watched_samples(self):
+        families = {}
+        with self._lock:
+            groups = [(prefix, group["label"], group["counters"], list(group["sources"].items()))
+                      for prefix, group in self._watched.items()]
+        for prefix, label, counters, sources in groups:
+            for label_value, reader in sources:
+                read = reader()
+                if read is None:
+                    with self._lock:
+                        self._watched[prefix]["sources"].pop(label_value, None)
+                    continue
+                labels, label_values = ((label,), (label_value,)) if label_value is not None else ((), ())
+                for key, value in read().items():
+                    if isinstance(value, bool) or not isinstance(value, (int, float)):
+                        continue
+                    name = f"{prefix}_{key}"
+                    family = families.setdefault(name, ("counter" if key in counters else "gauge", []))
+                    family[1].append((name, labels, label_values, value))
+        return families
+
+    def render(self):
+        """
+        Returns every metric in the Prometheus text exposition format (version 0.0.4).
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, label_values, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels, label_values)} {_format_value(value)}")
+        for name, (kind, samples) in sorted(self._watched_samples().items()):
+            lines.append(f"# TYPE {name} {kind}")
+            for name, labels, label_values, value in samples:
+                lines.append(f"{name}{_format_labels(labels, label_values)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that can be switched on and off while the bot runs.
+
+    While running, a background thread records the stack of every other thread each
+    ``interval`` seconds; nothing is traced between samples, so the running code is not
+    slowed down beyond the sampling itself. ``collapsed`` returns the samples in the folded
+    stack format read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL_SECONDS, max_depth=PROFILE_MAX_DEPTH):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self._stacks = collections.Counter()
+        self._lock = Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval=None):
+        with self._lock:
+            if self.running:
+                return self
+            if interval:
+                self.interval = interval
+            self._stop_event.clear()
+            self._thread = Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop_event.wait(self.interval):
+            names.update((thread.ident, thread.name) for thread in threading.enumerate())
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                stacks.append(";".join(reversed(stack)))
+            with self._lock:
+                self._stacks.update(stacks)
+                self.samples += 1
+
+    def collapsed(self):
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+
+# Process-wide registry and profiler
+metrics = MetricsRegistry()
+profiler = SamplingProfiler()
+
+# Ingest pipeline
+LINES_RECEIVED = metrics.counter("twitchbot_irc_lines_total", "IRC lines received")
+RECV_WAIT_SECONDS = metrics.histogram("twitchbot_irc_recv_wait_seconds", "Time spent waiting for each socket read")
+PARSE_LINE_SECONDS = metrics.histogram("twitchbot_irc_parse_line_seconds", "IRC tag parsing time per line",
+                                       PER_LINE_BUCKETS)
+RECORD_LINE_SECONDS = metrics.histogram(
+    "twitchbot_ingest_record_line_seconds",
+    "Time per line to filter badges, queue log output and append to the interval buffer", PER_LINE_BUCKETS
+)
+FLUSH_SECONDS = metrics.histogram("twitchbot_interval_flush_seconds", "Time to write one closed interval",
+                                  labels=("format",))
+SINK_WRITE_SECONDS = metrics.histogram("twitchbot_log_sink_write_seconds", "Time to write one batch of log output")
+
+# Twitch API
+API_REQUESTS = metrics.counter("twitchbot_api_requests_total", "Twitch API requests", ("endpoint", "status"))
+API_SECONDS = metrics.histogram("twitchbot_api_request_seconds", "Twitch API request latency", labels=("endpoint",))
+
+
+def observe_ingest(lines, parse_ns, record_ns):
+    """
+    Records one batch of the read path: its line count and per-line parse and record times.
+    """
+    if not lines or not metrics.enabled:
+        return
+    LINES_RECEIVED.inc(lines)
+    PARSE_LINE_SECONDS.observe(parse_ns / lines / 1e9, lines)
+    RECORD_LINE_SECONDS.observe(record_ns / lines / 1e9, lines)
+
+
+def watch_buffer(channel, interval_buffer):
+    """
+    Exports the backpressure stats of a channel's interval buffer.
+    """
+    metrics.watch("twitchbot_buffer", interval_buffer.stats, channel, counters=("total_messages", "total_dropped"))
+
+
+def watch_outbound(connection, outbound):
+    """
+    Exports the stats of a connection's outbound queue.
+    """
+    metrics.watch("twitchbot_outbound", outbound.stats, connection, "connection", counters=("sent", "writes", "dropped"))
+
+
+def timed(histogram, label_values=()):
+    """
+    Context manager observing the seconds its block took.
+    """
+    return _Timer(histogram, label_values)
+
+
+class _Timer:
+    __slots__ = ("histogram", "label_values", "started")
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, label_values=self.label_values)
+        return False
@@ -0,0 +1,226 @@
+import time
+from array import array
+from datetime import datetime, UTC
+from threading import Lock
+
+MAX_INTERVAL_MESSAGES = 500_000  # Messages held per interval before new ones are dropped
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def format_epoch_ms(epoch_ms):
+    """
+    Formats epoch milliseconds the way interval records store timestamps.
+    """
+    return datetime.fromtimestamp(epoch_ms / 1000, UTC).strftime(TIME_FORMAT)
+
+
+class ChatRecords:
+    """
+    Compact chat messages of one interval, stored as parallel arrays.
+
+    Timestamps are epoch milliseconds in an ``array('q')``; usernames and designations are
+    codes into symbol tables local to the interval, so each distinct string is held once, and
+    badge codes (see ``helper_functions.badges``) are an ``array('i')``. Iterating yields the
+    usual ``{timestamp, username, designations, badge_code, message}`` dicts, with ISO
+    timestamps formatted only then.
+    """
+
+    __slots__ = ("timestamps", "username_codes", "designation_codes", "badge_codes", "messages",
+                 "usernames", "designations", "_username_table", "_designation_table")
+
+    def __init__(self):
+        self.timestamps = array('q')
+        self.username_codes = array('i')
+        self.designation_codes = array('i')
+        self.badge_codes = array('i')
+        self.messages = []
+        self.usernames = []
+        self.designations = []
+        self._username_table = {}
+        self._designation_table = {}
+
+    def __len__(self):
+        return len(self.messages)
+
+    def extend(self, timestamp_ms, rows):
+        """
+        Appends (username, designations, badge_code, message) rows that share one timestamp.
+        """
+        usernames, username_table = self.usernames, self._username_table
+        designations, designation_table = self.designations, self._designation_table
+        username_codes, designation_codes = self.username_codes, self.designation_codes
+        for username, designation, badge_code, message in rows:
+            code = username_table.get(username)
+            if code is None:
+                code = username_table[username] = len(usernames)
+                usernames.append(username)
+            username_codes.append(code)
+            code = designation_table.get(designation)
+            if code is None:
+                code = designation_table[designation] = len(designations)
+                designations.append(designation)
+            designation_codes.append(code)
+            self.badge_codes.append(badge_code)
+            self.messages.append(message)
+        self.timestamps.extend([timestamp_ms] * len(rows))
+
+    def __iter__(self):
+        formatted = {}
+        usernames, designations = self.usernames, self.designations
+        for timestamp_ms, username_code, designation_code, badge_code, message in zip(
+                self.timestamps, self.username_codes, self.designation_codes, self.badge_codes, self.messages):
+            timestamp = formatted.get(timestamp_ms)
+            if timestamp is None:
+                timestamp = formatted[timestamp_ms] = format_epoch_ms(timestamp_ms)
+            yield {
+                "timestamp": timestamp,
+                "username": usernames[username_code],
+                "designations": designations[designation_code],
+                "badge_code": badge_code,
+                "message": message
+            }
+
+    def to_dicts(self):
+        return list(self)
+
+
+class IntervalBuffer:
+    """
+    Bounded buffer for the chat messages and special events of the current interval.
+
+    The ingest thread appends whole batches; at rollover the interval manager swaps in empty
+    records under the lock instead of clearing lists the reader may still be appending to.
+    Messages beyond ``max_messages`` are dropped and counted, with a warning at the first drop
+    of an interval, so a stalled consumer shows up in the log and the interval record rather
+    than as unbounded memory growth. Time the channel was not
+    connected is kept as gaps, so a quiet interval can be told apart from missing data.
+    ``live``, if given, is the channel's ChannelMetrics and also counts every message and
+    event, including dropped ones, as it arrives.
+    """
+
+    def __init__(self, max_messages=MAX_INTERVAL_MESSAGES, live=None):
+        self.max_messages = max_messages
+        self.live = live
+        self._lock = Lock()
+        self._chat_logs = ChatRecords()
+        self._special_events = []
+        self._dropped = 0
+        self._gaps = []  # Closed gaps as (start, end, reason)
+        self._open_gap = None  # (start, reason) while disconnected
+
+        # Backpressure metrics, cumulative over the life of the buffer
+        self.total_messages = 0
+        self.total_dropped = 0
+        self.high_water = 0
+
+    def extend_chat_logs(self, timestamp_ms, rows):
+        """
+        Adds a batch of (username, designations, badge_code, message) rows received at ``timestamp_ms``,
+        dropping what does not fit in the current interval.
+        """
+        if self.live is not None:
+            self.live.add_messages(timestamp_ms, rows)
+        first_drop = False
+        with self._lock:
+            room = self.max_messages - len(self._chat_logs)
+            if len(rows) > room:
+                dropped = len(rows) - max(room, 0)
+                first_drop = self._dropped == 0
+                self._dropped += dropped
+                self.total_dropped += dropped
+                rows = rows[:max(room, 0)]
+            self._chat_logs.extend(timestamp_ms, rows)
+            self.total_messages += len(rows)
+            if len(self._chat_logs) > self.high_water:
+                self.high_water = len(self._chat_logs)
+        if first_drop:
+            # Once per interval; the total dropped is reported when the interval is written
+            print(f"Warning: interval buffer full at {self.max_messages} messages, "
+                  f"dropping new messages until the next rollover.")
+
+    def add_special_event(self, event_data):
+        """
+        Adds one special event (sub, gift, raid, ...) to the current interval.
+        """
+        with self._lock:
+            self._special_events.append(event_data)
+        if self.live is not None:
+            self.live.add_event(time.time(), event_data.get("event_type", ""))
+
+    def open_gap(self, started_at, reason):
+        """
+        Marks the channel disconnected since ``started_at`` (a UTC datetime).
+        """
+        with self._lock:
+            if self._open_gap is None:
+                self._open_gap = (started_at, reason)
+
+    def close_gap(self, ended_at):
+        """
+        Marks the channel connected again at ``ended_at``.
+        """
+        with self._lock:
+            if self._open_gap is not None:
+                started_at, reason = self._open_gap
+                self._gaps.append((started_at, max(started_at, ended_at), reason))
+                self._open_gap = None
+
+    def take_gaps(self, interval_start, interval_end):
+        """
+        Returns the gaps of an interval, clipped to it, and keeps whatever extends past
+        ``interval_end`` for the next one. A gap still open is reported with "ongoing" set.
+        """
+        with self._lock:
+            gaps, carried = [], []
+            for started_at, ended_at, reason in self._gaps:
+                if ended_at > interval_end:
+                    carried.append((max(started_at, interval_end), ended_at, reason))
+                if started_at < interval_end:
+                    gaps.append((max(started_at, interval_start), min(ended_at, interval_end), reason, False))
+            self._gaps = carried
+            if self._open_gap is not None:
+                started_at, reason = self._open_gap
+                if started_at < interval_end:
+                    gaps.append((max(started_at, interval_start), interval_end, reason, True))
+                    self._open_gap = (interval_end, reason)
+        return [
+            {
+                "start": started_at.strftime(TIME_FORMAT),
+                "end": ended_at.strftime(TIME_FORMAT),
+                "seconds": round((ended_at - started_at).total_seconds(), 3),
+                "reason": reason,
+                "ongoing": ongoing
+            }
+            for started_at, ended_at, reason, ongoing in gaps
+        ]
+
+    def pending(self):
+        """
+        Number of chat messages waiting for the next rollover.
+        """
+        with self._lock:
+            return len(self._chat_logs)
+
+    def swap(self):
+        """
+        Atomically takes the contents of the current interval and starts an empty one.
+
+        Returns the chat logs (ChatRecords), the special events and the number of messages
+        dropped during the interval.
+        """
+        with self._lock:
+            chat_logs, special_events, dropped = self._chat_logs, self._special_events, self._dropped
+            self._chat_logs, self._special_events, self._dropped = ChatRecords(), [], 0
+        return chat_logs, special_events, dropped
+
+    def stats(self):
+        """
+        Returns the backpressure metrics of the buffer.
+        """
+        with self._lock:
+            return {
+                "pending": len(self._chat_logs),
+                "high_water": self.high_water,
+                "total_messages": self.total_messages,
+                "total_dropped": self.total_dropped
+            }
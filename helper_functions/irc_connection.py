@@ -0,0 +1,181 @@
+import os
+import socket
+import ssl
+from threading import Lock
+
+IRC_SERVER = 'irc.chat.twitch.tv'
+IRC_TLS_PORT = 6697
+IRC_PLAIN_PORT = 6667
+
+RCVBUF_BYTES = 1024 * 1024  # Kernel receive buffer; busy channels burst well past the default
+SNDBUF_BYTES = None  # Outbound traffic is small, so the kernel default is kept unless set
+CONNECT_TIMEOUT_SECONDS = 10
+KEEPALIVE_IDLE_SECONDS = 60
+KEEPALIVE_INTERVAL_SECONDS = 15
+KEEPALIVE_PROBES = 4
+
+
+def tune_socket(sock, rcvbuf=RCVBUF_BYTES, sndbuf=SNDBUF_BYTES, keepalive=True):
+    """
+    Sets the low-latency options of a chat socket: TCP_NODELAY so PONGs and JOINs are not held
+    back by Nagle's algorithm, TCP keepalive so a dead peer is noticed without traffic, and the
+    buffer sizes given (None keeps the kernel default).
+    """
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    if keepalive:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        # The keepalive timings are only tunable on some platforms
+        for option, value in (("TCP_KEEPIDLE", KEEPALIVE_IDLE_SECONDS),
+                              ("TCP_KEEPINTVL", KEEPALIVE_INTERVAL_SECONDS),
+                              ("TCP_KEEPCNT", KEEPALIVE_PROBES)):
+            if hasattr(socket, option):
+                sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+    if rcvbuf:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    if sndbuf:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, sndbuf)
+
+
+def open_tuned_socket(host, port, timeout, rcvbuf=RCVBUF_BYTES, sndbuf=SNDBUF_BYTES, keepalive=True):
+    """
+    Connects a TCP socket tuned with ``tune_socket``, trying each address of ``host`` in turn.
+
+    The options are set before ``connect``: the receive buffer size decides the window scale
+    advertised in the SYN, so a larger SO_RCVBUF set after connecting cannot be used in full.
+    """
+    error = None
+    for family, sock_type, proto, _, address in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM):
+        sock = socket.socket(family, sock_type, proto)
+        try:
+            tune_socket(sock, rcvbuf, sndbuf, keepalive)
+            sock.settimeout(timeout)
+            sock.connect(address)
+            return sock
+        except OSError as e:
+            sock.close()
+            error = e
+    raise error or OSError(f"No address found for {host}:{port}")
+
+
+def handshake_bytes(oauth_token, bot_username, channels=()):
+    """
+    Builds the PASS, NICK, CAP REQ and JOIN commands as one ``\\r\\n``-terminated payload, so
+    the whole handshake goes out in a single write.
+    """
+    lines = [
+        f"PASS oauth:{oauth_token}",
+        f"NICK {bot_username}",
+        "CAP REQ :twitch.tv/tags twitch.tv/commands twitch.tv/membership",
+    ]
+    lines.extend(f"JOIN #{channel}" for channel in channels)
+    return ("\r\n".join(lines) + "\r\n").encode('utf-8')
+
+
+class ResumableSSLSocket(ssl.SSLSocket):
+    """
+    SSL socket that hands its TLS session to a store before it closes.
+
+    With TLS 1.3 the session ticket only arrives after the handshake, so the session worth
+    keeping is the one the socket holds at the end of the connection.
+    """
+
+    def close(self):
+        store = getattr(self, "session_store", None)
+        if store is not None and self._sslobj is not None:
+            try:
+                store(self.session)
+            except (ValueError, OSError):
+                pass
+        super().close()
+
+
+class IrcConnector:
+    """
+    Opens tuned chat connections, over TLS by default.
+
+    The TLS session of the last connection is kept and offered on the next one, so a reconnect
+    resumes the session instead of paying for a full handshake. ``stats`` counts connections
+    and resumed sessions.
+    """
+
+    def __init__(self, host=IRC_SERVER, port=None, tls=True, rcvbuf=RCVBUF_BYTES, sndbuf=SNDBUF_BYTES,
+                 keepalive=True, connect_timeout=CONNECT_TIMEOUT_SECONDS, ssl_context=None):
+        self.host = host
+        self.port = port or (IRC_TLS_PORT if tls else IRC_PLAIN_PORT)
+        self.tls = tls
+        self.rcvbuf = rcvbuf
+        self.sndbuf = sndbuf
+        self.keepalive = keepalive
+        self.connect_timeout = connect_timeout
+
+        self.ssl_context = None
+        if tls:
+            self.ssl_context = ssl_context or ssl.create_default_context()
+
+        self._lock = Lock()
+        self._session = None
+        self.connects = 0
+        self.resumed = 0
+
+    def _remember_session(self, session):
+        if session is not None:
+            with self._lock:
+                self._session = session
+
+    def open(self):
+        """
+        Opens a tuned, connected socket (wrapped in TLS unless disabled).
+        """
+        sock = open_tuned_socket(self.host, self.port, self.connect_timeout, self.rcvbuf, self.sndbuf, self.keepalive)
+        try:
+            if self.tls:
+                with self._lock:
+                    session = self._session
+                # What SSLContext.wrap_socket does, with the resumable socket class, so a context
+                # passed in by the caller is used as is rather than changed for every user of it
+                sock = ResumableSSLSocket._create(sock=sock, server_hostname=self.host, context=self.ssl_context,
+                                                  session=session)
+                sock.session_store = self._remember_session
+                with self._lock:
+                    self.resumed += sock.session_reused
+            sock.settimeout(None)
+        except Exception:
+            sock.close()
+            raise
+        with self._lock:
+            self.connects += 1
+        return sock
+
+    def connect(self, oauth_token, bot_username, channels=()):
+        """
+        Opens a connection and sends the authentication and JOIN commands in one write.
+        """
+        sock = self.open()
+        try:
+            sock.sendall(handshake_bytes(oauth_token, bot_username, channels))
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def stats(self):
+        with self._lock:
+            return {"connects": self.connects, "resumed": self.resumed, "tls": self.tls, "port": self.port}
+
+
+# Process-wide connector, so reconnects can resume the previous TLS session
+_connector = None
+
+
+def get_irc_connector():
+    """
+    Returns the shared connector. IRC_TLS=0 falls back to plaintext on 6667 and IRC_RCVBUF_BYTES
+    overrides the receive buffer size.
+    """
+    global _connector
+    if _connector is None:
+        _connector = IrcConnector(
+            tls=os.getenv("IRC_TLS", "1") != "0",
+            rcvbuf=int(os.getenv("IRC_RCVBUF_BYTES", RCVBUF_BYTES))
+        )
+    return _connector
@@ -0,0 +1,149 @@
+import sys
+from functools import lru_cache
+
+# IRCv3 tag value escapes: https://ircv3.net/specs/extensions/message-tags#escaping-values
+TAG_ESCAPES = {":": ";", "s": " ", "\\": "\\", "r": "\r", "n": "\n"}
+
+# Badge families kept in the designations of a chat message. "founder" was added with badge
+# rules 2 (see helper_functions.badges): founders count as subscribers, and records without a
+# stored badge code are re-derived from their designations, so the badge has to be kept there.
+RELEVANT_BADGES = ("subscriber", "founder", "sub-gifter", "bits", "premium")
+
+
+def unescape_tag_value(value):
+    """
+    Decodes an IRCv3 tag value. Unknown escapes drop the backslash and a trailing lone
+    backslash is removed, as the spec requires.
+    """
+    if "\\" not in value:
+        return value
+
+    decoded = []
+    i = 0
+    length = len(value)
+    while i < length:
+        char = value[i]
+        if char == "\\":
+            i += 1
+            if i < length:
+                decoded.append(TAG_ESCAPES.get(value[i], value[i]))
+        else:
+            decoded.append(char)
+        i += 1
+    return "".join(decoded)
+
+
+@lru_cache(maxsize=4096)
+def filter_badges(badges):
+    """
+    Reduces a raw ``badges`` tag to the relevant badges, joined for display.
+
+    Chatters repeat the same handful of badge strings, so the result is memoized per
+    unique badge string.
+    """
+    filtered_badges = [badge for badge in badges.split(',') if badge.startswith(RELEVANT_BADGES)]
+    return ", ".join(filtered_badges) if filtered_badges else "none"
+
+
+class IrcMessage:
+    """
+    One parsed IRC line. Tags are kept as the raw tag string and only decoded on access.
+    """
+
+    __slots__ = ("_raw_tags", "_tags", "prefix", "command", "params", "trailing")
+
+    def __init__(self, raw_tags, prefix, command, params, trailing):
+        self._raw_tags = raw_tags  # Raw tag string with a leading ';' so every key follows one
+        self._tags = None
+        self.prefix = prefix
+        self.command = command
+        self.params = params
+        self.trailing = trailing
+
+    def tag(self, key, default=None):
+        """
+        Returns the unescaped value of one tag without decoding the others.
+        """
+        raw_tags = self._raw_tags
+        start = raw_tags.find(f";{key}=")
+        if start < 0:
+            return default
+        start += len(key) + 2
+        end = raw_tags.find(";", start)
+        return unescape_tag_value(raw_tags[start:end] if end >= 0 else raw_tags[start:])
+
+    @property
+    def tags(self):
+        """
+        All tags as a dict with interned keys, decoded on first access.
+        """
+        if self._tags is None:
+            tags = {}
+            for tag in self._raw_tags[1:].split(';'):
+                key, _, value = tag.partition('=')
+                if key:
+                    tags[sys.intern(key)] = unescape_tag_value(value)
+            self._tags = tags
+        return self._tags
+
+    @property
+    def nick(self):
+        """
+        The nickname from the prefix, e.g. ``viewer`` for ``viewer!viewer@viewer.tmi.twitch.tv``.
+        """
+        return self.prefix.split('!', 1)[0] if self.prefix else None
+
+    @property
+    def channel(self):
+        """
+        The channel the message was sent to, without the leading '#'.
+        """
+        if self.params and self.params[0].startswith('#'):
+            return self.params[0][1:]
+        return None
+
+
+def parse_line(line):
+    """
+    Parses one IRC line (without its ``\\r\\n``) in a single pass. Returns None for empty lines.
+    """
+    pos = 0
+    raw_tags = ";"
+    if line.startswith('@'):
+        pos = line.find(' ')
+        if pos < 0:
+            return None
+        raw_tags = ";" + line[1:pos]
+        pos += 1
+
+    prefix = None
+    if line.startswith(':', pos):
+        end = line.find(' ', pos)
+        if end < 0:
+            return None
+        prefix = line[pos + 1:end]
+        pos = end + 1
+
+    trailing_at = line.find(' :', pos)
+    if trailing_at >= 0:
+        params = line[pos:trailing_at].split()
+        trailing = line[trailing_at + 2:]
+    else:
+        params = line[pos:].split()
+        trailing = None
+
+    if not params:
+        return None
+    return IrcMessage(raw_tags, prefix, sys.intern(params[0]), params[1:], trailing)
+
+
+def parse_lines(lines):
+    """
+    Parses a batch of lines, skipping any that are empty or malformed.
+    """
+    messages = []
+    for line in lines:
+        message = parse_line(line)
+        if message is not None:
+            messages.append(message)
+    return messages
@@ -0,0 +1,73 @@
+RECV_WINDOW = 64 * 1024  # Bytes requested from the socket per read
+MAX_LINE_BYTES = 8191  # Longest partial line carried over between reads; Twitch lines stay well below
+
+
+class LineReader:
+    """
+    Frames the byte stream of an IRC socket into complete ``\\r\\n``-terminated lines.
+
+    Reads land in one reusable buffer through ``recv_into``; only the complete lines of a read
+    are decoded, in a single pass, and a partial trailing line is carried over to the next read.
+    A partial line growing past ``max_line_bytes`` is dropped up to its ``\\r\\n``, so a peer that
+    never ends its line cannot grow the buffer without bound; ``dropped_lines`` counts them.
+    ``sock`` may be None when received bytes are passed to ``feed`` directly, e.g. from asyncio.
+    """
+
+    def __init__(self, sock, recv_window=RECV_WINDOW, max_line_bytes=MAX_LINE_BYTES):
+        self.sock = sock
+        self.max_line_bytes = max_line_bytes
+        self._buffer = bytearray(recv_window)
+        self._view = memoryview(self._buffer)
+        self._pending = bytearray()
+        self._discarding = False  # Skipping the rest of an over-long line
+        self.dropped_lines = 0
+
+    def receive(self):
+        """
+        Blocks for the next read and returns the bytes received, a view of the reusable buffer
+        valid until the next read. Returns None once the server closes the connection.
+        """
+        received = self.sock.recv_into(self._view)
+        return self._view[:received] if received else None
+
+    def read_batch(self):
+        """
+        Blocks for the next read and returns the complete lines it finished.
+
+        Returns None once the server closes the connection. A read that does not complete a
+        line returns an empty list.
+        """
+        data = self.receive()
+        return None if data is None else self.feed(data)
+
+    def feed(self, data):
+        """
+        Adds received bytes to the framer and returns the decoded lines they complete.
+        """
+        pending = self._pending
+        pending += data
+        if self._discarding:
+            start = pending.find(b"\r\n")
+            if start < 0:
+                del pending[:-1]  # Keeps a '\r' whose '\n' comes with the next read
+                return []
+            del pending[:start + 2]
+            self._discarding = False
+
+        end = pending.rfind(b"\r\n")
+        if end < 0:
+            if len(pending) > self.max_line_bytes:
+                self._drop_line()
+            return []
+
+        frame = pending[:end].decode('utf-8', 'replace')
+        del pending[:end + 2]
+        if len(pending) > self.max_line_bytes:
+            self._drop_line()
+        return [line for line in frame.split("\r\n") if line]
+
+    def _drop_line(self):
+        self.dropped_lines += 1
+        print(f"Warning: dropping an IRC line longer than {self.max_line_bytes} bytes.")
+        del self._pending[:-1]
+        self._discarding = True
@@ -0,0 +1,88 @@
+import os
+import random
+from threading import Lock
+
+from auth.irc_auth import get_token_manager
+from helper_functions.instrumentation import metrics
+
+BACKOFF_BASE_SECONDS = 1
+BACKOFF_CAP_SECONDS = 60
+STABLE_SECONDS = 60  # A connection that lived this long resets the backoff
+READ_TIMEOUT_SECONDS = 360  # Twitch PINGs about every 5 minutes, so silence past this means a dead link
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE_SECONDS, cap=BACKOFF_CAP_SECONDS, rng=random):
+    """
+    Full-jitter exponential backoff: a random delay of up to ``base * 2**attempt`` seconds,
+    capped, so connections dropped together do not reconnect in lockstep.
+    """
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def disconnect_reason(irc_message):
+    """
+    Returns why the server wants the connection dropped, or None. RECONNECT announces a
+    server restart; a failed login means the token must be refreshed before trying again.
+    """
+    if irc_message.command == "RECONNECT":
+        return "reconnect"
+    if irc_message.command == "NOTICE" and "authentication failed" in (irc_message.trailing or "").lower():
+        return "auth_failed"
+    return None
+
+
+def refresh_irc_token():
+    """
+    Forces a refresh of the cached IRC token after the server rejected it and returns the new token.
+    """
+    token_manager = get_token_manager(os.getenv("TWITCH_CLIENT_ID"), os.getenv("TWITCH_CLIENT_SECRET"))
+    token_manager.refresh()
+    return token_manager.get_access_token()
+
+
+class ReconnectStats:
+    """
+    Reconnect metrics shared by every chat connection of the process: how often connections
+    dropped and how long it took to get back (disconnect detected to channels re-JOINed).
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.disconnects = 0
+        self.reconnects = 0
+        self.failed_attempts = 0
+        self.last_seconds = None
+        self.max_seconds = 0.0
+        self.total_seconds = 0.0
+
+    def record_disconnect(self):
+        with self._lock:
+            self.disconnects += 1
+
+    def record_failure(self):
+        with self._lock:
+            self.failed_attempts += 1
+
+    def record_reconnect(self, seconds):
+        with self._lock:
+            self.reconnects += 1
+            self.last_seconds = seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self.total_seconds += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "disconnects": self.disconnects,
+                "reconnects": self.reconnects,
+                "failed_attempts": self.failed_attempts,
+                "last_reconnect_seconds": self.last_seconds,
+                "max_reconnect_seconds": round(self.max_seconds, 3),
+                "total_reconnect_seconds": round(self.total_seconds, 3)
+            }
+
+
+# Process-wide reconnect metrics
+reconnect_stats = ReconnectStats()
+metrics.watch("twitchbot_reconnect", reconnect_stats.snapshot,
+              counters=("disconnects", "reconnects", "failed_attempts", "total_reconnect_seconds"))
@@ -0,0 +1,89 @@
+import os
+import struct
+import time
+from datetime import datetime, UTC
+
+RECORDING_MAGIC = b"TWIRC-REC 1\n"
+RECORDING_SUFFIX = ".ircrec"
+_START = struct.Struct("<q")  # Wall-clock start of the connection, epoch nanoseconds
+_CHUNK = struct.Struct("<qI")  # Arrival in nanoseconds since the start, byte count
+
+
+def recording_path(streamer_username, directory):
+    """
+    Returns a new recording file path for a connection to a streamer's chat, named by the
+    UTC time it was opened.
+    """
+    os.makedirs(directory, exist_ok=True)
+    opened = datetime.now(UTC).strftime('%Y%m%dT%H%M%S%fZ')
+    return os.path.join(directory, f"{streamer_username}_{opened}{RECORDING_SUFFIX}")
+
+
+class RecordingSocket:
+    """
+    Chat socket that copies every read to a recording file, with its arrival time.
+
+    The file holds the bytes exactly as ``recv`` returned them, so a replay reproduces the
+    framing (lines split across reads, bursts) as well as the timing of the connection.
+    Everything but reading and closing is passed through to the wrapped socket.
+    """
+
+    def __init__(self, sock, path):
+        self._sock = sock
+        self.path = path
+        self._file = open(path, "wb")
+        self._file.write(RECORDING_MAGIC + _START.pack(time.time_ns()))
+        self._started = time.monotonic_ns()
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+    def _record(self, data):
+        try:
+            self._file.write(_CHUNK.pack(time.monotonic_ns() - self._started, len(data)))
+            self._file.write(data)
+        except ValueError:
+            pass  # Closed from another thread while the read was returning
+
+    def recv_into(self, buffer, nbytes=0, flags=0):
+        received = self._sock.recv_into(buffer, nbytes, flags)
+        if received:
+            self._record(memoryview(buffer)[:received])
+        return received
+
+    def recv(self, bufsize, flags=0):
+        data = self._sock.recv(bufsize, flags)
+        if data:
+            self._record(data)
+        return data
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        self._sock.close()
+
+
+def read_recording(path):
+    """
+    Reads a recording made by RecordingSocket. Returns the wall-clock start of the connection
+    (epoch nanoseconds) and its reads as (nanoseconds since the start, bytes), in order.
+
+    A read cut short by a crash is left out.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if not data.startswith(RECORDING_MAGIC):
+        raise Exception(f"{path} is not an IRC recording")
+    position = len(RECORDING_MAGIC)
+    started_ns, = _START.unpack_from(data, position)
+    position += _START.size
+
+    chunks = []
+    while position + _CHUNK.size <= len(data):
+        offset_ns, length = _CHUNK.unpack_from(data, position)
+        position += _CHUNK.size
+        if position + length > len(data):
+            break
+        chunks.append((offset_ns, data[position:position + length]))
+        position += length
+    return started_ns, chunks
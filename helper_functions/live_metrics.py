@@ -0,0 +1,257 @@
+import time
+from collections import deque
+from threading import Lock
+
+from analysis.sketches import HyperLogLog
+from helper_functions.interval_buffer import format_epoch_ms
+
+# Bucket levels, finest first: (name, bucket seconds, closed buckets kept). Each level's
+# bucket width is a multiple of the one below, so closed buckets roll up exactly.
+RESOLUTIONS = (("1s", 1, 60), ("1m", 60, 60), ("10m", 600, 144))
+LIVE_HLL_PRECISION = 10  # 1 KiB per minute bucket, ~3% standard error
+HASH_MASK = (1 << 64) - 1
+
+
+class Bucket:
+    """
+    Totals of one time bucket. One-second buckets hold the exact set of chatters; coarser
+    buckets fold those sets into a HyperLogLog, so their size does not grow with the chat.
+    """
+
+    __slots__ = ("start", "messages", "events", "viewers", "chatters", "_closed_dict")
+
+    def __init__(self, start, chatters):
+        self.start = start
+        self.messages = 0
+        self.events = {}
+        self.viewers = None
+        self.chatters = chatters
+        self._closed_dict = None
+
+    def add(self, other):
+        """
+        Folds a finer bucket into this one.
+        """
+        self.messages += other.messages
+        for event_type, count in other.events.items():
+            self.events[event_type] = self.events.get(event_type, 0) + count
+        if other.viewers is not None:
+            self.viewers = other.viewers
+        if isinstance(other.chatters, set):
+            add_hash = self.chatters.add_hash
+            for username in other.chatters:
+                # The process-local str hash is cached on the string, unlike a stable hash64
+                add_hash(hash(username) & HASH_MASK)
+        else:
+            self.chatters.merge(other.chatters)
+
+    def copy(self):
+        if isinstance(self.chatters, set):
+            chatters = set(self.chatters)
+        else:
+            chatters = HyperLogLog(self.chatters.precision, bytearray(self.chatters.registers))
+        bucket = Bucket(self.start, chatters)
+        bucket.messages, bucket.events, bucket.viewers = self.messages, dict(self.events), self.viewers
+        return bucket
+
+    def unique_chatters(self):
+        return len(self.chatters) if isinstance(self.chatters, set) else self.chatters.count()
+
+    def to_dict(self, seconds, now=None):
+        """
+        JSON-ready totals. ``now`` is given for the open bucket, whose rate is over the seconds
+        elapsed so far. A closed bucket no longer changes, so its dict is built once and reused.
+        """
+        if self._closed_dict is not None:
+            return self._closed_dict
+        rate_seconds = seconds if now is None else min(max(now - self.start, 1), seconds)
+        result = {
+            "start": format_epoch_ms(self.start * 1000),
+            "seconds": seconds,
+            "messages": self.messages,
+            "messages_per_second": round(self.messages / rate_seconds, 3),
+            "unique_chatters": self.unique_chatters(),
+            "events": dict(self.events),
+            "viewers": self.viewers,
+            "open": now is not None
+        }
+        if now is None:
+            self._closed_dict = result
+        return result
+
+
+class Level:
+    __slots__ = ("name", "seconds", "closed", "open")
+
+    def __init__(self, name, seconds, kept):
+        self.name = name
+        self.seconds = seconds
+        self.closed = deque(maxlen=kept)
+        self.open = None
+
+
+class ChannelMetrics:
+    """
+    Rolling chat metrics of one channel in hierarchical time buckets (1s, 1m and 10m).
+
+    A message only touches the open one-second bucket: a counter and a set add. When a second
+    ends, its bucket is folded into the open minute bucket, and a minute into the open
+    ten-minute bucket, so roll-ups cost a constant amount per closed bucket rather than per
+    message. Each level keeps a ring of its latest closed buckets for queries.
+    """
+
+    def __init__(self, resolutions=RESOLUTIONS, precision=LIVE_HLL_PRECISION):
+        self.precision = precision
+        self.levels = [Level(name, seconds, kept) for name, seconds, kept in resolutions]
+        self._lock = Lock()
+
+    def _close(self, index):
+        level = self.levels[index]
+        bucket = level.open
+        if bucket is None:
+            return
+        level.open = None
+        level.closed.append(bucket)
+        if index + 1 < len(self.levels):
+            parent = self.levels[index + 1]
+            start = bucket.start - bucket.start % parent.seconds
+            if parent.open is not None and parent.open.start != start:
+                self._close(index + 1)
+            if parent.open is None:
+                parent.open = Bucket(start, HyperLogLog(self.precision))
+            parent.open.add(bucket)
+
+    def _advance(self, now):
+        """
+        Closes the buckets that ended before ``now``.
+        """
+        for index, level in enumerate(self.levels):
+            if level.open is not None and level.open.start + level.seconds <= now:
+                self._close(index)
+
+    def _second(self, now):
+        """
+        Returns the one-second bucket for ``now``. Late data goes into the open bucket, or into
+        the next second if its own second was already closed.
+        """
+        second = int(now)
+        fine = self.levels[0]
+        bucket = fine.open
+        if bucket is None or second > bucket.start:
+            self._advance(second)
+            if fine.closed and second <= fine.closed[-1].start:
+                second = fine.closed[-1].start + 1
+            bucket = fine.open = Bucket(second, set())
+        return bucket
+
+    def add_messages(self, timestamp_ms, rows):
+        """
+        Counts a batch of chat rows (username first) received at ``timestamp_ms``.
+        """
+        with self._lock:
+            bucket = self._second(timestamp_ms / 1000)
+            bucket.messages += len(rows)
+            chatters = bucket.chatters
+            for row in rows:
+                chatters.add(row[0])
+
+    def add_event(self, now, event_type):
+        with self._lock:
+            events = self._second(now).events
+            events[event_type] = events.get(event_type, 0) + 1
+
+    def record_viewers(self, now, viewers):
+        with self._lock:
+            self._second(now).viewers = viewers
+
+    def _open_views(self, count):
+        """
+        Copies of the open buckets of the first ``count`` levels, each with the open buckets
+        below it folded in (None where a level has nothing open).
+        """
+        views, below = [], None
+        for level in self.levels[:count]:
+            current = level.open.copy() if level.open is not None else None
+            if below is not None:
+                start = below.start - below.start % level.seconds
+                if current is None:
+                    current = Bucket(start, HyperLogLog(self.precision))
+                if current.start == start:
+                    current.add(below)
+            views.append(current)
+            below = current
+        return views
+
+    def _level(self, resolution):
+        for index, level in enumerate(self.levels):
+            if level.name == resolution:
+                return index, level
+        raise Exception(f"Unknown resolution {resolution}, expected one of {[level.name for level in self.levels]}")
+
+    def buckets(self, resolution="1s", limit=None, now=None):
+        """
+        Returns the latest closed buckets of a resolution, oldest first, followed by the open
+        one as of ``now`` (default: the current time).
+        """
+        index, level = self._level(resolution)
+        now = time.time() if now is None else now
+        with self._lock:
+            self._advance(now)
+            closed = list(level.closed)
+            if limit is not None:
+                closed = closed[max(len(closed) - limit, 0):]
+            current = self._open_views(index + 1)[-1]
+        # Closed buckets no longer change, so they are serialized outside the lock
+        buckets = [bucket.to_dict(level.seconds) for bucket in closed]
+        if current is not None:
+            buckets.append(current.to_dict(level.seconds, now))
+        return buckets
+
+    def summary(self, now=None):
+        """
+        Latest closed bucket and open bucket of every resolution.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._advance(now)
+            views = [(level, level.closed[-1] if level.closed else None, current)
+                     for level, current in zip(self.levels, self._open_views(len(self.levels)))]
+        return {
+            level.name: {
+                "last": last.to_dict(level.seconds) if last else None,
+                "current": current.to_dict(level.seconds, now) if current else None
+            }
+            for level, last, current in views
+        }
+
+
+class LiveMetrics:
+    """
+    ChannelMetrics of every channel in the process, created on first use.
+    """
+
+    def __init__(self, resolutions=RESOLUTIONS):
+        self.resolutions = resolutions
+        self._lock = Lock()
+        self._channels = {}
+
+    def channel(self, name):
+        name = name.lower().lstrip('#')
+        metrics = self._channels.get(name)
+        if metrics is None:
+            with self._lock:
+                metrics = self._channels.setdefault(name, ChannelMetrics(self.resolutions))
+        return metrics
+
+    def get(self, name):
+        return self._channels.get(name.lower().lstrip('#'))
+
+    def channels(self):
+        # channel() may add a channel from a reader thread meanwhile
+        with self._lock:
+            names = list(self._channels)
+        return sorted(names)
+
+
+# Live metrics shared by every chat connection of the process
+live_metrics = LiveMetrics()
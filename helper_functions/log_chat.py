@@ -1,228 +1,484 @@
 import socket
-import json
 import os
+import time
 from datetime import datetime, timedelta, UTC
 from threading import Event, Thread
 from dotenv import load_dotenv
 
 from auth.irc_auth import get_valid_access_token
-from eventsub.eventsub_webhook import get_and_reset_counters
-from helper_functions.view_count import check_viewership
+from helper_functions.badges import badge_code
+from helper_functions.chat_store import ChatLogStore, migrate_json_log, store_path
+from helper_functions.chat_outbound import OutboundQueue
+from helper_functions.instrumentation import (
+    FLUSH_SECONDS, RECV_WAIT_SECONDS, observe_ingest, timed, watch_buffer, watch_outbound
+)
+from helper_functions.interval_buffer import IntervalBuffer, format_epoch_ms
+from helper_functions.irc_connection import get_irc_connector
+from helper_functions.irc_parser import filter_badges, parse_lines
+from helper_functions.irc_reader import LineReader
+from helper_functions.irc_recorder import RecordingSocket, recording_path
+from helper_functions.irc_reconnect import (
+    READ_TIMEOUT_SECONDS, STABLE_SECONDS, backoff_delay, disconnect_reason, reconnect_stats, refresh_irc_token
+)
+from helper_functions.live_metrics import live_metrics
+from helper_functions.log_sink import get_log_sink
+from eventsub.eventsub_asgi import take_interval_counts
+from helper_functions.viewer_sampler import ViewerSampler
 
 # Load environment variables from .env file
 load_dotenv()
 
+IDLE_POLL_SECONDS = 1  # Longest the reader blocks before checking for queued outbound messages
 
-def connect_to_chat(bot_username, streamer_username):
+
+def connect_to_chat(bot_username, streamer_username, connector=None):
     """
     Connects to Twitch IRC chat using the provided credentials.
+
+    The connection goes through ``connector`` (the shared IrcConnector by default): TLS on 6697
+    with the previous session resumed, and the whole handshake sent in one write. With
+    IRC_RECORD_DIR set, the bytes received are also recorded there, one file per connection,
+    for replay by the benchmarks.
     """
     client_id = os.getenv("TWITCH_CLIENT_ID")
     client_secret = os.getenv("TWITCH_CLIENT_SECRET")
     oauth_token = get_valid_access_token(client_id, client_secret)
 
-    server = 'irc.chat.twitch.tv'
-    port = 6667  # Non-SSL port
-
-    # Connect to the Twitch IRC server
-    sock = socket.socket()
-    sock.connect((server, port))
-
-    # Authenticate and join the chat
-    sock.send(f"PASS oauth:{oauth_token}\n".encode('utf-8'))
-    sock.send(f"NICK {bot_username}\n".encode('utf-8'))
-    sock.send("CAP REQ :twitch.tv/tags twitch.tv/commands twitch.tv/membership\n".encode('utf-8'))
-    sock.send(f"JOIN #{streamer_username}\n".encode('utf-8'))
+    # Connect, authenticate and join the chat
+    connector = connector or get_irc_connector()
+    sock = connector.connect(oauth_token, bot_username, [streamer_username])
+    record_dir = os.getenv("IRC_RECORD_DIR")
+    if record_dir:
+        sock = RecordingSocket(sock, recording_path(streamer_username, record_dir))
+        print(f"Recording chat to {sock.path}")
 
     print(f"Connected to {streamer_username}'s chat!")
     return sock
 
 
-def log_chat_messages(sock, log_buffer, interval_end_event, special_event_buffer):
+def record_chat_messages(irc_messages, timestamp_ms, buffer_for, sink=None, commands=None):
+    """
+    Records PRIVMSG and USERNOTICE messages, received at ``timestamp_ms`` (epoch milliseconds),
+    into the interval buffer of their channel.
+
+    ``buffer_for`` maps a channel name to its IntervalBuffer, or to None for channels that
+    are not monitored. Console and JSON output goes through ``sink`` (the shared LogSink by
+    default), which never blocks. Messages starting with the prefix of ``commands`` (a
+    CommandDispatcher) are also dispatched. Returns the remaining messages (PING, RECONNECT,
+    USERSTATE, ...) for the connection to handle.
+    """
+    sink = sink or get_log_sink()
+    echo = sink.enabled
+    prefix = commands.prefix if commands is not None else None
+    timestamp = None  # ISO timestamp, formatted only if a special event needs it
+    log_entries = {}
+    other_messages = []
+
+    for irc_message in irc_messages:
+        command = irc_message.command
+        if command != "PRIVMSG" and command != "USERNOTICE":
+            other_messages.append(irc_message)
+            continue
+        interval_buffer = buffer_for(irc_message.channel)
+        if interval_buffer is None:
+            continue
+
+        if command == "PRIVMSG":
+            try:
+                # Extract relevant fields
+                username = irc_message.tag("display-name", "anonymous")
+                badges = irc_message.tag("badges", "")
+                badges_display = filter_badges(badges)
+                message = irc_message.trailing or ""
+
+                # Readable output is formatted by the sink's writer thread
+                if echo:
+                    sink.chat(timestamp_ms, irc_message.channel, username, badges_display, message)
+
+                # Add to log buffer; the record is built when the interval is serialized
+                log_entries.setdefault(interval_buffer, []).append(
+                    (username, badges_display, badge_code(badges, irc_message.tag("badge-info", "")), message)
+                )
+
+                if prefix is not None and message.startswith(prefix):
+                    commands.dispatch(irc_message.channel, username, message)
+            except Exception as e:
+                print(f"Error processing PRIVMSG: {e}")
+
+        elif command == "USERNOTICE":
+            try:
+                tag = irc_message.tag
+                msg_id = tag("msg-id", "")
+                username = tag("login", "anonymous")
+                badges = tag("badges", "").replace(',', ', ')
+                if timestamp is None:
+                    timestamp = format_epoch_ms(timestamp_ms)
+
+                # Create readable output for events
+                event_data = {
+                    "timestamp": timestamp,
+                    "username": username,
+                    "designations": badges,
+                    "event_type": msg_id,
+                }
+
+                if msg_id == "resub":
+                    months = tag("msg-param-cumulative-months", "1")
+                    event_data["months"] = months
+
+                elif msg_id == "subgift":
+                    recipient = tag("msg-param-recipient-user-name", "unknown")
+                    event_data["recipient"] = recipient
+
+                elif msg_id == "submysterygift":
+                    gift_count = tag("msg-param-mass-gift-count", "1")
+                    event_data["gift_count"] = gift_count
+
+                elif msg_id == "raid":
+                    raider_count = tag("msg-param-viewerCount", "0")
+                    event_data["raider_count"] = raider_count
+
+                interval_buffer.add_special_event(event_data)
+                if echo:
+                    sink.event(timestamp_ms, irc_message.channel, event_data)
+            except Exception as e:
+                print(f"Error processing USERNOTICE: {e}")
+
+    # One lock acquisition per channel and batch rather than per message
+    for interval_buffer, rows in log_entries.items():
+        interval_buffer.extend_chat_logs(timestamp_ms, rows)
+    return other_messages
+
+
+def handle_chat_lines(outbound, lines, interval_buffer, commands=None):
+    """
+    Handles a batch of complete IRC lines: queues PONGs on ``outbound``, tracks the bot's
+    moderator status and records (and dispatches) PRIVMSG and USERNOTICE lines.
+
+    Returns why the server wants the connection dropped (RECONNECT, failed login), or None.
     """
-    Records all chat messages including username, relevant designations, and the message,
-    while removing unnecessary metadata.
+    # Lines of one batch arrived in the same read, so they share a timestamp
+    timestamp_ms = time.time_ns() // 1_000_000
+
+    started = time.perf_counter_ns()
+    irc_messages = parse_lines(lines)
+    parsed = time.perf_counter_ns()
+    other_messages = record_chat_messages(irc_messages, timestamp_ms, lambda channel: interval_buffer, commands=commands)
+    observe_ingest(len(lines), parsed - started, time.perf_counter_ns() - parsed)
+
+    reason = None
+    for irc_message in other_messages:
+        if irc_message.command == "PING":
+            outbound.send_raw(f"PONG :{irc_message.trailing}")
+        elif irc_message.command == "USERSTATE":
+            outbound.update_user_state(irc_message)
+        else:
+            reason = disconnect_reason(irc_message) or reason
+    return reason
+
+
+class ChatSupervisor:
+    """
+    Owns the chat connection of ``manage_intervals`` and keeps it alive.
+
+    A 0-byte read, a read error, a silent socket (no PING within READ_TIMEOUT_SECONDS), a
+    RECONNECT notice or a failed login drops the connection; ``reconnect`` (which opens a new
+    socket, authenticating with the cached token and JOINing the channel) is then retried with
+    jittered exponential backoff. The time between the last read and the re-JOIN is recorded
+    as a gap in the interval buffer and in the reconnect metrics. Without ``reconnect`` the
+    supervisor stops at the first disconnect, as logging used to.
+
+    Outbound commands (PONGs, replies of ``commands``, ``send`` from other threads) wait in
+    ``outbound`` and are written by the reader itself between reads, one write per batch,
+    so the socket is only ever used from one thread.
     """
-    try:
-        while True:
-            response = sock.recv(2048).decode('utf-8')
 
-            if response.startswith('PING'):
-                sock.send("PONG\n".encode('utf-8'))
-            elif "PRIVMSG" in response:
-                try:
-                    # Split response to extract tags and message
-                    parts = response.split(" :", 1)
-                    if len(parts) < 2:
-                        continue  # Skip malformed messages
-
-                    # Extract tags and message body
-                    tags = parts[0]
-                    message = parts[1].strip()  # The actual message text
-                    tag_parts = {tag.split('=')[0]: tag.split('=')[1] for tag in tags.split(';') if '=' in tag}
-
-                    # Extract relevant fields
-                    username = tag_parts.get("display-name", "anonymous")
-                    badges = tag_parts.get("badges", "").split(',')
-                    filtered_badges = [
-                        badge for badge in badges
-                        if badge.startswith("subscriber") or badge.startswith("sub-gifter") or badge.startswith(
-                            "bits") or badge.startswith("premium")
-                    ]
-                    badges_display = ", ".join(filtered_badges) if filtered_badges else "none"
-                    timestamp = datetime.now(UTC).strftime('%Y-%m-%dT%H:%M:%SZ')
-
-                    # Clean message of unnecessary metadata
-                    if "PRIVMSG" in message:
-                        message = message.split("PRIVMSG", 1)[-1].strip()
-                        if "#" in message:
-                            message = message.split("#", 1)[-1].strip()
-
-                    # Prepare readable output
-                    formatted_output = f"[{timestamp}] {username} [{badges_display}]: {message}"
-                    print(formatted_output)
-
-                    # Add to log buffer in JSON-friendly format
-                    log_entry = {
-                        "timestamp": timestamp,
-                        "username": username,
-                        "designations": badges_display,
-                        "message": message
-                    }
-                    log_buffer.append(log_entry)
-                except Exception as e:
-                    print(f"Error processing PRIVMSG: {e}")
-
-            elif "USERNOTICE" in response:
+    def __init__(self, sock, interval_buffer, reconnect=None, stats=reconnect_stats, commands=None):
+        self.sock = sock
+        self.interval_buffer = interval_buffer
+        self.reconnect = reconnect
+        self.stats = stats
+        self.stopped = Event()
+        self.connection_lost = Event()
+        self.outbound = OutboundQueue()
+        self.commands = commands
+        if commands is not None:
+            commands.send = self.outbound.send_message
+
+    def send(self, channel, text):
+        """
+        Queues a chat message; it goes out within the rate limits, at the latest IDLE_POLL_SECONDS later.
+        """
+        return self.outbound.send_message(channel, text)
+
+    def _flush(self, sock):
+        # Returns how long the reader may block before more outbound commands are due
+        payload, wait = self.outbound.take_ready()
+        if payload:
+            sock.sendall(payload)
+        return IDLE_POLL_SECONDS if wait is None else min(max(wait, 0.01), IDLE_POLL_SECONDS)
+
+    def read_until_disconnect(self, sock):
+        """
+        Logs messages from one connection until it drops. Returns the reason and the time of the last read.
+        """
+        reader = LineReader(sock)
+        last_read = datetime.now(UTC)
+        last_read_monotonic = time.monotonic()
+        timeout = None
+        try:
+            while True:
+                next_timeout = self._flush(sock)
+                if next_timeout != timeout:
+                    timeout = next_timeout
+                    sock.settimeout(timeout)
                 try:
-                    tags, content = response.split(" :", 1)
-                    tag_parts = {tag.split('=')[0]: tag.split('=')[1] for tag in tags.split(';') if '=' in tag}
-                    timestamp = datetime.now(UTC).strftime('%Y-%m-%dT%H:%M:%SZ')
-                    msg_id = tag_parts.get("msg-id", "")
-                    username = tag_parts.get("login", "anonymous")
-                    badges = tag_parts.get("badges", "").replace(',', ', ')
-
-                    # Create readable output for events
-                    event_data = {
-                        "timestamp": timestamp,
-                        "username": username,
-                        "designations": badges,
-                        "event_type": msg_id,
-                    }
-
-                    if msg_id == "resub":
-                        months = tag_parts.get("msg-param-cumulative-months", "1")
-                        event_data["months"] = months
-                        print(f"[{timestamp}] {username} [{badges}] resubscribed for {months} months!")
-
-                    elif msg_id == "subgift":
-                        recipient = tag_parts.get("msg-param-recipient-user-name", "unknown")
-                        event_data["recipient"] = recipient
-                        print(f"[{timestamp}] {username} [{badges}] gifted a subscription to {recipient}!")
-
-                    elif msg_id == "submysterygift":
-                        gift_count = tag_parts.get("msg-param-mass-gift-count", "1")
-                        event_data["gift_count"] = gift_count
-                        print(f"[{timestamp}] {username} [{badges}] gifted {gift_count} subscriptions!")
-
-                    elif msg_id == "raid":
-                        raider_count = tag_parts.get("msg-param-viewerCount", "0")
-                        event_data["raider_count"] = raider_count
-                        print(f"[{timestamp}] {username} [{badges}] raided the channel with {raider_count} viewers!")
-
-                    special_event_buffer.append(event_data)
-                except Exception as e:
-                    print(f"Error processing USERNOTICE: {e}")
-
-    except Exception as e:
-        print(f"Error: {e}")
-    finally:
-        interval_end_event.set()  # Signal end of logging
-        sock.close()
+                    # Only the wait for the socket is timed; framing and decoding are ingest work
+                    read_started = time.perf_counter()
+                    data = reader.receive()
+                    RECV_WAIT_SECONDS.observe(time.perf_counter() - read_started)
+                except socket.timeout:
+                    # Nothing to read; wake up to send what became due
+                    if time.monotonic() - last_read_monotonic >= READ_TIMEOUT_SECONDS:
+                        return "timeout", last_read
+                    continue
+                if data is None:
+                    return "closed", last_read
+                last_read = datetime.now(UTC)
+                last_read_monotonic = time.monotonic()
+                lines = reader.feed(data)
+                reason = handle_chat_lines(self.outbound, lines, self.interval_buffer, self.commands)
+                if reason:
+                    return reason, last_read
+        except Exception as e:
+            if self.stopped.is_set():
+                return "stopped", last_read
+            print(f"Error: {e}")
+            return "error", last_read
+
+    def _connect_with_backoff(self, attempt):
+        while not self.stopped.is_set():
+            delay = backoff_delay(attempt)
+            print(f"Reconnecting to chat in {delay:.1f}s (attempt {attempt + 1})...")
+            if self.stopped.wait(delay):
+                break
+            try:
+                return self.reconnect(), attempt
+            except Exception as e:
+                print(f"Reconnect attempt {attempt + 1} failed: {e}")
+                self.stats.record_failure()
+                attempt += 1
+        return None, attempt
+
+    def run(self):
+        attempt = 0
+        try:
+            while True:
+                connected_at = time.monotonic()
+                reason, last_read = self.read_until_disconnect(self.sock)
+                self.sock.close()
+                if self.reconnect is None or self.stopped.is_set():
+                    print("Connection closed by server.")
+                    break
+
+                # The gap starts at the last data received, not when the loss was noticed
+                disconnected = time.monotonic()
+                self.interval_buffer.open_gap(last_read, reason)
+                self.stats.record_disconnect()
+                print(f"Chat connection lost ({reason}).")
+                if reason == "auth_failed":
+                    try:
+                        refresh_irc_token()
+                    except Exception as e:
+                        print(f"Error refreshing IRC token: {e}")
+
+                # Flapping connections keep backing off; a stable one starts over
+                attempt = 0 if time.monotonic() - connected_at >= STABLE_SECONDS else attempt + 1
+                sock, attempt = self._connect_with_backoff(attempt)
+                if sock is None:
+                    break
+                self.sock = sock
+                self.interval_buffer.close_gap(datetime.now(UTC))
+                reconnect_seconds = time.monotonic() - disconnected
+                self.stats.record_reconnect(round(reconnect_seconds, 3))
+                print(f"Reconnected to chat after {reconnect_seconds:.1f}s.")
+        finally:
+            self.connection_lost.set()  # Signal end of logging
+            self.sock.close()
+
+    def stop(self):
+        self.stopped.set()
+        try:
+            # Shutting down wakes the reader blocked on the socket, which close alone does not
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
 
 
-def save_to_single_file(streamer_username, interval_data):
+# Open stores keyed by streamer so crash recovery only runs once per process
+_stores = {}
+
+
+def get_chat_log_store(streamer_username):
     """
-    Appends interval data to a single JSON file.
+    Returns the append-only chat log store of a streamer, opening it on first use.
     """
-    filename = f"{streamer_username}_chat_log.json"
+    if streamer_username not in _stores:
+        path = store_path(streamer_username)
+        legacy_file = f"{streamer_username}_chat_log.json"
+        if not os.path.exists(path) and os.path.exists(legacy_file):
+            print(f"Migrating {legacy_file} to {path}...")
+            _stores[streamer_username] = migrate_json_log(legacy_file, path)
+        else:
+            _stores[streamer_username] = ChatLogStore(path)
+    return _stores[streamer_username]
 
-    # Load existing data
-    if os.path.exists(filename):
-        with open(filename, "r") as file:
-            all_data = json.load(file)
-    else:
-        all_data = []  # Start with an empty list if the file doesn't exist
 
-    # Append the new interval data
-    all_data.append(interval_data)
+def save_to_single_file(streamer_username, interval_data):
+    """
+    Appends interval data to the streamer's chat log store.
 
-    # Write the updated data back to the file
-    with open(filename, "w") as file:
-        json.dump(all_data, file, indent=4)
+    Only the new interval is serialized and appended, so the cost of a flush does not
+    grow with the size of the history.
+    """
+    data_file = get_chat_log_store(streamer_username).append(interval_data)
+    print(f"Appended data for interval starting at {interval_data['start_time']} to {data_file}")
 
-    print(f"Appended data for interval starting at {interval_data['start_time']} to {filename}")
 
+def save_interval(streamer_username, interval_data, log_format="ndjson"):
+    """
+    Writes a finished interval in the chosen log format: "ndjson" (the chat log store),
+    "columnar" (dictionary-encoded column files for vectorized analysis) or "both".
+    """
+    if log_format in ("ndjson", "both"):
+        with timed(FLUSH_SECONDS, ("ndjson",)):
+            save_to_single_file(streamer_username, interval_data)
+    if log_format in ("columnar", "both"):
+        # NumPy is only needed when the columnar format is used
+        from helper_functions.columnar_store import append_interval_columns
+        with timed(FLUSH_SECONDS, ("columnar",)):
+            columns_dir = append_interval_columns(streamer_username, interval_data)
+        print(f"Appended columns for interval starting at {interval_data['start_time']} to {columns_dir}")
 
-def manage_intervals(sock, streamer_username, interval_minutes=10):
+
+def finish_interval(streamer_username, interval_buffer, viewer_sampler, interval_start, interval_end,
+                    log_format="ndjson", broadcaster_user_id=None):
+    """
+    Closes one interval: takes its messages and connection gaps from the buffer, notes viewers,
+    subscribers gained and followers gained, and appends the record to the streamer's chat log store.
+
+    Viewer statistics come from samples the viewer sampler already took, so closing an interval
+    never waits on the Twitch API. Subscribers, followers and stream.online events come from the
+    EventSub counters for ``broadcaster_user_id``; without it they are recorded as unknown (None).
+    """
+    # Take the interval's messages; the reader keeps filling a fresh buffer
+    chat_logs, special_events, dropped_messages = interval_buffer.swap()
+    gaps = interval_buffer.take_gaps(interval_start, interval_end)
+    if dropped_messages:
+        print(f"Warning: dropped {dropped_messages} messages in interval starting at {interval_start}; "
+              f"buffer stats: {interval_buffer.stats()}")
+
+    # Summarize the viewer samples taken during the interval
+    viewer_stats = viewer_sampler.summarize(streamer_username, interval_start, interval_end)
+
+    # Get subscribers and followers from the EventSub counters, by when the events happened
+    if broadcaster_user_id is not None:
+        event_counts = take_interval_counts(broadcaster_user_id, interval_end)
+    else:
+        event_counts = {"subscribers": None, "followers": None, "online": None}
+
+    # Prepare interval data
+    interval_data = {
+        "start_time": interval_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        "end_time": interval_end.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        "chat_logs": chat_logs.to_dicts(),
+        "special_events": special_events,
+        "dropped_messages": dropped_messages,
+        "gaps": gaps,
+        "gap_seconds": round(sum(gap["seconds"] for gap in gaps), 3),
+        "viewers": viewer_stats["last"],
+        "viewer_stats": viewer_stats,
+        "subscribers_gained": event_counts["subscribers"],
+        "followers_gained": event_counts["followers"],
+        "stream_online_events": event_counts["online"]
+    }
+
+    # Append to the streamer's chat log
+    save_interval(streamer_username, interval_data, log_format)
+    return interval_data
+
+
+def interval_summary(interval_data):
+    """
+    One chat line summing up a finished interval.
+    """
+    chat_logs = interval_data["chat_logs"]
+    chatters = len({entry["username"] for entry in chat_logs})
+    summary = f"Last interval: {len(chat_logs):,} messages from {chatters:,} chatters"
+    if interval_data["viewers"] is not None:
+        summary += f", {interval_data['viewers']:,} viewers"
+    if interval_data["subscribers_gained"]:
+        summary += f", {interval_data['subscribers_gained']} new subs"
+    if interval_data["gap_seconds"]:
+        summary += f" ({interval_data['gap_seconds']:.0f}s not logged)"
+    return summary
+
+
+def manage_intervals(sock, streamer_username, interval_minutes=10, log_format="ndjson", broadcaster_user_id=None,
+                     reconnect=None, commands=None, announce=False, live=live_metrics, poller=None):
     """
-    Determines the interval recorded and notes viewers, subscribers gained, and followers gained in that time
+    Determines the interval recorded and notes viewers, subscribers gained, and followers gained in that time.
+    ``broadcaster_user_id`` is the streamer's Twitch user ID, which EventSub events are keyed by.
+    ``reconnect`` opens a fresh, joined chat socket after a disconnect; without it logging stops
+    when the connection drops. ``commands`` (a CommandDispatcher) answers chat commands, and with
+    ``announce`` a summary of every interval is posted to the channel. ``live`` receives the
+    live metrics and ``poller`` (the shared viewer count poller by default) the viewer lookups.
     """
-    log_buffer = []
-    special_event_buffer = []
+    interval_buffer = IntervalBuffer(live=live.channel(streamer_username))
+    watch_buffer(streamer_username, interval_buffer)
+    viewer_sampler = ViewerSampler([streamer_username], poller=poller, live=live).start()
     interval_start = datetime.now(UTC)
 
-    # Initialize JSON file at the start
-    filename = f"{streamer_username}_chat_log.json"
-    if not os.path.exists(filename):
-        initial_data = []
-        with open(filename, "w") as file:
-            json.dump(initial_data, file, indent=4)
-        print(f"Initialized chat log file: {filename}")
+    # Initialize the chat log store at the start
+    store = get_chat_log_store(streamer_username)
+    print(f"Logging chat to {store.path}")
+
+    # A single reader owns the connection for the whole session, reconnecting as needed
+    supervisor = ChatSupervisor(sock, interval_buffer, reconnect, commands=commands)
+    watch_outbound(streamer_username, supervisor.outbound)
+    connection_lost_event = supervisor.connection_lost
+    logging_thread = Thread(target=supervisor.run, daemon=True)
+    logging_thread.start()
 
     while True:
         try:
             interval_end = interval_start + timedelta(minutes=interval_minutes)
 
-            # Wait for the interval to finish
-            interval_end_event = Event()
-            logging_thread = Thread(target=log_chat_messages, args=(sock, log_buffer, interval_end_event, special_event_buffer))
-            logging_thread.start()
-
-            while datetime.now(UTC) < interval_end:
-                interval_end_event.wait(timeout=1)
+            # Wait for the interval to finish or the connection to drop
+            while datetime.now(UTC) < interval_end and not connection_lost_event.is_set():
+                connection_lost_event.wait(timeout=1)
+            if connection_lost_event.is_set():
+                interval_end = min(interval_end, datetime.now(UTC))
 
-            # Check viewership using Twitch API
-            viewers = check_viewership(streamer_username)
+            interval_data = finish_interval(streamer_username, interval_buffer, viewer_sampler, interval_start,
+                                            interval_end, log_format, broadcaster_user_id)
+            if announce:
+                supervisor.send(streamer_username, interval_summary(interval_data))
 
-            # Get subscribers and followers from the webhook counters
-            subs_gained, followers_gained = 5, 10
+            if connection_lost_event.is_set():
+                print("Chat connection lost, stopping interval manager.")
+                break
 
-            # Prepare interval data
-            interval_data = {
-                "start_time": interval_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                "end_time": interval_end.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                "chat_logs": log_buffer,
-                "special_events": special_event_buffer,
-                "viewers": viewers,
-                "subscribers_gained": subs_gained,
-                "followers_gained": followers_gained
-            }
-
-            # Save to a single JSON file
-            save_to_single_file(streamer_username, interval_data)
-
-            # Reset for the next interval
+            # Move on to the next interval
             interval_start = interval_end
-            log_buffer.clear()
-            special_event_buffer.clear()
 
         except KeyboardInterrupt:
             print("Exiting interval manager...")
-            sock.close()
+            supervisor.stop()
             break
         except Exception as e:
             print(f"Error in interval manager: {e}")
-            sock.close()
+            supervisor.stop()
             break
-
+    viewer_sampler.stop()
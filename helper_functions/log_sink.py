@@ -0,0 +1,228 @@
+import json
+import os
+import sys
+import time
+from collections import deque
+from threading import Condition, Event, Lock, Thread
+
+from helper_functions.instrumentation import SINK_WRITE_SECONDS, metrics
+from helper_functions.interval_buffer import format_epoch_ms
+
+LEVELS = ("off", "sampled", "full")
+SAMPLE_EVERY = 100  # At the "sampled" level, one chat message in this many is echoed
+MAX_ECHO_PER_SECOND = 50
+QUEUE_SIZE = 100_000
+FLUSH_SECONDS = 0.2
+
+# Console formats of special events, by USERNOTICE msg-id
+EVENT_FORMATS = {
+    "resub": "[{timestamp}] {username} [{designations}] resubscribed for {months} months!",
+    "subgift": "[{timestamp}] {username} [{designations}] gifted a subscription to {recipient}!",
+    "submysterygift": "[{timestamp}] {username} [{designations}] gifted {gift_count} subscriptions!",
+    "raid": "[{timestamp}] {username} [{designations}] raided the channel with {raider_count} viewers!",
+}
+
+
+class LogSink:
+    """
+    Output layer of the chat ingest path.
+
+    ``chat`` and ``event`` only append a tuple to a bounded queue, so the socket reader never
+    waits on the console; a background thread formats the records, echoes them to ``stream``
+    at most ``max_echo_per_second`` lines per second, and writes every record as a JSON line
+    to ``json_path`` if one is given. Levels:
+
+    - "off": nothing is queued.
+    - "sampled": special events and one chat message in ``sample_every`` are echoed.
+    - "full": every message is echoed (still rate-limited).
+
+    When the queue is full, records are dropped and counted rather than blocking ingest. A
+    batch that fails to be written is reported and counted as failed, and the thread carries
+    on with the next one.
+    """
+
+    def __init__(self, level="full", sample_every=SAMPLE_EVERY, max_echo_per_second=MAX_ECHO_PER_SECOND,
+                 json_path=None, stream=None, queue_size=QUEUE_SIZE):
+        if level not in LEVELS:
+            raise Exception(f"Unknown log level {level!r}, expected one of {LEVELS}")
+        self.level = level
+        self.enabled = level != "off" or json_path is not None
+        self.sample_every = sample_every if level == "sampled" else 1
+        self.max_echo_per_second = max_echo_per_second
+        self.json_path = json_path
+        self.stream = stream
+        self.queue_size = queue_size
+
+        self._queue = deque()
+        self._wakeup = Event()
+        self._lock = Lock()
+        self._thread = None
+        self._batch_done = Condition()
+        self._writing = False  # A batch was taken off the queue and is not written yet
+        self._chat_count = 0
+        self.dropped = 0
+        self.failed = 0
+        self.suppressed = 0  # Lines over the echo rate limit
+        self.written = 0
+
+    def _put(self, record):
+        if self._thread is None:
+            self.start()
+        if len(self._queue) >= self.queue_size:
+            self.dropped += 1
+            return
+        self._queue.append(record)
+
+    def chat(self, timestamp_ms, channel, username, designations, message):
+        if not self.enabled:
+            return
+        self._chat_count += 1
+        echo = self.level != "off" and self._chat_count % self.sample_every == 0
+        if echo or self.json_path:
+            self._put(("chat", echo, timestamp_ms, channel, username, designations, message))
+
+    def event(self, timestamp_ms, channel, event_data):
+        if not self.enabled:
+            return
+        self._put(("event", self.level != "off", timestamp_ms, channel, event_data))
+
+    def stats(self):
+        return {
+            "queued": len(self._queue),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "suppressed": self.suppressed
+        }
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return self
+
+    def flush(self, timeout=5):
+        """
+        Waits until the queued records and the batch being written are done. Returns False
+        if that took longer than ``timeout`` seconds.
+        """
+        deadline = time.monotonic() + timeout
+        with self._batch_done:
+            while self._queue or self._writing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._wakeup.set()
+                self._batch_done.wait(remaining)
+        return True
+
+    @staticmethod
+    def format_record(record):
+        if record[0] == "chat":
+            _, _, timestamp_ms, channel, username, designations, message = record
+            return f"[{format_epoch_ms(timestamp_ms)}] {username} [{designations}]: {message}"
+        event_data = record[4]
+        event_format = EVENT_FORMATS.get(event_data.get("event_type"))
+        if event_format is None:
+            return None
+        return event_format.format(**event_data)
+
+    @staticmethod
+    def json_record(record):
+        if record[0] == "chat":
+            _, _, timestamp_ms, channel, username, designations, message = record
+            return {"type": "chat", "timestamp": format_epoch_ms(timestamp_ms), "channel": channel,
+                    "username": username, "designations": designations, "message": message}
+        _, _, _, channel, event_data = record
+        return {"type": "event", "channel": channel, **event_data}
+
+    def _run(self):
+        json_file = None
+        if self.json_path:
+            try:
+                json_file = open(self.json_path, "a", encoding="utf-8")
+            except OSError as e:
+                print(f"Error opening chat log {self.json_path}, records will only be echoed: {e}", file=sys.stderr)
+        window_start, window_lines = time.monotonic(), 0
+        try:
+            while True:
+                self._wakeup.wait(FLUSH_SECONDS)
+                self._wakeup.clear()
+                with self._batch_done:
+                    queue = self._queue
+                    records = [queue.popleft() for _ in range(len(queue))]
+                    self._writing = bool(records)
+                if not records:
+                    continue
+
+                try:
+                    window_start, window_lines = self._write_batch(records, json_file, window_start, window_lines)
+                except Exception as e:
+                    # One bad record or a failing stream must not stop the writer; stdout may be that stream
+                    self.failed += len(records)
+                    print(f"Error writing {len(records)} chat log records: {e!r}", file=sys.stderr)
+                finally:
+                    with self._batch_done:
+                        self._writing = False
+                        self._batch_done.notify_all()
+        finally:
+            if json_file:
+                json_file.close()
+
+    def _write_batch(self, records, json_file, window_start, window_lines):
+        """
+        Echoes and writes one batch. Returns the echo rate window, updated.
+        """
+        now = time.monotonic()
+        if now - window_start >= 1:
+            if self.suppressed:
+                self._write_console([f"... {self.suppressed} lines not echoed (over {self.max_echo_per_second}/s)"])
+                self.suppressed = 0
+            window_start, window_lines = now, 0
+
+        started = time.perf_counter()
+        lines = []
+        for record in records:
+            if not record[1]:
+                continue
+            if window_lines >= self.max_echo_per_second:
+                self.suppressed += 1
+                continue
+            line = self.format_record(record)
+            if line is not None:
+                lines.append(line)
+                window_lines += 1
+        self._write_console(lines)
+
+        if json_file:
+            json_file.write("".join(json.dumps(self.json_record(record)) + "\n" for record in records))
+            json_file.flush()
+        self.written += len(records)
+        SINK_WRITE_SECONDS.observe(time.perf_counter() - started)
+        return window_start, window_lines
+
+    def _write_console(self, lines):
+        if lines:
+            stream = self.stream or sys.stdout
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+
+
+# Sink that never queues anything, for callers that turn echo off
+OFF_SINK = LogSink("off")
+
+# Process-wide sink configured from the environment, created on first use
+_log_sink = None
+
+
+def get_log_sink():
+    """
+    Returns the shared sink. CHAT_LOG_LEVEL selects off, sampled or full (the default) and
+    CHAT_LOG_JSON, if set, is a file that receives every record as a JSON line.
+    """
+    global _log_sink
+    if _log_sink is None:
+        _log_sink = LogSink(os.getenv("CHAT_LOG_LEVEL", "full"), json_path=os.getenv("CHAT_LOG_JSON"))
+        metrics.watch("twitchbot_log_sink", _log_sink.stats, counters=("written", "dropped", "failed"))
+    return _log_sink
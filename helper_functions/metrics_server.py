@@ -0,0 +1,131 @@
+import json
+import os
+from threading import Thread
+from urllib.parse import parse_qs
+
+from helper_functions.instrumentation import metrics, profiler
+from helper_functions.live_metrics import live_metrics
+
+METRICS_HOST = "127.0.0.1"  # Local dashboards only; nothing here needs to be public
+METRICS_PORT = 8765
+LIVE_PATH = "/live"
+METRICS_PATH = "/metrics"
+PROFILE_PATH = "/profile"
+
+
+def create_metrics_app(live=live_metrics, registry=metrics, sampling_profiler=profiler):
+    """
+    Returns an ASGI application serving the bot's metrics straight from memory:
+
+    - ``GET /live``: latest closed and open bucket of every resolution, per channel
+    - ``GET /live/<channel>?resolution=1m&limit=30``: a channel's buckets at one resolution
+      (1s, 1m or 10m), oldest first, the open bucket last
+    - ``GET /metrics``: ingest, API and queue metrics in the Prometheus text format
+    - ``POST /profile/start?interval_ms=5``, ``POST /profile/stop``: toggle the sampling profiler
+    - ``GET /profile``: the profiler's samples as folded stacks, for flamegraph.pl or speedscope
+    """
+
+    async def respond_text(send, status, body, content_type):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def respond(send, status, payload):
+        await respond_text(send, status, json.dumps(payload).encode('utf-8'), b"application/json")
+
+    async def profile(scope, send, path):
+        query = parse_qs(scope["query_string"].decode("latin-1"))
+        if path == PROFILE_PATH and scope["method"] == "GET":
+            await respond_text(send, 200, sampling_profiler.collapsed().encode('utf-8'), b"text/plain; charset=utf-8")
+        elif path == PROFILE_PATH + "/start" and scope["method"] == "POST":
+            try:
+                interval = float(query["interval_ms"][0]) / 1000 if "interval_ms" in query else None
+            except ValueError as e:
+                await respond(send, 400, {"error": str(e)})
+                return
+            if "reset" in query:
+                sampling_profiler.reset()
+            sampling_profiler.start(interval)
+            await respond(send, 200, {"running": True, "interval_ms": sampling_profiler.interval * 1000})
+        elif path == PROFILE_PATH + "/stop" and scope["method"] == "POST":
+            sampling_profiler.stop()
+            await respond(send, 200, {"running": False, "samples": sampling_profiler.samples})
+        else:
+            await respond(send, 404, {"error": "Not found"})
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        if scope["type"] != "http":
+            return
+        path = scope["path"].rstrip("/")
+        if path == PROFILE_PATH or path.startswith(PROFILE_PATH + "/"):
+            await profile(scope, send, path)
+            return
+        if scope["method"] != "GET":
+            await respond(send, 405, {"error": "Method not allowed"})
+            return
+
+        if path == METRICS_PATH:
+            await respond_text(send, 200, registry.render().encode('utf-8'), b"text/plain; version=0.0.4; charset=utf-8")
+            return
+        if path == LIVE_PATH:
+            channels = {name: live.get(name).summary() for name in live.channels()}
+            await respond(send, 200, {"channels": channels})
+            return
+        if not path.startswith(LIVE_PATH + "/"):
+            await respond(send, 404, {"error": "Not found"})
+            return
+
+        channel = path[len(LIVE_PATH) + 1:]
+        channel_metrics = live.get(channel)
+        if channel_metrics is None:
+            await respond(send, 404, {"error": f"Channel {channel} is not monitored"})
+            return
+        query = parse_qs(scope["query_string"].decode("latin-1"))
+        resolution = query.get("resolution", ["1s"])[0]
+        try:
+            limit = int(query["limit"][0]) if "limit" in query else None
+            buckets = channel_metrics.buckets(resolution, limit)
+        except Exception as e:
+            await respond(send, 400, {"error": str(e)})
+            return
+        await respond(send, 200, {"channel": channel.lower(), "resolution": resolution, "buckets": buckets})
+
+    app.live = live
+    app.registry = registry
+    app.profiler = sampling_profiler
+    return app
+
+
+app = create_metrics_app()
+
+
+def start_metrics_server(host=METRICS_HOST, port=None):
+    """
+    Serves the live metrics app on a background thread. The port defaults to $METRICS_PORT or 8765.
+    """
+    import uvicorn
+
+    port = port or int(os.getenv("METRICS_PORT", METRICS_PORT))
+    thread = Thread(target=uvicorn.run, args=(app,), kwargs={"host": host, "port": port, "log_level": "warning"},
+                    daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    # uvicorn is only needed to serve the app on its own
+    import uvicorn
+
+    uvicorn.run(app, host=METRICS_HOST, port=METRICS_PORT)
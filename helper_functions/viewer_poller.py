@@ -0,0 +1,123 @@
+import os
+import time
+from threading import Lock
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from auth.api_auth import get_token_manager
+from helper_functions.instrumentation import API_REQUESTS, API_SECONDS
+
+HELIX_URL = "https://api.twitch.tv/helix"
+MAX_LOGINS_PER_REQUEST = 100  # Helix accepts up to 100 user_login values per /streams call
+MIN_RATELIMIT_REMAINING = 5  # Wait for the bucket to refill below this many points
+
+
+class ViewerCountPoller:
+    """
+    Fetches viewer counts for many channels with as few Helix calls as possible.
+
+    Logins are batched 100 per request over one keep-alive session, and the ``Ratelimit-*``
+    response headers are tracked so the poller waits for the bucket to refill instead of
+    running into 429s.
+    """
+
+    def __init__(self, client_id, client_secret, base_url=HELIX_URL, pool_size=10,
+                 min_remaining=MIN_RATELIMIT_REMAINING, token_manager=None):
+        self.client_id = client_id
+        self.token_manager = token_manager or get_token_manager(client_id, client_secret)
+        self.base_url = base_url.rstrip('/')
+        self.min_remaining = min_remaining
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.ratelimit_lock = Lock()
+        self.ratelimit_remaining = None
+        self.ratelimit_reset = None  # Epoch seconds at which the bucket refills
+        self.requests_made = 0
+
+    def _wait_for_ratelimit(self):
+        # The bookkeeping is shared by concurrent polls; the wait is slept outside the lock
+        while True:
+            with self.ratelimit_lock:
+                if self.ratelimit_remaining is None or self.ratelimit_remaining > self.min_remaining:
+                    return
+                delay = (self.ratelimit_reset or 0) - time.time()
+                if delay <= 0:
+                    self.ratelimit_remaining = None
+                    return
+            print(f"Helix rate limit nearly exhausted, waiting {delay:.1f}s...")
+            time.sleep(delay)
+
+    def _track_ratelimit(self, response):
+        remaining = response.headers.get("Ratelimit-Remaining")
+        reset = response.headers.get("Ratelimit-Reset")
+        with self.ratelimit_lock:
+            self.requests_made += 1
+            if remaining is not None:
+                self.ratelimit_remaining = int(remaining)
+            if reset is not None:
+                self.ratelimit_reset = int(reset)
+
+    def _get_streams(self, logins):
+        params = [("user_login", login) for login in logins]
+        params.append(("first", MAX_LOGINS_PER_REQUEST))
+
+        for attempt in range(3):
+            self._wait_for_ratelimit()
+            headers = {
+                'Authorization': f'Bearer {self.token_manager.get_access_token()}',
+                'Client-Id': self.client_id
+            }
+            started = time.perf_counter()
+            response = self.session.get(f"{self.base_url}/streams", headers=headers, params=params)
+            API_SECONDS.observe(time.perf_counter() - started, label_values=("streams",))
+            API_REQUESTS.inc(label_values=("streams", str(response.status_code)))
+            self._track_ratelimit(response)
+
+            if response.status_code == 200:
+                return response.json()["data"]
+            if response.status_code == 401:
+                self.token_manager.refresh()
+            elif response.status_code == 429:
+                with self.ratelimit_lock:
+                    self.ratelimit_remaining = 0
+            else:
+                break
+        raise Exception(f"API request failed: {response.status_code}, {response.text}")
+
+    def fetch_viewer_counts(self, logins):
+        """
+        Returns a dict mapping each login to its current viewer count, or None if it is not live.
+
+        A batch whose request fails leaves its logins at None; the other batches are kept.
+        """
+        logins = [login.lower() for login in logins]
+        viewer_counts = dict.fromkeys(logins)
+        for i in range(0, len(logins), MAX_LOGINS_PER_REQUEST):
+            batch = logins[i:i + MAX_LOGINS_PER_REQUEST]
+            try:
+                streams = self._get_streams(batch)
+            except Exception as e:
+                print(f"Error fetching viewer counts for {len(batch)} channels: {e}")
+                continue
+            for stream in streams:
+                viewer_counts[stream["user_login"].lower()] = stream["viewer_count"]
+        return viewer_counts
+
+
+# Process-wide poller, created on first use
+_viewer_poller = None
+
+
+def get_viewer_poller():
+    """
+    Returns the shared viewer count poller configured from the environment.
+    """
+    global _viewer_poller
+    if _viewer_poller is None:
+        _viewer_poller = ViewerCountPoller(os.getenv("TWITCH_CLIENT_ID"), os.getenv("TWITCH_CLIENT_SECRET"))
+    return _viewer_poller
@@ -0,0 +1,147 @@
+import time
+from array import array
+from datetime import datetime, UTC
+from threading import Event, Lock, Thread
+
+from helper_functions.viewer_poller import get_viewer_poller
+
+POLL_SECONDS = 30
+SERIES_CAPACITY = 4 * 60 * 2  # Two hours of samples at the default poll rate
+DOWNSAMPLE_POINTS = 20  # Points kept per interval record
+OFFLINE = -1  # Stored in place of a viewer count while the channel is not live
+
+
+class ViewerSeries:
+    """
+    Fixed-capacity ring of viewer samples kept in two compact arrays
+    (float64 epoch seconds and int32 viewer counts).
+    """
+
+    def __init__(self, capacity=SERIES_CAPACITY):
+        self.capacity = capacity
+        self._times = array('d', bytes(8 * capacity))
+        self._viewers = array('i', bytes(4 * capacity))
+        self._next = 0
+        self._count = 0
+
+    def add(self, timestamp, viewers):
+        """
+        Records one sample, overwriting the oldest once the ring is full.
+        """
+        self._times[self._next] = timestamp
+        self._viewers[self._next] = OFFLINE if viewers is None else viewers
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def window(self, start, end):
+        """
+        Returns the (timestamp, viewers) samples taken in [start, end), oldest first.
+        """
+        first = (self._next - self._count) % self.capacity
+        samples = []
+        for offset in range(self._count):
+            index = (first + offset) % self.capacity
+            timestamp = self._times[index]
+            if start <= timestamp < end:
+                samples.append((timestamp, self._viewers[index]))
+        return samples
+
+
+def summarize_samples(samples, start, end, points=DOWNSAMPLE_POINTS):
+    """
+    Reduces an interval's samples to min/max/mean/last viewers plus a downsampled series.
+
+    The series splits the interval into ``points`` equal buckets and keeps the peak of each,
+    so short raid spikes survive downsampling. Offline samples are left out of the statistics.
+    """
+    live = [viewers for _, viewers in samples if viewers != OFFLINE]
+    if not live:
+        return {"min": None, "max": None, "mean": None, "last": None, "samples": len(samples), "series": []}
+
+    bucket_seconds = (end - start) / points
+    peaks = {}
+    for timestamp, viewers in samples:
+        if viewers == OFFLINE:
+            continue
+        bucket = min(int((timestamp - start) / bucket_seconds), points - 1)
+        peaks[bucket] = max(peaks.get(bucket, viewers), viewers)
+
+    series = [
+        [datetime.fromtimestamp(start + bucket * bucket_seconds, UTC).strftime('%Y-%m-%dT%H:%M:%SZ'), viewers]
+        for bucket, viewers in sorted(peaks.items())
+    ]
+    return {
+        "min": min(live),
+        "max": max(live),
+        "mean": round(sum(live) / len(live), 1),
+        "last": live[-1],
+        "samples": len(samples),
+        "series": series
+    }
+
+
+class ViewerSampler:
+    """
+    Polls viewer counts for a set of channels every ``poll_seconds`` on a background thread,
+    so closing a chat interval only reads samples already in memory. Samples also go to the
+    ``live`` metrics of their channel, if given.
+    """
+
+    def __init__(self, channels, poll_seconds=POLL_SECONDS, capacity=SERIES_CAPACITY, poller=None, live=None):
+        self.poll_seconds = poll_seconds
+        self.live = live
+        self.capacity = capacity
+        self.poller = poller
+        self._lock = Lock()
+        self._series = {channel.lower(): ViewerSeries(capacity) for channel in channels}
+        self._stop_event = Event()
+        self._thread = None
+
+    def add_channel(self, channel):
+        with self._lock:
+            self._series.setdefault(channel.lower(), ViewerSeries(self.capacity))
+
+    def sample_once(self):
+        """
+        Takes one sample of every channel with a single batched lookup.
+        """
+        with self._lock:
+            channels = list(self._series)
+        if self.poller is None:
+            self.poller = get_viewer_poller()
+        viewer_counts = self.poller.fetch_viewer_counts(channels)
+        now = time.time()
+        with self._lock:
+            for channel, viewers in viewer_counts.items():
+                if channel in self._series:
+                    self._series[channel].add(now, viewers)
+        if self.live is not None:
+            for channel, viewers in viewer_counts.items():
+                self.live.channel(channel).record_viewers(now, viewers)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            try:
+                self.sample_once()
+            except Exception as e:
+                print(f"Error sampling viewership: {e}")
+            self._stop_event.wait(max(self.poll_seconds - (time.monotonic() - started), 0))
+
+    def start(self):
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+
+    def summarize(self, channel, interval_start, interval_end, points=DOWNSAMPLE_POINTS):
+        """
+        Returns the viewer statistics of one channel for an interval given as datetimes.
+        """
+        start, end = interval_start.timestamp(), interval_end.timestamp()
+        with self._lock:
+            series = self._series.get(channel.lower())
+            samples = series.window(start, end) if series else []
+        return summarize_samples(samples, start, end, points)
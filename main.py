@@ -3,18 +3,22 @@ import os
 
 from auth.api_auth import get_streamer_id
 from helper_functions.log_chat import connect_to_chat, manage_intervals
+from helper_functions.metrics_server import start_metrics_server
 from eventsub.eventsub_api import verify_eventsub
-from eventsub.eventsub_webhook import app
+from eventsub.eventsub_asgi import app
 
 # Environment variables
 bot_username = "testbot"
 streamer_username = "noraexplorer"
+EVENTSUB_TRANSPORT = None  # "webhook" or "websocket"; without one, subscriber and follower counts are unknown
 
 def start_webhook_server():
     """
-    Starts the Flask app for EventSub webhook handling in a separate thread.
+    Starts the ASGI app for EventSub webhook handling in a separate thread.
     """
-    app.run(port=5000, debug=False, use_reloader=False)
+    import uvicorn
+
+    uvicorn.run(app, port=5000, log_level="warning")
 
 def main():
     """
@@ -29,27 +33,35 @@ def main():
     streamer_id = get_streamer_id(client_id, client_secret, streamer_username)
     print(f"Streamer ID: {streamer_id}")
 
-    # # Step 2: Verify EventSub Subscriptions
-    # print("Verifying EventSub subscriptions...")
-    # verify_eventsub(streamer_id)
-
-    # # Step 3: Start Webhook Server
-    # print("Starting EventSub webhook server...")
-    # webhook_thread = threading.Thread(target=start_webhook_server, daemon=True)
-    # webhook_thread.start()
+    # Steps 2 and 3: receive EventSub notifications, over the webhook ("webhook": needs a public
+    # URL and TWITCH_WEBHOOK_SECRET) or a WebSocket session ("websocket": no public URL needed)
+    if EVENTSUB_TRANSPORT == "webhook":
+        print("Verifying EventSub subscriptions...")
+        verify_eventsub(streamer_id)
+        print("Starting EventSub webhook server...")
+        threading.Thread(target=start_webhook_server, daemon=True).start()
+    elif EVENTSUB_TRANSPORT == "websocket":
+        from eventsub.eventsub_api import required_subscriptions
+        from eventsub.eventsub_websocket import start_eventsub_websocket
+        start_eventsub_websocket(required_subscriptions(streamer_id))
 
     # Step 4: Connect to Twitch Chat
     print(f"Connecting to {streamer_username}'s chat...")
     sock = connect_to_chat(bot_username, streamer_username)
 
+    # Live per-second chat metrics for dashboards, served from memory on localhost
+    start_metrics_server()
+
     # Step 5: Manage Intervals for Logging
     print(f"Starting to log chat messages and interval data for {streamer_username}...")
     try:
-        manage_intervals(sock, streamer_username, interval_minutes=10)
+        # EventSub counts are only taken when a transport delivers them; otherwise they are recorded as None
+        manage_intervals(sock, streamer_username, interval_minutes=10,
+                         broadcaster_user_id=streamer_id if EVENTSUB_TRANSPORT else None,
+                         reconnect=lambda: connect_to_chat(bot_username, streamer_username))
     except KeyboardInterrupt:
         print("Shutting down...")
         sock.close()
-        # webhook_thread.join()
 
 if __name__ == "__main__":
     main()
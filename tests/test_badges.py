@@ -0,0 +1,33 @@
+from helper_functions.badges import badge_code, decode_badges, designation_code
+from helper_functions.irc_parser import filter_badges
+
+
+def test_founders_are_tier_1_subscribers_with_the_months_of_badge_info():
+    badges = decode_badges(badge_code("founder/0,moderator/1", "founder/14"))
+
+    assert badges["subscriber"] and badges["founder"]
+    assert badges["tier"] == 1
+    assert badges["months"] == 14
+
+
+def test_a_founder_keeps_the_tier_of_the_subscriber_badge():
+    badges = decode_badges(badge_code("subscriber/3024,founder/0"))
+
+    assert badges["founder"]
+    assert (badges["tier"], badges["months"]) == (3, 24)
+
+
+def test_stored_designations_of_a_founder_decode_to_the_same_subscriber():
+    # Records written before badge codes are re-derived from what filter_badges kept
+    designations = filter_badges("founder/0,moderator/1")
+    assert decode_badges(designation_code(designations)) == decode_badges(badge_code("founder/0,moderator/1"))
+    assert decode_badges(designation_code(designations))["subscriber"]
+
+
+def test_gifter_and_bits_versions_map_to_the_level_below():
+    badges = decode_badges(badge_code("sub-gifter/60,bits/1500,premium/1"))
+
+    assert badges["gifter"] == 50
+    assert badges["bits"] == 1000
+    assert badges["premium"]
+    assert not badges["subscriber"]
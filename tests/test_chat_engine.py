@@ -0,0 +1,38 @@
+import asyncio
+
+from benchmarks.fake_irc_server import FakeIrcServer
+from benchmarks.support import StaticViewerPoller
+from helper_functions.chat_engine import ChatEngine, JoinRateLimiter
+from helper_functions.chat_store import open_interval_range, store_path
+
+
+def run_engine(channels, messages_per_channel, **options):
+    async def main():
+        fake_server = FakeIrcServer(messages_per_channel, expected_joins=len(channels))
+        server = await fake_server.serve()
+        engine = ChatEngine(
+            "testbot", channels, oauth_token="test", host="127.0.0.1", port=server.sockets[0].getsockname()[1],
+            tls=False, join_limiter=JoinRateLimiter(limit=10**9), echo=False, reconnect=False, live=None, **options
+        )
+        engine.viewer_sampler.poller = StaticViewerPoller()
+        async with server:
+            await engine.run()
+        return engine
+    return asyncio.run(main())
+
+
+def test_partial_interval_is_written_when_connections_end(in_tmp_path):
+    run_engine(["alpha", "beta"], 50)
+
+    for channel in ("alpha", "beta"):
+        intervals = list(open_interval_range(store_path(channel)))
+        assert len(intervals) == 1
+        assert len(intervals[0]["chat_logs"]) == 50
+        assert intervals[0]["start_time"] <= intervals[0]["end_time"]
+
+
+def test_buffers_are_emptied_without_flush(in_tmp_path):
+    engine = run_engine(["alpha"], 20, flush=False)
+
+    assert engine.aggregators["alpha"].interval_buffer.pending() == 0
+    assert engine.aggregators["alpha"].interval_buffer.stats()["total_messages"] == 20
@@ -0,0 +1,44 @@
+from benchmarks.support import max_in_window
+from helper_functions.chat_outbound import (MODERATOR_MESSAGES_PER_WINDOW, OutboundQueue,
+                                            USER_MESSAGES_PER_WINDOW)
+
+
+def drain(outbound, now=0.0):
+    """
+    Sends everything queued in simulated time. Returns each channel's send times.
+    """
+    send_times = {}
+    while True:
+        payload, wait = outbound.take_ready(now)
+        for line in payload.decode('utf-8').split("\r\n"):
+            if line.startswith("PRIVMSG #"):
+                send_times.setdefault(line[9:line.index(" :")], []).append(now)
+        if wait is None:
+            return send_times
+        now += wait
+
+
+def test_channels_not_moderated_share_the_user_limit():
+    outbound = OutboundQueue()
+    outbound.set_moderator("moderated", True)
+    for index in range(60):
+        for channel in ("moderated", "regular_a", "regular_b"):
+            outbound.send_message(channel, f"message {index}")
+
+    send_times = drain(outbound)
+
+    assert all(len(times) == 60 for times in send_times.values())
+    assert max_in_window(sorted(send_times["regular_a"] + send_times["regular_b"])) <= USER_MESSAGES_PER_WINDOW
+    assert max_in_window(sorted(time for times in send_times.values() for time in times)) <= MODERATOR_MESSAGES_PER_WINDOW
+    # The moderated channel is not held back to the user limit
+    assert max_in_window(send_times["moderated"]) > USER_MESSAGES_PER_WINDOW
+
+
+def test_losing_moderator_moves_a_channel_back_under_the_user_limit():
+    outbound = OutboundQueue()
+    outbound.set_moderator("channel", True)
+    outbound.set_moderator("channel", False)
+    for index in range(50):
+        outbound.send_message("channel", f"message {index}")
+
+    assert max_in_window(drain(outbound)["channel"]) <= USER_MESSAGES_PER_WINDOW
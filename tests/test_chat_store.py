@@ -0,0 +1,45 @@
+import json
+import os
+
+import pytest
+
+from helper_functions import log_chat
+from helper_functions.chat_store import ChatLogStore, open_interval_range
+
+
+def legacy_intervals(count):
+    return [
+        {"start_time": f"2024-01-01T00:{minute:02d}:00Z", "end_time": f"2024-01-01T00:{minute + 1:02d}:00Z",
+         "chat_logs": [{"timestamp": f"2024-01-01T00:{minute:02d}:00Z", "username": "viewer",
+                        "designations": "none", "message": f"message {minute}"}],
+         "special_events": []}
+        for minute in range(count)
+    ]
+
+
+def test_an_interrupted_migration_is_resumed_from_the_legacy_file(in_tmp_path, monkeypatch):
+    intervals = legacy_intervals(5)
+    with open("streamer_chat_log.json", "w") as file:
+        json.dump(intervals, file)
+
+    append = ChatLogStore.append
+    appended = []
+
+    def crash_on_the_third(store, interval_data):
+        if len(appended) == 2:
+            raise KeyboardInterrupt
+        appended.append(interval_data)
+        return append(store, interval_data)
+
+    # Stop part-way through the copy, as a crash or Ctrl+C would
+    monkeypatch.setattr(ChatLogStore, "append", crash_on_the_third)
+    with pytest.raises(KeyboardInterrupt):
+        log_chat.get_chat_log_store("streamer")
+    monkeypatch.undo()
+    monkeypatch.chdir(in_tmp_path)
+    monkeypatch.setattr(log_chat, "_stores", {})
+    assert not os.path.exists("streamer_chat_log")
+
+    store = log_chat.get_chat_log_store("streamer")
+    assert list(open_interval_range(store.path)) == intervals
+    assert not os.path.exists("streamer_chat_log.migrating")
@@ -0,0 +1,109 @@
+import socket
+from datetime import datetime, UTC
+
+from helper_functions import log_chat
+from helper_functions.interval_buffer import IntervalBuffer
+from helper_functions.irc_reconnect import ReconnectStats, backoff_delay
+from helper_functions.log_chat import ChatSupervisor
+
+
+class UpperBound:
+    """
+    Stands in for ``random`` and always picks the longest delay.
+    """
+
+    def uniform(self, low, high):
+        return high
+
+
+def closed_connection():
+    """
+    A socket whose server end has already hung up.
+    """
+    sock, server = socket.socketpair()
+    server.close()
+    return sock
+
+
+def utc(hour, minute, second=0):
+    return datetime(2024, 1, 1, hour, minute, second, tzinfo=UTC)
+
+
+def test_backoff_doubles_up_to_the_cap():
+    delays = [backoff_delay(attempt, base=1, cap=60, rng=UpperBound()) for attempt in range(8)]
+    assert delays == [1, 2, 4, 8, 16, 32, 60, 60]
+
+
+def test_backoff_grows_while_the_connection_flaps_and_resets_once_it_was_stable(monkeypatch):
+    attempts = []
+
+    def no_delay(attempt):
+        attempts.append(attempt)
+        return 0
+
+    monkeypatch.setattr(log_chat, "backoff_delay", no_delay)
+    interval_buffer = IntervalBuffer()
+    outcomes = ["fail", "fail", "connect", "connect stably", "stop"]
+
+    def reconnect():
+        outcome = outcomes.pop(0)
+        if outcome == "connect stably":
+            monkeypatch.setattr(log_chat, "STABLE_SECONDS", 0)
+        elif outcome != "connect":
+            if outcome == "stop":
+                supervisor.stopped.set()
+            raise OSError("connection refused")
+        return closed_connection()
+
+    supervisor = ChatSupervisor(closed_connection(), interval_buffer, reconnect=reconnect, stats=ReconnectStats())
+    started = datetime.now(UTC)
+    supervisor.run()
+    ended = datetime.now(UTC)
+
+    # Each drop of a connection that did not last counts on from the attempts before it
+    assert attempts == [1, 2, 3, 4, 0]
+    assert supervisor.connection_lost.is_set()
+    stats = supervisor.stats.snapshot()
+    assert stats["disconnects"] == 3
+    assert stats["reconnects"] == 2
+    # One gap per drop, from the last read to the re-JOIN; the last one never closed
+    gaps = interval_buffer.take_gaps(started, ended)
+    assert [(gap["reason"], gap["ongoing"]) for gap in gaps] == [("closed", False), ("closed", False), ("closed", True)]
+    assert all(gap["start"] <= gap["end"] for gap in gaps)
+
+
+def test_a_gap_across_a_rollover_is_split_between_the_intervals():
+    interval_buffer = IntervalBuffer()
+    interval_buffer.open_gap(utc(10, 9, 30), "timeout")
+    interval_buffer.close_gap(utc(10, 11))
+
+    assert interval_buffer.take_gaps(utc(10, 0), utc(10, 10)) == [
+        {"start": "2024-01-01T10:09:30Z", "end": "2024-01-01T10:10:00Z", "seconds": 30.0, "reason": "timeout",
+         "ongoing": False}
+    ]
+    assert interval_buffer.take_gaps(utc(10, 10), utc(10, 20)) == [
+        {"start": "2024-01-01T10:10:00Z", "end": "2024-01-01T10:11:00Z", "seconds": 60.0, "reason": "timeout",
+         "ongoing": False}
+    ]
+    # Taken gaps are gone
+    assert interval_buffer.take_gaps(utc(10, 10), utc(10, 20)) == []
+
+
+def test_a_gap_still_open_is_reported_in_every_interval_until_it_closes():
+    interval_buffer = IntervalBuffer()
+    interval_buffer.open_gap(utc(10, 25), "reconnect")
+    # A second drop while disconnected does not restart the gap
+    interval_buffer.open_gap(utc(10, 28), "closed")
+
+    first = interval_buffer.take_gaps(utc(10, 20), utc(10, 30))
+    second = interval_buffer.take_gaps(utc(10, 30), utc(10, 40))
+    interval_buffer.close_gap(utc(10, 45))
+    last = interval_buffer.take_gaps(utc(10, 40), utc(10, 50))
+
+    assert [(gap["start"], gap["end"], gap["ongoing"]) for gap in first + second + last] == [
+        ("2024-01-01T10:25:00Z", "2024-01-01T10:30:00Z", True),
+        ("2024-01-01T10:30:00Z", "2024-01-01T10:40:00Z", True),
+        ("2024-01-01T10:40:00Z", "2024-01-01T10:45:00Z", False),
+    ]
+    assert {gap["reason"] for gap in first + second + last} == {"reconnect"}
+    assert interval_buffer.take_gaps(utc(10, 50), utc(11, 0)) == []
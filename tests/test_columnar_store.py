@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+from helper_functions import columnar_store
+from helper_functions.columnar_store import ColumnarLogStore, load_columns
+
+
+def interval(start_minute, chats, events=()):
+    return {
+        "start_time": f"2024-01-01T00:{start_minute:02d}:00Z",
+        "end_time": f"2024-01-01T00:{start_minute + 10:02d}:00Z",
+        "chat_logs": [
+            {"timestamp": f"2024-01-01T00:{start_minute:02d}:00Z", "username": username,
+             "designations": designations, "message": "hi"}
+            for username, designations in chats
+        ],
+        "special_events": list(events),
+        "viewers": 10
+    }
+
+
+def usernames_of(columns):
+    return [columns["usernames"][code] for code in columns["chat_username"]]
+
+
+def file_sizes(path):
+    return {name: os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)}
+
+
+def test_failed_encoding_leaves_no_symbols_behind(tmp_path):
+    store = ColumnarLogStore(str(tmp_path))
+    store.append(interval(0, [("alice", "")]))
+    sizes = file_sizes(store.path)
+
+    bad_event = {"timestamp": "2024-01-01T00:10:00Z", "username": "carol", "event_type": "resub", "months": "many"}
+    with pytest.raises(ValueError):
+        store.append(interval(10, [("bob", "subscriber/3")], [bad_event]))
+    assert file_sizes(store.path) == sizes
+    assert store.dictionaries["usernames"] == ["alice"]
+
+    store.append(interval(10, [("dave", ""), ("alice", "")]))
+    columns = load_columns(store.path)
+    assert usernames_of(columns) == ["alice", "dave", "alice"]
+
+
+def test_failed_write_is_rolled_back(tmp_path, monkeypatch):
+    store = ColumnarLogStore(str(tmp_path))
+    store.append(interval(0, [("alice", "")]))
+    sizes = file_sizes(store.path)
+
+    append_bytes = columnar_store._append_bytes
+    writes = []
+
+    def failing_append(path, data):
+        writes.append(path)
+        if len(writes) == 4:
+            raise OSError("disk full")
+        append_bytes(path, data)
+
+    monkeypatch.setattr(columnar_store, "_append_bytes", failing_append)
+    with pytest.raises(OSError):
+        store.append(interval(10, [("bob", "vip/1")]))
+    monkeypatch.setattr(columnar_store, "_append_bytes", append_bytes)
+    assert file_sizes(store.path) == sizes
+
+    store.append(interval(10, [("erin", "vip/1"), ("bob", "")]))
+    columns = load_columns(store.path)
+    assert usernames_of(columns) == ["alice", "erin", "bob"]
+    assert [columns["designations"][code] for code in columns["chat_designations"]] == ["", "vip/1", ""]
+
+
+def test_uncommitted_tail_is_cut_on_open(tmp_path):
+    store = ColumnarLogStore(str(tmp_path))
+    store.append(interval(0, [("alice", ""), ("bob", "")]))
+    # A crash after some columns of the next interval were written, before intervals.bin
+    with open(os.path.join(store.path, "chat_username.bin"), "ab") as file:
+        file.write(b"\x07\x00\x00\x00")
+
+    reopened = ColumnarLogStore(store.path)
+    reopened.append(interval(10, [("carol", "")]))
+    assert usernames_of(load_columns(store.path)) == ["alice", "bob", "carol"]
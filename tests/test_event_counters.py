@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta, UTC
+
+from eventsub.event_counters import EventCounters
+from eventsub.eventsub_asgi import EventSubReceiver
+
+START = datetime(2024, 1, 1, 12, 0, tzinfo=UTC)
+
+
+def test_counts_are_attributed_to_the_interval_the_events_happened_in():
+    counters = EventCounters()
+    for seconds in (10, 599):
+        counters.record("1001", "channel.subscribe", START + timedelta(seconds=seconds))
+    counters.record("1001", "channel.follow", START + timedelta(seconds=600))
+    counters.record("1002", "channel.subscribe", START + timedelta(seconds=5))
+
+    first = counters.take_until("1001", START + timedelta(minutes=10))
+    assert (first["subscribers"], first["followers"]) == (2, 0)
+
+    # An event that happened in the closed interval but arrived late goes to the next one
+    counters.record("1001", "channel.subscribe", START + timedelta(seconds=300))
+    second = counters.take_until("1001", START + timedelta(minutes=20))
+    assert (second["subscribers"], second["followers"]) == (1, 1)
+
+    assert counters.take_until("1001", START + timedelta(minutes=30))["subscribers"] == 0
+    assert counters.get_and_reset("1002")["subscribers"] == 1
+
+
+def test_follows_are_counted_at_their_follow_time_not_their_delivery():
+    receiver = EventSubReceiver("secret", EventCounters())
+    receiver.process({
+        "subscription": {"type": "channel.follow"},
+        "event": {"broadcaster_user_id": "1001", "user_name": "viewer", "followed_at": "2024-01-01T12:09:59.123456789Z"},
+        "message_timestamp": START + timedelta(minutes=15),
+    }, echo=False)
+
+    assert receiver.counters.take_until("1001", START + timedelta(minutes=10))["followers"] == 1
@@ -0,0 +1,114 @@
+import asyncio
+import hashlib
+import hmac
+import json
+from datetime import datetime, UTC
+
+from eventsub.event_counters import EventCounters
+from eventsub.eventsub_asgi import EventSubReceiver, create_app
+
+SECRET = "test-secret"
+
+
+def signed_notification(message_id, broadcaster_user_id="1001", event_type="channel.subscribe", secret=SECRET):
+    timestamp = datetime.now(UTC).strftime('%Y-%m-%dT%H:%M:%S.%f') + "123Z"
+    body = json.dumps({
+        "subscription": {"type": event_type, "version": "1", "condition": {"broadcaster_user_id": broadcaster_user_id}},
+        "event": {"broadcaster_user_id": broadcaster_user_id, "user_name": "viewer"}
+    }).encode()
+    digest = hmac.new(secret.encode(), (message_id + timestamp).encode() + body, hashlib.sha256).hexdigest()
+    headers = {
+        "twitch-eventsub-message-id": message_id,
+        "twitch-eventsub-message-timestamp": timestamp,
+        "twitch-eventsub-message-signature": f"sha256={digest}",
+        "twitch-eventsub-message-type": "notification",
+    }
+    return headers, body
+
+
+async def post(app, headers, body):
+    """
+    Calls the ASGI app with one webhook request. Returns the response status.
+    """
+    scope = {
+        "type": "http", "method": "POST", "path": "/webhook",
+        "headers": [(name.encode(), value.encode()) for name, value in headers.items()]
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop()
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent[0]["status"]
+
+
+def test_a_notification_accepted_by_the_other_transport_meanwhile_is_not_queued():
+    receiver = EventSubReceiver(SECRET, EventCounters())
+    check = receiver.check
+
+    def check_then_accept_elsewhere(headers, body):
+        # The WebSocket transport accepts the same message between the check and the queueing
+        result = check(headers, body)
+        receiver.accept(result[2])
+        return result
+
+    receiver.check = check_then_accept_elsewhere
+    app = create_app(receiver, echo=False)
+
+    async def run():
+        status = await post(app, *signed_notification("shared"))
+        await asyncio.sleep(0.05)
+        return status
+
+    assert asyncio.run(run()) == 204
+    assert receiver.counters.get_and_reset("1001")["subscribers"] == 0
+    assert receiver.stats["accepted"] == 1
+
+
+def test_a_notification_refused_on_a_full_queue_is_counted_when_retried():
+    receiver = EventSubReceiver(SECRET, EventCounters())
+    app = create_app(receiver, queue_size=1, echo=False)
+    first, second = signed_notification("first"), signed_notification("second")
+
+    async def run():
+        # No await between the two requests yields to the consumer, so the second finds the queue full
+        statuses = [await post(app, *first), await post(app, *second)]
+        await asyncio.sleep(0.05)
+        statuses.append(await post(app, *second))
+        await asyncio.sleep(0.05)
+        return statuses
+
+    assert asyncio.run(run()) == [204, 503, 204]
+    assert receiver.counters.get_and_reset("1001")["subscribers"] == 2
+    assert receiver.stats["accepted"] == 2
+
+
+def test_without_a_secret_requests_are_refused_and_the_app_does_not_start():
+    receiver = EventSubReceiver("", EventCounters())
+    app = create_app(receiver, echo=False)
+    # Anyone can compute a valid signature with an empty secret
+    forged = signed_notification("forged", secret="")
+
+    async def run():
+        status = await post(app, *forged)
+        lifespan = [{"type": "lifespan.startup"}]
+        sent = []
+
+        async def receive():
+            return lifespan.pop()
+
+        async def send(message):
+            sent.append(message)
+
+        await app({"type": "lifespan"}, receive, send)
+        return status, sent
+
+    status, sent = asyncio.run(run())
+    assert status == 403
+    assert sent[0]["type"] == "lifespan.startup.failed"
+    assert receiver.stats["accepted"] == 0
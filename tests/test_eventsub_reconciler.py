@@ -0,0 +1,59 @@
+import threading
+import time
+
+from benchmarks.fake_helix_server import FakeHelix
+from benchmarks.support import StaticToken
+from eventsub.eventsub_api import required_subscriptions
+from eventsub.eventsub_reconciler import EventSubReconciler
+
+TRANSPORT = {"method": "webhook", "callback": "https://example.com/webhook"}
+
+
+def test_reconcile_pages_through_everything_and_keeps_one_enabled_subscription_each(helix_server):
+    helix = FakeHelix()
+    required = [subscription for index in range(80) for subscription in required_subscriptions(str(1000 + index))]
+    kept_duplicates = []
+    for index, subscription in enumerate(required):
+        event_type, condition = subscription["type"], subscription["condition"]
+        if index % 10 == 0:
+            continue  # Missing
+        if index % 10 == 1:
+            helix.add(event_type, condition, TRANSPORT, status="authorization_revoked")
+        elif index % 10 == 2:
+            # A retried create still pending verification, listed before the enabled one
+            helix.add(event_type, condition, TRANSPORT, status="webhook_callback_verification_pending")
+            kept_duplicates.append(helix.add(event_type, condition, TRANSPORT))
+        else:
+            helix.add(event_type, condition, TRANSPORT)
+    existing = len(helix.subscriptions)
+    reconciler = EventSubReconciler("client", "secret", base_url=helix_server(helix), token_manager=StaticToken())
+
+    result = reconciler.reconcile(required, TRANSPORT)
+
+    # 240 subscriptions take three pages of 100
+    assert existing > 2 * 100
+    assert helix.requests["GET"] == 3
+    assert result["existing"] == existing
+    assert result["created"] == 48  # The missing and the revoked
+    assert result["deleted"] == 48  # The revoked and the pending duplicates
+    subscriptions = list(helix.subscriptions.values())
+    assert len(subscriptions) == len(required)
+    assert all(subscription["status"] == "enabled" for subscription in subscriptions)
+    assert all(subscription_id in helix.subscriptions for subscription_id in kept_duplicates)
+
+
+def test_waiting_for_the_rate_limit_does_not_hold_the_lock():
+    reconciler = EventSubReconciler("client", "secret", token_manager=StaticToken())
+    reconciler.ratelimit_remaining = reconciler.min_remaining
+    reconciler.ratelimit_reset = int(time.time()) + 1
+    waiting = threading.Thread(target=reconciler._take_ratelimit_point)
+    waiting.start()
+    time.sleep(0.1)
+
+    # Responses of requests already in flight can still update the bucket
+    acquired = reconciler.ratelimit_lock.acquire(timeout=0.2)
+    if acquired:
+        reconciler.ratelimit_lock.release()
+    waiting.join()
+    assert acquired
+    assert reconciler.requests_made == 1
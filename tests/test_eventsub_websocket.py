@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+from benchmarks.fake_eventsub_server import FakeEventSubServer
+from eventsub.event_counters import COUNTED_EVENTS, EventCounters
+from eventsub.eventsub_asgi import EventSubReceiver
+from eventsub.eventsub_websocket import EventSubWebSocket
+
+CHANNELS = ["1001", "1002", "1003"]
+
+
+async def receive(fake_server, client, receiver, timeout=10):
+    server = await fake_server.serve()
+    client.url = f"ws://127.0.0.1:{fake_server.port}/ws"
+    task = asyncio.create_task(client.run())
+    started = time.perf_counter()
+    try:
+        while client.stats["notifications"] < fake_server.notification_count and time.perf_counter() - started < timeout:
+            await asyncio.sleep(0.01)
+        # Let late deliveries and duplicates show up before counting
+        await asyncio.sleep(0.1)
+    finally:
+        client.stop()
+        task.cancel()
+        server.close()
+
+    counted = {}
+    for channel in CHANNELS:
+        totals = receiver.counters.get_and_reset(channel)
+        for event_type, counter in COUNTED_EVENTS.items():
+            if totals[counter]:
+                counted[(channel, event_type)] = totals[counter]
+    return counted
+
+
+def test_reconnect_keeps_reading_the_old_connection_until_the_new_welcome():
+    fake_server = FakeEventSubServer(CHANNELS, notification_count=300, reconnect_after=100, duplicate_every=10,
+                                     reconnect_overlap=50, welcome_delay=0.2)
+    receiver = EventSubReceiver("unused", EventCounters())
+    subscribed = []
+    client = EventSubWebSocket(
+        [{"type": "channel.follow", "condition": {"broadcaster_user_id": channel}} for channel in CHANNELS],
+        subscribe=lambda session_id, subscriptions: subscribed.append(session_id),
+        receiver=receiver, echo=False
+    )
+
+    counted = asyncio.run(receive(fake_server, client, receiver))
+    assert client.stats["reconnects"] == 1
+    assert len(subscribed) == 1
+    assert client.stats["notifications"] == fake_server.sent
+    assert counted == fake_server.expected
+    assert client.stats["duplicates"] == sum(1 for sent in range(fake_server.sent) if sent % 10 == 0)
+
+
+def test_each_notification_is_accepted_once_across_transports():
+    receiver = EventSubReceiver("unused", EventCounters())
+    notification = {"message_id": "retried"}
+    assert receiver.accept(notification)
+    assert not receiver.accept(notification)
+    assert receiver.stats["accepted"] == 1
@@ -0,0 +1,156 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta, UTC
+
+import pytest
+
+from analysis import incremental_analysis
+from analysis.chat_analysis import extended_analyze_chat_logs, iter_chat_logs
+from analysis.incremental_analysis import (ChatAnalysisState, iter_checkpoint_periods, load_checkpoint,
+                                           save_checkpoint, update_analysis)
+from helper_functions.chat_store import ChatLogStore
+
+
+def interval_time(period):
+    return (datetime(2024, 1, 1, tzinfo=UTC) + timedelta(minutes=10 * period)).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def intervals(start, count):
+    for period in range(start, start + count):
+        yield {
+            "start_time": interval_time(period),
+            "end_time": interval_time(period + 1),
+            "chat_logs": [
+                {"timestamp": interval_time(period), "username": f"user{(period * 3 + index) % 40}",
+                 "designations": "subscriber/6" if index % 2 else "", "message": "hi"}
+                for index in range(period % 5 + 3)
+            ],
+            "special_events": []
+        }
+
+
+def test_update_appends_to_the_checkpoint_and_matches_a_full_analysis(tmp_path, monkeypatch):
+    monkeypatch.setattr(incremental_analysis, "MAX_PERIODS_IN_MEMORY", 4)
+    monkeypatch.setattr(incremental_analysis, "CHATTER_JOURNAL_COMPACT_LINES", 3)
+    store = ChatLogStore(str(tmp_path / "chat_log"))
+    checkpoint = str(tmp_path / "checkpoint.json")
+    sizes = []
+    for batch in range(8):
+        for period in intervals(batch * 3, 3):
+            store.append(period)
+        state = update_analysis(store.path, checkpoint)
+        assert len(state.period_data) <= 4
+        sizes.append(os.path.getsize(checkpoint))
+
+    period_data, summary = extended_analyze_chat_logs(iter_chat_logs(store.path))
+    assert list(iter_checkpoint_periods(checkpoint)) == period_data
+    assert load_checkpoint(checkpoint).summary() == summary
+    assert state.summary() == summary
+    # The checkpoint file holds no history, and compaction keeps a single chatter journal
+    assert max(sizes) < 2 * min(sizes)
+    assert len([name for name in os.listdir(tmp_path) if ".chatters." in name]) == 1
+
+
+def test_the_first_save_keeps_more_periods_than_are_held_in_memory(tmp_path):
+    store = ChatLogStore(str(tmp_path / "chat_log"))
+    count = incremental_analysis.MAX_PERIODS_IN_MEMORY + 92
+    for period in intervals(0, count):
+        store.append(period)
+    checkpoint = str(tmp_path / "checkpoint.json")
+
+    state = update_analysis(store.path, checkpoint)
+
+    assert len(state.period_data) == incremental_analysis.MAX_PERIODS_IN_MEMORY
+    period_data, summary = extended_analyze_chat_logs(iter_chat_logs(store.path))
+    assert len(period_data) == count
+    assert list(iter_checkpoint_periods(checkpoint)) == period_data
+    assert load_checkpoint(checkpoint).summary() == summary
+
+
+def test_an_interrupted_save_leaves_the_previous_checkpoint(tmp_path, monkeypatch):
+    store = ChatLogStore(str(tmp_path / "chat_log"))
+    checkpoint = str(tmp_path / "checkpoint.json")
+    for period in intervals(0, 4):
+        store.append(period)
+    update_analysis(store.path, checkpoint)
+    for period in intervals(4, 4):
+        store.append(period)
+
+    def crash(*args):
+        raise OSError("disk full")
+
+    # The journals are appended, then the checkpoint replace fails
+    monkeypatch.setattr(incremental_analysis.os, "replace", crash)
+    with pytest.raises(OSError):
+        update_analysis(store.path, checkpoint)
+    monkeypatch.undo()
+    assert len(list(iter_checkpoint_periods(checkpoint))) == 4
+
+    update_analysis(store.path, checkpoint)
+    period_data, summary = extended_analyze_chat_logs(iter_chat_logs(store.path))
+    assert list(iter_checkpoint_periods(checkpoint)) == period_data
+    assert load_checkpoint(checkpoint).summary() == summary
+
+
+def test_restoring_honours_use_sketches(tmp_path):
+    state = ChatAnalysisState().add_intervals(intervals(0, 6))
+    checkpoint = str(tmp_path / "checkpoint.json")
+    save_checkpoint(checkpoint, state)
+
+    sketched = load_checkpoint(checkpoint, use_sketches=True)
+    assert sketched.use_sketches
+    assert sketched.summary()["total_unique_chatters"] == pytest.approx(state.summary()["total_unique_chatters"], rel=0.05)
+    assert not load_checkpoint(checkpoint).use_sketches
+
+    save_checkpoint(checkpoint, sketched)
+    with pytest.raises(Exception, match="sketches"):
+        load_checkpoint(checkpoint, use_sketches=False)
+
+
+def test_checkpoints_counted_under_older_badge_rules_are_re_derived(tmp_path):
+    store = ChatLogStore(str(tmp_path / "chat_log"))
+    count = incremental_analysis.MAX_PERIODS_IN_MEMORY + 92
+    for period in intervals(0, count):
+        store.append(period)
+    # A checkpoint from before the journals and the badge codes, with stale totals
+    stale = ChatAnalysisState().add_intervals(intervals(0, 3))
+    data = stale.to_dict()
+    del data["badge_rules"]
+    data["total_chatters"] = sorted(stale.total_chatters)
+    data["six_plus_month_subscribers"] = 0
+    checkpoint = str(tmp_path / "checkpoint.json")
+    with open(checkpoint, 'w') as file:
+        json.dump(data, file)
+
+    assert load_checkpoint(checkpoint).last_end_time is None
+    state = update_analysis(store.path, checkpoint)
+    period_data, summary = extended_analyze_chat_logs(iter_chat_logs(store.path))
+    assert state.summary() == summary
+    assert load_checkpoint(checkpoint).summary() == summary
+    assert list(iter_checkpoint_periods(checkpoint)) == period_data
+
+
+def test_a_journaled_checkpoint_is_re_derived_in_full_when_the_badge_rules_change(tmp_path, monkeypatch):
+    store = ChatLogStore(str(tmp_path / "chat_log"))
+    count = incremental_analysis.MAX_PERIODS_IN_MEMORY + 92
+    for period in intervals(0, count):
+        store.append(period)
+    checkpoint = str(tmp_path / "checkpoint.json")
+    update_analysis(store.path, checkpoint)
+
+    monkeypatch.setattr(incremental_analysis, "BADGE_RULES", incremental_analysis.BADGE_RULES + 1)
+    assert load_checkpoint(checkpoint).last_end_time is None
+    update_analysis(store.path, checkpoint)
+
+    period_data, summary = extended_analyze_chat_logs(iter_chat_logs(store.path))
+    assert list(iter_checkpoint_periods(checkpoint)) == period_data
+    assert load_checkpoint(checkpoint).summary() == summary
+    assert len([name for name in os.listdir(tmp_path) if ".chatters." in name]) == 1
+
+
+def test_exact_analysis_does_not_import_numpy():
+    code = ("import sys; from analysis.chat_analysis import extended_analyze_chat_logs; "
+            "extended_analyze_chat_logs([]); sys.exit('numpy' in sys.modules)")
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
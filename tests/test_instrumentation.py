@@ -0,0 +1,52 @@
+import socket
+import threading
+import time
+
+from helper_functions import log_chat
+from helper_functions.instrumentation import RECV_WAIT_SECONDS, MetricsRegistry
+from helper_functions.interval_buffer import IntervalBuffer
+from helper_functions.irc_reconnect import ReconnectStats
+
+
+def test_series_of_exited_threads_are_retired_into_the_totals():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Test counter", ("kind",))
+    histogram = registry.histogram("test_seconds", "Test histogram", buckets=(0.1, 1))
+
+    def record():
+        counter.inc(2, ("a",))
+        histogram.observe(0.5)
+
+    for _ in range(20):
+        thread = threading.Thread(target=record)
+        thread.start()
+        thread.join()
+    counter.inc(1, ("b",))
+
+    assert counter.samples() == [("test_total", ("kind",), ("a",), 40), ("test_total", ("kind",), ("b",), 1)]
+    assert ("test_seconds_count", (), (), 20) in histogram.samples()
+    # Only the running thread keeps a shard
+    assert len(counter._shards) == 1
+    assert len(histogram._shards) == 0
+
+
+def recv_wait_total():
+    return sum(value for name, _, _, value in RECV_WAIT_SECONDS.samples() if name.endswith("_sum"))
+
+
+def test_recv_wait_stops_when_the_socket_read_returns(monkeypatch):
+    class SlowReader(log_chat.LineReader):
+        def feed(self, data):
+            time.sleep(0.2)  # Framing and decoding happen after the read
+            return super().feed(data)
+
+    monkeypatch.setattr(log_chat, "LineReader", SlowReader)
+    sock, server = socket.socketpair()
+    server.sendall(b":tmi.twitch.tv 001 testbot :Welcome, GLHF!\r\n")
+    server.close()
+    supervisor = log_chat.ChatSupervisor(sock, IntervalBuffer(), stats=ReconnectStats())
+    before = recv_wait_total()
+
+    assert supervisor.read_until_disconnect(sock)[0] == "closed"
+    assert recv_wait_total() - before < 0.1
+    sock.close()
@@ -0,0 +1,71 @@
+from helper_functions.interval_buffer import ChatRecords, IntervalBuffer
+
+TIMESTAMP_MS = 1704103200000  # 2024-01-01T10:00:00Z
+
+
+def rows(count, start=0):
+    return [(f"user{index}", "subscriber/6", 1030, f"message {index}") for index in range(start, start + count)]
+
+
+def test_messages_past_the_cap_are_dropped_and_counted_per_interval(capsys):
+    interval_buffer = IntervalBuffer(max_messages=5)
+    interval_buffer.extend_chat_logs(TIMESTAMP_MS, rows(3))
+    interval_buffer.extend_chat_logs(TIMESTAMP_MS, rows(4, start=3))
+    interval_buffer.extend_chat_logs(TIMESTAMP_MS, rows(2, start=7))
+
+    chat_logs, _, dropped = interval_buffer.swap()
+    # The batch that reaches the cap is cut, not dropped whole
+    assert [chat["username"] for chat in chat_logs] == [f"user{index}" for index in range(5)]
+    assert dropped == 4
+    assert capsys.readouterr().out.count("Warning") == 1
+
+    # The next interval starts empty and warns again on its own first drop
+    interval_buffer.extend_chat_logs(TIMESTAMP_MS, rows(6))
+    chat_logs, _, dropped = interval_buffer.swap()
+    assert (len(chat_logs), dropped) == (5, 1)
+    assert capsys.readouterr().out.count("Warning") == 1
+    assert interval_buffer.stats() == {"pending": 0, "high_water": 5, "total_messages": 10, "total_dropped": 5}
+
+
+def test_a_buffer_below_the_cap_drops_nothing(capsys):
+    interval_buffer = IntervalBuffer(max_messages=5)
+    interval_buffer.extend_chat_logs(TIMESTAMP_MS, rows(5))
+
+    chat_logs, _, dropped = interval_buffer.swap()
+    assert (len(chat_logs), dropped) == (5, 0)
+    assert "Warning" not in capsys.readouterr().out
+
+
+def test_repeated_names_and_designations_are_held_once():
+    records = ChatRecords()
+    records.extend(TIMESTAMP_MS, [("alice", "subscriber/6", 1030, "hi"), ("bob", "none", 0, "hey")])
+    records.extend(TIMESTAMP_MS + 1500, [("alice", "subscriber/6", 1030, "again"), ("carol", "none", 0, "yo")])
+
+    assert records.usernames == ["alice", "bob", "carol"]
+    assert records.designations == ["subscriber/6", "none"]
+    assert list(records.username_codes) == [0, 1, 0, 2]
+    assert list(records.designation_codes) == [0, 1, 0, 1]
+    assert records.to_dicts() == [
+        {"timestamp": "2024-01-01T10:00:00Z", "username": "alice", "designations": "subscriber/6", "badge_code": 1030,
+         "message": "hi"},
+        {"timestamp": "2024-01-01T10:00:00Z", "username": "bob", "designations": "none", "badge_code": 0,
+         "message": "hey"},
+        {"timestamp": "2024-01-01T10:00:01Z", "username": "alice", "designations": "subscriber/6", "badge_code": 1030,
+         "message": "again"},
+        {"timestamp": "2024-01-01T10:00:01Z", "username": "carol", "designations": "none", "badge_code": 0,
+         "message": "yo"},
+    ]
+
+
+def test_each_interval_starts_its_own_symbol_tables():
+    interval_buffer = IntervalBuffer(max_messages=3)
+    interval_buffer.extend_chat_logs(TIMESTAMP_MS, [("alice", "none", 0, "hi"), ("bob", "none", 0, "hey")])
+    first, _, _ = interval_buffer.swap()
+    interval_buffer.extend_chat_logs(TIMESTAMP_MS, [("carol", "premium/1", 0, "yo")] + rows(3))
+    second, _, dropped = interval_buffer.swap()
+
+    assert first.usernames == ["alice", "bob"]
+    # Names of dropped messages never enter the table
+    assert second.usernames == ["carol", "user0", "user1"]
+    assert second.designations == ["premium/1", "subscriber/6"]
+    assert dropped == 1
@@ -0,0 +1,92 @@
+import socket
+import ssl
+import time
+
+import pytest
+
+from benchmarks.fake_tls_server import FakeTlsIrcServer
+from benchmarks.support import read_welcome
+from helper_functions import irc_connection
+from helper_functions.irc_connection import IrcConnector, handshake_bytes
+
+CHANNELS = ["channel000", "channel001"]
+
+
+@pytest.fixture(scope="module")
+def tls_server():
+    server = FakeTlsIrcServer().start()
+    yield server
+    server.stop()
+
+
+def wait_for_reads(server, connection_count):
+    deadline = time.monotonic() + 5
+    while len(server.connections) < connection_count or not server.connections[-1][1]:
+        assert time.monotonic() < deadline, "the stand-in never received the handshake"
+        time.sleep(0.01)
+    return server.connections[-1]
+
+
+def test_handshake_is_one_write_with_crlf_endings(tls_server):
+    connector = IrcConnector("localhost", tls_server.port, ssl_context=tls_server.client_context)
+    sock = connector.connect("token", "testbot", CHANNELS)
+    echoed = read_welcome(sock)
+    sock.close()
+
+    received, reads = wait_for_reads(tls_server, len(tls_server.connections))
+    assert bytes(received) == handshake_bytes("token", "testbot", CHANNELS)
+    assert reads == 1
+    assert bytes(received).replace(b"\r\n", b"").count(b"\n") == 0
+    assert b"NOTICE * :PASS oauth:token" in echoed
+
+
+def test_reconnects_resume_the_tls_session(tls_server):
+    connector = IrcConnector("localhost", tls_server.port, ssl_context=tls_server.client_context)
+    for _ in range(3):
+        sock = connector.connect("token", "testbot", CHANNELS)
+        read_welcome(sock)
+        sock.close()
+
+    stats = connector.stats()
+    assert stats["connects"] == 3
+    assert stats["resumed"] == 2
+    assert stats["tls"] is True
+    # The caller's context is left as it was
+    assert tls_server.client_context.sslsocket_class is ssl.SSLSocket
+
+
+def test_sockets_are_tuned(tls_server):
+    connector = IrcConnector("localhost", tls_server.port, ssl_context=tls_server.client_context)
+    sock = connector.open()
+    try:
+        assert isinstance(sock, ssl.SSLSocket)
+        assert sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+        assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE)
+        assert sock.gettimeout() is None
+    finally:
+        sock.close()
+
+
+def test_buffer_sizes_are_set_before_connecting(tls_server, monkeypatch):
+    tune_socket = irc_connection.tune_socket
+    connected = []
+
+    def record(sock, *args):
+        try:
+            sock.getpeername()
+            connected.append(True)
+        except OSError:
+            connected.append(False)
+        tune_socket(sock, *args)
+
+    monkeypatch.setattr(irc_connection, "tune_socket", record)
+    connector = IrcConnector("localhost", tls_server.port, ssl_context=tls_server.client_context)
+    connector.open().close()
+    assert connected and not any(connected)
+
+
+def test_untrusted_certificate_is_refused(tls_server):
+    connector = IrcConnector("localhost", tls_server.port, ssl_context=ssl.create_default_context())
+    with pytest.raises(ssl.SSLCertVerificationError):
+        connector.open()
+    assert connector.stats()["connects"] == 0
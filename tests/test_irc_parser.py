@@ -0,0 +1,77 @@
+import pytest
+
+from helper_functions.irc_parser import filter_badges, parse_line, parse_lines, unescape_tag_value
+
+PRIVMSG = ("@badge-info=subscriber/14;badges=founder/0,moderator/1;display-name=Viewer;"
+           "msg-id=;system-msg=viewer\\ssubscribed\\sfor\\s14\\smonths\\:\\sthanks!;emotes= "
+           ":viewer!viewer@viewer.tmi.twitch.tv PRIVMSG #channel :hello :) there")
+
+
+@pytest.mark.parametrize("value, decoded", [
+    ("plain", "plain"),
+    ("a\\sb", "a b"),
+    ("a\\:b", "a;b"),
+    ("back\\\\slash", "back\\slash"),
+    ("line\\rbreak\\n", "line\rbreak\n"),
+    ("unknown\\x", "unknownx"),
+    ("trailing\\", "trailing"),
+    ("", ""),
+])
+def test_tag_values_are_unescaped(value, decoded):
+    assert unescape_tag_value(value) == decoded
+
+
+def test_privmsg_is_split_into_its_parts():
+    message = parse_line(PRIVMSG)
+
+    assert message.command == "PRIVMSG"
+    assert message.prefix == "viewer!viewer@viewer.tmi.twitch.tv"
+    assert message.nick == "viewer"
+    assert message.channel == "channel"
+    assert message.params == ["#channel"]
+    # Only the first " :" starts the trailing parameter
+    assert message.trailing == "hello :) there"
+
+
+def test_single_tags_and_the_tag_dict_agree():
+    message = parse_line(PRIVMSG)
+
+    assert message.tag("badge-info") == "subscriber/14"
+    assert message.tag("emotes") == ""
+    assert message.tag("msg-id") == ""
+    assert message.tag("system-msg") == "viewer subscribed for 14 months; thanks!"
+    # A key is only matched whole, not as the end of a longer one
+    assert message.tag("id") is None
+    assert message.tag("missing", "default") == "default"
+    assert message.tags == {
+        "badge-info": "subscriber/14", "badges": "founder/0,moderator/1", "display-name": "Viewer",
+        "msg-id": "", "system-msg": "viewer subscribed for 14 months; thanks!", "emotes": ""
+    }
+
+
+def test_lines_without_tags_or_prefix():
+    ping = parse_line("PING :tmi.twitch.tv")
+    assert (ping.command, ping.prefix, ping.params, ping.trailing) == ("PING", None, [], "tmi.twitch.tv")
+    assert ping.tags == {}
+    assert ping.tag("badges", "") == ""
+
+    join = parse_line(":viewer!viewer@viewer.tmi.twitch.tv JOIN #channel")
+    assert (join.command, join.nick, join.channel, join.trailing) == ("JOIN", "viewer", "channel", None)
+
+
+def test_empty_and_malformed_lines_are_skipped():
+    lines = ["", "@badges=premium/1", ":tmi.twitch.tv", "@badges=premium/1 :tmi.twitch.tv", "PING :tmi.twitch.tv"]
+    assert [parse_line(line) for line in lines[:4]] == [None] * 4
+    assert [message.command for message in parse_lines(lines)] == ["PING"]
+
+
+@pytest.mark.parametrize("badges, designations", [
+    ("subscriber/3012,sub-gifter/5,bits/100", "subscriber/3012, sub-gifter/5, bits/100"),
+    # Founders count as subscribers, so the badge is kept
+    ("founder/0,moderator/1", "founder/0"),
+    ("broadcaster/1,premium/1", "premium/1"),
+    ("moderator/1,vip/1", "none"),
+    ("", "none"),
+])
+def test_only_relevant_badges_are_kept(badges, designations):
+    assert filter_badges(badges) == designations
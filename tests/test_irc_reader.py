@@ -0,0 +1,64 @@
+import socket
+
+from helper_functions.irc_reader import LineReader
+
+
+def feed_all(reader, chunks):
+    lines = []
+    for chunk in chunks:
+        lines.extend(reader.feed(chunk))
+    return lines
+
+
+def test_a_partial_line_is_carried_over_to_the_next_read():
+    reader = LineReader(None)
+    assert reader.feed(b"PING :tmi.tw") == []
+    assert reader.feed(b"itch.tv\r\nPRIVMSG #a") == ["PING :tmi.twitch.tv"]
+    assert reader.feed(b" :hi\r\n") == ["PRIVMSG #a :hi"]
+
+
+def test_a_crlf_split_across_reads_ends_the_line_once():
+    reader = LineReader(None)
+    assert feed_all(reader, [b"first\r", b"\nsecond\r", b"\n"]) == ["first", "second"]
+    # A lone '\r' or '\n' inside a line does not end it
+    assert feed_all(reader, [b"a\rb\nc\r\n"]) == ["a\rb\nc"]
+
+
+def test_many_lines_in_one_read_and_empty_lines_skipped():
+    reader = LineReader(None)
+    chunk = b"".join(f"PRIVMSG #channel :message {index}\r\n".encode() for index in range(50)) + b"\r\n"
+    assert reader.feed(chunk) == [f"PRIVMSG #channel :message {index}" for index in range(50)]
+
+
+def test_multibyte_characters_split_across_reads_are_decoded_whole():
+    data = "PRIVMSG #channel :héllo 👋\r\n".encode()
+    reader = LineReader(None)
+    assert feed_all(reader, [data[:20], data[20:23], data[23:]]) == ["PRIVMSG #channel :héllo 👋"]
+
+
+def test_an_over_long_line_is_dropped_and_the_next_ones_kept():
+    reader = LineReader(None, max_line_bytes=16)
+    chunks = [b"ok\r\n" + b"x" * 10, b"x" * 10, b"x" * 100 + b"\r", b"\nafter\r\n"]
+
+    assert feed_all(reader, chunks) == ["ok", "after"]
+    assert reader.dropped_lines == 1
+    assert len(reader._pending) == 0
+
+
+def test_the_carried_over_line_never_grows_past_the_cap():
+    reader = LineReader(None, max_line_bytes=16)
+    for _ in range(100):
+        assert reader.feed(b"y" * 10) == []
+        assert len(reader._pending) <= 16
+    assert reader.feed(b"\r\nnext\r\n") == ["next"]
+    assert reader.dropped_lines == 1
+
+
+def test_read_batch_returns_none_once_the_peer_closes():
+    sock, server = socket.socketpair()
+    reader = LineReader(sock)
+    server.sendall(b"PING :tmi.twitch.tv\r\npartial")
+    assert reader.read_batch() == ["PING :tmi.twitch.tv"]
+    server.close()
+    assert reader.read_batch() is None
+    sock.close()
@@ -0,0 +1,114 @@
+import socket
+import time
+
+import pytest
+
+from analysis.chat_analysis import extended_analyze_chat_logs, iter_chat_logs
+from benchmarks.fake_irc_server import ReplayIrcServer, synthetic_recording
+from benchmarks.support import StaticViewerPoller, load_corpus, privmsg_counts, start_server
+from helper_functions.chat_store import store_path
+from helper_functions.irc_connection import IrcConnector
+from helper_functions.irc_reader import LineReader
+from helper_functions.irc_recorder import RecordingSocket, read_recording, recording_path
+from helper_functions.live_metrics import LiveMetrics
+from helper_functions.log_chat import manage_intervals
+
+CHUNKS = [b"PING :tmi.twitch.tv\r\n", b"@badges=;display-name=a :a!a@a PRIVMSG #c :hel", b"lo\r\n"]
+
+
+def test_recording_round_trip(tmp_path):
+    server, client = socket.socketpair()
+    recording = RecordingSocket(client, recording_path("chan", str(tmp_path)))
+    buffer = bytearray(1024)
+    received = []
+    for chunk in CHUNKS:
+        server.sendall(chunk)
+        if len(received) % 2:
+            received.append(recording.recv(1024))
+        else:
+            received.append(bytes(buffer[:recording.recv_into(buffer)]))
+    server.close()
+    assert recording.recv(1024) == b""
+    recording.close()
+
+    started_ns, chunks = read_recording(recording.path)
+    assert received == CHUNKS
+    assert [data for _, data in chunks] == CHUNKS
+    offsets = [offset for offset, _ in chunks]
+    assert offsets == sorted(offsets)
+    assert abs(started_ns / 1e9 - time.time()) < 60
+
+
+def test_torn_tail_is_dropped(tmp_path):
+    server, client = socket.socketpair()
+    recording = RecordingSocket(client, str(tmp_path / "torn.ircrec"))
+    for chunk in CHUNKS:
+        server.sendall(chunk)
+        recording.recv(1024)
+    recording.close()
+    server.close()
+
+    with open(recording.path, "r+b") as file:
+        file.truncate(file.seek(0, 2) - 2)
+    _, chunks = read_recording(recording.path)
+    assert [data for _, data in chunks] == CHUNKS[:2]
+
+
+def test_foreign_file_is_refused(tmp_path):
+    path = tmp_path / "chat.log"
+    path.write_bytes(b"not a recording")
+    with pytest.raises(Exception, match="not an IRC recording"):
+        read_recording(str(path))
+
+
+def replay_to_client(chunks, speed):
+    fake_server = ReplayIrcServer(chunks, speed)
+    loop, port = start_server(fake_server)
+    try:
+        sock = IrcConnector("127.0.0.1", port, tls=False).connect("test", "testbot", ["chan"])
+        reader, received = LineReader(sock), []
+        while (lines := reader.read_batch()) is not None:
+            received.extend(lines)
+        sock.close()
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+    return fake_server, received
+
+
+@pytest.mark.parametrize("speed, spacing_ms", [(1.0, 100), (4.0, 25)])
+def test_replay_keeps_recorded_timing(speed, spacing_ms):
+    chunks = [(index * 100_000_000, f"PING :{index}\r\n".encode()) for index in range(4)]
+    fake_server, received = replay_to_client(chunks, speed)
+
+    assert received[1:] == [f"PING :{index}" for index in range(4)]  # After the welcome line
+    # Each chunk is due at its own offset from the first, so one late write does not delay the next
+    offsets_ms = [(sent - fake_server.sent_ns[0]) / 1e6 for sent in fake_server.sent_ns]
+    due_ms = [index * spacing_ms for index in range(4)]
+    assert all(due - 5 <= offset <= due + 50 for due, offset in zip(due_ms, offsets_ms)), offsets_ms
+
+
+def test_replay_at_max_speed_sends_everything_back_to_back():
+    chunks = [(index * 1_000_000_000, f"PING :{index}\r\n".encode()) for index in range(5)]
+    fake_server, received = replay_to_client(chunks, None)
+
+    assert len(received) == 6
+    assert (fake_server.sent_ns[-1] - fake_server.sent_ns[0]) / 1e9 < 0.5
+
+
+def test_replay_through_manage_intervals(in_tmp_path):
+    chunks = synthetic_recording(load_corpus(), seconds=2)
+    expected = privmsg_counts(chunks)[-1]
+    loop, port = start_server(ReplayIrcServer(chunks, None))
+    live = LiveMetrics()
+    try:
+        sock = IrcConnector("127.0.0.1", port, tls=False).connect("test", "testbot", ["replaytest"])
+        manage_intervals(sock, "replaytest", 10 / 60, "both", live=live, poller=StaticViewerPoller())
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+
+    # Every message was buffered, written and analyzed
+    _, summary = extended_analyze_chat_logs(iter_chat_logs(store_path("replaytest")))
+    assert expected > 0
+    assert summary["total_messages"] == expected
+    assert sum(bucket["messages"] for bucket in live.get("replaytest").buckets("10m")) == expected
+    assert (in_tmp_path / "replaytest_chat_columns" / "intervals.bin").exists()
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import time
+
+from helper_functions.live_metrics import ChannelMetrics, LiveMetrics
+from helper_functions.metrics_server import create_metrics_app
+
+T = 1704103200  # 2024-01-01T10:00:00Z, the start of a ten-minute bucket
+
+
+def at(seconds):
+    return (T + seconds) * 1000
+
+
+def test_seconds_roll_up_into_minutes_and_ten_minutes():
+    metrics = ChannelMetrics()
+    metrics.add_messages(at(0.5), [("alice",), ("bob",)])
+    metrics.add_messages(at(0.9), [("alice",)])
+    metrics.add_messages(at(1.2), [("carol",)])
+
+    closed, current = metrics.buckets("1s", now=T + 1.5)
+    assert (closed["start"], closed["messages"], closed["unique_chatters"], closed["open"]) == (
+        "2024-01-01T10:00:00Z", 3, 2, False)
+    assert closed["messages_per_second"] == 3.0
+    assert (current["start"], current["messages"], current["open"]) == ("2024-01-01T10:00:01Z", 1, True)
+
+    metrics.record_viewers(T + 2, 50)
+    metrics.add_messages(at(61), [("dave",)])
+    metrics.add_event(T + 61, "subscription")
+
+    minutes = metrics.buckets("1m", now=T + 61.5)
+    assert [bucket["start"] for bucket in minutes] == ["2024-01-01T10:00:00Z", "2024-01-01T10:01:00Z"]
+    closed, current = minutes
+    assert (closed["messages"], closed["unique_chatters"], closed["viewers"], closed["open"]) == (4, 3, 50, False)
+    # The open minute includes its open second, and its rate is over the 1.5s elapsed so far
+    assert (current["messages"], current["events"], current["open"]) == (1, {"subscription": 1}, True)
+    assert current["messages_per_second"] == 0.667
+
+    ten_minutes = metrics.buckets("10m", now=T + 601)
+    assert len(ten_minutes) == 1
+    assert (ten_minutes[0]["messages"], ten_minutes[0]["unique_chatters"]) == (5, 4)
+    assert ten_minutes[0]["events"] == {"subscription": 1}
+    assert not ten_minutes[0]["open"]
+
+
+def test_only_the_latest_closed_buckets_are_kept():
+    metrics = ChannelMetrics()
+    for second in range(100):
+        metrics.add_messages(at(second), [("alice",)])
+
+    seconds = metrics.buckets("1s", now=T + 100.5)
+    assert len(seconds) == 60
+    assert seconds[0]["start"] == "2024-01-01T10:00:40Z"
+    assert metrics.buckets("1s", limit=5, now=T + 100.5)[0]["start"] == "2024-01-01T10:01:35Z"
+    # Nothing is lost in the roll-up of the seconds no longer kept
+    assert sum(bucket["messages"] for bucket in metrics.buckets("1m", now=T + 120)) == 100
+
+
+def test_late_data_for_a_closed_second_goes_into_the_next_one():
+    metrics = ChannelMetrics()
+    metrics.add_messages(at(5), [("alice",)])
+    metrics.add_messages(at(6), [("bob",)])
+    metrics.add_messages(at(5.5), [("carol",)])
+
+    assert [bucket["messages"] for bucket in metrics.buckets("1s", now=T + 6.5)] == [1, 2]
+
+
+def get(app, path, method="GET"):
+    """
+    Calls the ASGI app with one request. Returns the status and the decoded JSON body.
+    """
+    path, _, query = path.partition("?")
+    scope = {"type": "http", "method": method, "path": path, "query_string": query.encode(), "headers": []}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent[0]["status"], json.loads(sent[1]["body"])
+
+
+def test_live_endpoints_serve_each_channel():
+    live = LiveMetrics()
+    live.channel("#Alpha").add_messages(time.time() * 1000, [("alice",), ("bob",)])
+    live.channel("beta")
+    app = create_metrics_app(live=live)
+
+    status, body = get(app, "/live")
+    assert status == 200
+    assert sorted(body["channels"]) == ["alpha", "beta"]
+    # Whether or not a ten-minute boundary passed since the messages came in
+    ten_minutes = body["channels"]["alpha"]["10m"]
+    assert (ten_minutes["current"] or ten_minutes["last"])["messages"] == 2
+    assert body["channels"]["beta"]["1m"] == {"last": None, "current": None}
+
+    status, body = get(app, "/live/Alpha?resolution=1m&limit=5")
+    assert status == 200
+    assert (body["channel"], body["resolution"]) == ("alpha", "1m")
+    assert sum(bucket["messages"] for bucket in body["buckets"]) == 2
+
+    assert get(app, "/live/gamma")[0] == 404
+    assert get(app, "/live/alpha?resolution=1h")[0] == 400
+    assert get(app, "/live/alpha?limit=many")[0] == 400
+    assert get(app, "/live", method="POST")[0] == 405
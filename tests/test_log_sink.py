@@ -0,0 +1,71 @@
+import threading
+import time
+
+from helper_functions.log_sink import LogSink
+
+
+class SlowStream:
+    """
+    Console stream that takes a while per write and can be told to fail the next one.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.fail_next = False
+        self.lines = []
+
+    def write(self, text):
+        time.sleep(self.delay)
+        if self.fail_next:
+            self.fail_next = False
+            raise OSError("stream closed")
+        self.lines.extend(text.splitlines())
+
+    def flush(self):
+        pass
+
+
+def test_a_failed_batch_is_counted_and_the_writer_keeps_going():
+    stream = SlowStream()
+    sink = LogSink("full", stream=stream)
+    stream.fail_next = True
+    sink.chat(0, "channel", "first", "none", "lost")
+    sink.flush()
+    sink.chat(0, "channel", "second", "none", "kept")
+    sink.flush(timeout=1)
+
+    assert sink.stats()["failed"] == 1
+    assert sink.stats()["written"] == 1
+    assert len(stream.lines) == 1 and stream.lines[0].endswith("second [none]: kept")
+    assert sink._thread.is_alive()
+
+
+def test_flush_waits_for_the_batch_being_written():
+    stream = SlowStream(delay=0.3)
+    sink = LogSink("full", stream=stream)
+    sink.chat(0, "channel", "user", "none", "hello")
+    # Let the writer take the batch off the queue, so only the batch in flight is left
+    deadline = time.monotonic() + 2
+    while sink._queue and time.monotonic() < deadline:
+        time.sleep(0.001)
+    sink._wakeup.set()
+    time.sleep(0.05)
+
+    sink.flush()
+    assert sink.stats()["written"] == 1
+    assert len(stream.lines) == 1
+
+
+def test_flush_reports_a_timeout():
+    release = threading.Event()
+
+    class BlockedStream(SlowStream):
+        def write(self, text):
+            release.wait()
+            super().write(text)
+
+    sink = LogSink("full", stream=BlockedStream())
+    sink.chat(0, "channel", "user", "none", "hello")
+    assert not sink.flush(timeout=0.2)
+    release.set()
+    assert sink.flush()
@@ -0,0 +1,49 @@
+import os
+from concurrent.futures import wait
+
+from analysis import parallel_analysis
+from analysis.chat_analysis import extended_analyze_chat_logs, iter_chat_logs
+from analysis.parallel_analysis import analyze_logs_parallel, plan_shards
+from benchmarks.support import comparable
+from helper_functions.chat_store import ChatLogStore
+
+
+def tied_intervals(periods, users=30):
+    """
+    Intervals in which every user chats once, in a different order each time, so every
+    chatter ties and only the order they were first seen in breaks the ties.
+    """
+    for period in range(periods):
+        yield {
+            "start_time": f"2024-01-01T{period:02d}:00:00Z",
+            "end_time": f"2024-01-01T{period:02d}:10:00Z",
+            "chat_logs": [
+                {"timestamp": f"2024-01-01T{period:02d}:00:00Z", "username": f"user{(period * 7 + index) % users}",
+                 "designations": "subscriber/3", "message": "hi"}
+                for index in range(users)
+            ],
+            "special_events": []
+        }
+
+
+def finished_in_reverse(futures):
+    wait(futures)
+    return reversed(list(futures))
+
+
+def test_parallel_analysis_matches_serial_exactly(tmp_path, monkeypatch):
+    monkeypatch.setattr(parallel_analysis, "as_completed", finished_in_reverse)
+    paths = []
+    for channel in ("alpha", "beta"):
+        store = ChatLogStore(str(tmp_path / f"{channel}_chat_log"))
+        for period in tied_intervals(12):
+            store.append(period)
+        paths.append(store.path)
+    assert len(plan_shards(paths, shard_bytes=4096, workers=2)) > 4
+
+    results, timings = analyze_logs_parallel(paths, workers=2, shard_bytes=4096)
+
+    for path in paths:
+        channel = os.path.basename(path)[:-len("_chat_log")]
+        assert comparable(*results[channel]) == comparable(*extended_analyze_chat_logs(iter_chat_logs(path)))
+    assert sum(timing["intervals"] for timing in timings) == 24
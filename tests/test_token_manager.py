@@ -0,0 +1,123 @@
+import threading
+import time
+from datetime import datetime, timedelta, UTC
+
+import pytest
+
+from auth import api_auth, irc_auth, token_manager
+from auth.token_manager import TokenManager, write_token_file
+
+
+def test_concurrent_callers_schedule_one_refresh(tmp_path, monkeypatch):
+    timers = []
+
+    class CountingTimer(threading.Timer):
+        def __init__(self, *args):
+            time.sleep(0.01)  # Widens the window between checking for a timer and setting one
+            super().__init__(*args)
+
+        def start(self):
+            timers.append(self)
+
+    monkeypatch.setattr(token_manager, "Timer", CountingTimer)
+    token_file = str(tmp_path / "token.json")
+    expires_at = (datetime.now(UTC) + timedelta(hours=2)).isoformat()
+    write_token_file(token_file, {"access_token": "abc", "expires_at": expires_at})
+    manager = TokenManager("test", token_file, lambda token_data: pytest.fail("token should not be fetched"))
+
+    barrier = threading.Barrier(16)
+    tokens = []
+
+    def get_token():
+        barrier.wait()
+        tokens.append(manager.get_access_token())
+
+    threads = [threading.Thread(target=get_token) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert tokens == ["abc"] * 16
+    assert len(timers) == 1
+
+
+@pytest.mark.parametrize("module", [api_auth, irc_auth])
+def test_token_manager_refuses_other_credentials(module, monkeypatch):
+    monkeypatch.setattr(module, "_token_manager", None)
+    monkeypatch.setattr(module, "_token_manager_credentials", None)
+
+    manager = module.get_token_manager("client", "secret")
+    assert module.get_token_manager("client", "secret") is manager
+    with pytest.raises(Exception, match="other"):
+        module.get_token_manager("other", "secret")
+
+
+def test_a_scheduled_refresh_is_not_built_again_on_every_call(tmp_path, monkeypatch):
+    built = []
+
+    class CountingTimer(threading.Timer):
+        def __init__(self, *args):
+            built.append(self)
+            super().__init__(*args)
+
+        def start(self):
+            pass
+
+    monkeypatch.setattr(token_manager, "Timer", CountingTimer)
+    token_file = str(tmp_path / "token.json")
+    expires_at = (datetime.now(UTC) + timedelta(hours=2)).isoformat()
+    write_token_file(token_file, {"access_token": "abc", "expires_at": expires_at})
+    manager = TokenManager("test", token_file, lambda token_data: pytest.fail("token should not be fetched"))
+
+    for _ in range(10):
+        assert manager.get_access_token() == "abc"
+    assert len(built) == 1
+
+
+def test_waiters_are_not_given_the_error_of_an_earlier_refresh(tmp_path, monkeypatch):
+    def fail(token_data):
+        raise Exception("token endpoint down")
+
+    manager = TokenManager("test", str(tmp_path / "token.json"), fail)
+    with pytest.raises(Exception, match="down"):
+        manager.refresh()
+
+    waiting = threading.Event()
+
+    class NotifyingEvent(threading.Event):
+        def wait(self, timeout=None):
+            waiting.set()
+            return super().wait(timeout)
+
+    monkeypatch.setattr(token_manager, "Event", NotifyingEvent)
+    # Meanwhile another caller got a valid token, which the next leader finds and returns
+    valid = {"access_token": "abc", "expires_at": (datetime.now(UTC) + timedelta(hours=2)).isoformat()}
+    manager._token_data = valid
+    checking = threading.Event()
+    release = threading.Event()
+
+    def slow_seconds_left(token_data):
+        checking.set()
+        release.wait()
+        return 3600
+
+    manager._seconds_left = slow_seconds_left
+    results = []
+    leader = threading.Thread(target=lambda: manager.refresh(only_if_expired=True))
+    leader.start()
+    checking.wait()
+
+    def wait_for_leader():
+        try:
+            results.append(manager.refresh())
+        except Exception as e:
+            results.append(e)
+
+    waiter = threading.Thread(target=wait_for_leader)
+    waiter.start()
+    waiting.wait()
+    release.set()
+    leader.join()
+    waiter.join()
+    assert results == [valid]
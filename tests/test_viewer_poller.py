@@ -0,0 +1,84 @@
+import threading
+import time
+
+from benchmarks.fake_helix_server import FakeHelix
+from helper_functions.viewer_poller import ViewerCountPoller
+
+
+class CountingToken:
+    def __init__(self):
+        self.refreshes = 0
+
+    def get_access_token(self):
+        return f"token{self.refreshes}"
+
+    def refresh(self):
+        self.refreshes += 1
+        return {"access_token": self.get_access_token()}
+
+
+def test_viewer_counts_are_batched_100_logins_per_request(helix_server):
+    helix = FakeHelix()
+    helix.streams = {f"channel{index:03d}": index for index in range(0, 250, 2)}
+    poller = ViewerCountPoller("client", "secret", helix_server(helix), token_manager=CountingToken())
+
+    counts = poller.fetch_viewer_counts([f"Channel{index:03d}" for index in range(250)])
+
+    assert len(counts) == 250
+    assert counts["channel010"] == 10
+    assert counts["channel011"] is None
+    assert helix.requests["streams"] == 3 == poller.requests_made
+
+
+def test_expired_token_is_refreshed_and_retried(helix_server):
+    helix = FakeHelix()
+    helix.streams = {"alpha": 42}
+    helix.unauthorized = 1
+    token = CountingToken()
+    poller = ViewerCountPoller("client", "secret", helix_server(helix), token_manager=token)
+
+    assert poller.fetch_viewer_counts(["alpha"]) == {"alpha": 42}
+    assert token.refreshes == 1
+    assert helix.requests["401"] == 1
+
+
+def test_poller_waits_for_the_rate_limit_instead_of_running_into_429s(helix_server):
+    helix = FakeHelix(points=3, window_seconds=1)
+    poller = ViewerCountPoller("client", "secret", helix_server(helix), token_manager=CountingToken(),
+                               min_remaining=1)
+
+    for _ in range(2):
+        poller.fetch_viewer_counts([f"channel{index}" for index in range(150)])
+
+    assert helix.requests["429"] == 0
+    assert helix.requests["streams"] == 4
+
+
+def test_a_failed_batch_is_recorded_as_unknown_and_the_others_are_kept(helix_server):
+    helix = FakeHelix()
+    helix.streams = {f"channel{index:03d}": index for index in range(250)}
+    # Every attempt of the first batch is refused
+    helix.unauthorized = 3
+    poller = ViewerCountPoller("client", "secret", helix_server(helix), token_manager=CountingToken())
+
+    counts = poller.fetch_viewer_counts([f"channel{index:03d}" for index in range(250)])
+
+    assert len(counts) == 250
+    assert all(counts[f"channel{index:03d}"] is None for index in range(100))
+    assert all(counts[f"channel{index:03d}"] == index for index in range(100, 250))
+
+
+def test_waiting_for_the_rate_limit_does_not_hold_the_lock():
+    poller = ViewerCountPoller("client", "secret", token_manager=CountingToken())
+    poller.ratelimit_remaining = poller.min_remaining
+    poller.ratelimit_reset = time.time() + 0.5
+    waiting = threading.Thread(target=poller._wait_for_ratelimit)
+    waiting.start()
+    time.sleep(0.1)
+
+    acquired = poller.ratelimit_lock.acquire(timeout=0.2)
+    if acquired:
+        poller.ratelimit_lock.release()
+    waiting.join()
+    assert acquired
+    assert poller.ratelimit_remaining is None
@@ -0,0 +1,69 @@
+from datetime import datetime, UTC
+
+from helper_functions.viewer_sampler import OFFLINE, ViewerSampler, ViewerSeries, summarize_samples
+
+START = datetime(2024, 1, 1, 10, 0, tzinfo=UTC).timestamp()
+
+
+class ListPoller:
+    """
+    Returns the next viewer counts of a list on every poll.
+    """
+
+    def __init__(self, polls):
+        self.polls = list(polls)
+
+    def fetch_viewer_counts(self, channels):
+        counts = self.polls.pop(0)
+        return {channel: counts.get(channel) for channel in channels}
+
+
+def test_a_full_ring_overwrites_the_oldest_samples():
+    series = ViewerSeries(capacity=5)
+    for index in range(8):
+        series.add(START + index, 100 + index)
+
+    assert series.window(START, START + 100) == [(START + index, 100 + index) for index in range(3, 8)]
+    # The window is half-open and still in time order across the wrap
+    assert series.window(START + 4, START + 6) == [(START + 4, 104), (START + 5, 105)]
+
+
+def test_a_ring_not_yet_full_returns_only_what_was_added():
+    series = ViewerSeries(capacity=5)
+    series.add(START, 10)
+    series.add(START + 1, None)
+
+    assert series.window(START, START + 10) == [(START, 10), (START + 1, OFFLINE)]
+    assert ViewerSeries(capacity=5).window(START, START + 10) == []
+
+
+def test_summary_keeps_the_peak_of_each_bucket_and_leaves_out_offline_samples():
+    samples = [(START, 100), (START + 30, 5000), (START + 60, 120), (START + 300, OFFLINE), (START + 599, 90)]
+
+    summary = summarize_samples(samples, START, START + 600, points=10)
+
+    assert (summary["min"], summary["max"], summary["mean"], summary["last"]) == (90, 5000, 1327.5, 90)
+    assert summary["samples"] == 5
+    # The raid spike survives downsampling; the offline sample leaves its bucket empty
+    assert summary["series"] == [["2024-01-01T10:00:00Z", 5000], ["2024-01-01T10:01:00Z", 120],
+                                 ["2024-01-01T10:09:00Z", 90]]
+
+
+def test_summary_of_an_offline_or_unsampled_interval_is_unknown():
+    empty = {"min": None, "max": None, "mean": None, "last": None, "samples": 0, "series": []}
+    assert summarize_samples([], START, START + 600) == empty
+    assert summarize_samples([(START, OFFLINE)], START, START + 600) == dict(empty, samples=1)
+
+
+def test_sampler_summarizes_each_channel_from_its_own_samples():
+    poller = ListPoller([{"alpha": 10, "beta": None}, {"alpha": 30, "beta": 7}])
+    sampler = ViewerSampler(["Alpha", "beta"], poller=poller)
+    sampler.sample_once()
+    sampler.sample_once()
+    start, end = datetime.fromtimestamp(START, UTC), datetime.now(UTC)
+
+    alpha = sampler.summarize("ALPHA", start, end)
+    beta = sampler.summarize("beta", start, end)
+    assert (alpha["min"], alpha["max"], alpha["last"], alpha["samples"]) == (10, 30, 30, 2)
+    assert (beta["min"], beta["last"], beta["samples"]) == (7, 7, 2)
+    assert sampler.summarize("unknown", start, end)["samples"] == 0